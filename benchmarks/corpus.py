@@ -0,0 +1,117 @@
+# benchmarks/corpus.py
+"""
+Synthetic engagement corpora for the benchmarks.
+
+A corpus is returned in the same shape StorageManager.save() takes, so it can be
+written to a database or fed straight to the renderer and exporter.
+"""
+import os
+import random
+import struct
+import zlib
+
+_WORDS = (
+    "host service port scan exploit payload credential hash session token admin "
+    "domain controller kerberos ticket privilege escalation lateral movement shell "
+    "reverse bind listener enumeration web application injection parameter finding "
+    "severity remediation evidence screenshot request response header cookie"
+).split()
+
+_TOOLS = ["nmap -sC -sV", "gobuster dir -u", "nikto -h", "crackmapexec smb", "enum4linux -a"]
+
+
+def write_png(path, width=64, height=48, seed=0):
+    """Writes a small valid RGB PNG, standing in for a screenshot."""
+    rng = random.Random(seed)
+    rows = b"".join(
+        b"\x00" + bytes(rng.randrange(256) for _ in range(width * 3)) for _ in range(height)
+    )
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(rows)))
+        f.write(chunk(b"IEND", b""))
+
+
+def _paragraph(rng, words=60):
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _code_block(rng):
+    lines = [f"def step_{rng.randrange(1000)}(target):"]
+    lines += [f"    run('{rng.choice(_WORDS)}', target, port={rng.randrange(1, 65535)})" for _ in range(8)]
+    return "```python\n" + "\n".join(lines) + "\n```"
+
+
+def _table(rng, rows=8):
+    lines = ["| Host | Port | Service | State |", "|------|------|---------|-------|"]
+    for _ in range(rows):
+        lines.append(
+            f"| 10.0.{rng.randrange(256)}.{rng.randrange(1, 255)} | {rng.randrange(1, 65535)} "
+            f"| {rng.choice(_WORDS)} | open |"
+        )
+    return "\n".join(lines)
+
+
+def _command_dump(rng, lines=200):
+    out = [f"```bash\n$ {rng.choice(_TOOLS)} 10.0.0.{rng.randrange(1, 255)}"]
+    for _ in range(lines):
+        out.append(f"{rng.randrange(1, 65535)}/tcp open  {rng.choice(_WORDS):<12} {_paragraph(rng, 6)}")
+    return "\n".join(out) + "\n```"
+
+
+def make_body(rng, target_bytes, image_paths=(), command_lines=200):
+    """Builds a note body of roughly `target_bytes` mixing prose, code, tables, images and tool output."""
+    parts = [f"## {_paragraph(rng, 4)}", "- [ ] Verify finding", "- [x] Capture evidence"]
+    size = sum(len(p) for p in parts)
+    while size < target_bytes:
+        kind = rng.random()
+        if kind < 0.5:
+            part = _paragraph(rng)
+        elif kind < 0.65:
+            part = _code_block(rng)
+        elif kind < 0.8:
+            part = _table(rng)
+        elif kind < 0.9 and image_paths:
+            part = f"![evidence]({rng.choice(image_paths)})"
+        else:
+            part = _command_dump(rng, command_lines)
+        parts.append(part)
+        size += len(part)
+    return "\n\n".join(parts)
+
+
+def generate_corpus(folders=5, notes_per_folder=20, body_bytes=4096, images=5,
+                    command_lines=200, image_dir=None, seed=1234):
+    """
+    Returns a data dict for StorageManager.save() with `folders` x `notes_per_folder` notes.
+    When `image_dir` is given, `images` small PNGs are written there and referenced from bodies.
+    """
+    rng = random.Random(seed)
+    image_paths = []
+    if image_dir and images:
+        os.makedirs(image_dir, exist_ok=True)
+        for i in range(images):
+            path = os.path.join(image_dir, f"screenshot_{i}.png")
+            write_png(path, seed=seed + i)
+            image_paths.append(path)
+
+    data = {"folders": {}, "notes": {}}
+    note_id = 1
+    for folder_id in range(1, folders + 1):
+        note_ids = []
+        for i in range(notes_per_folder):
+            data["notes"][note_id] = {
+                "title": f"Finding {folder_id}.{i + 1} - {rng.choice(_WORDS)} {rng.choice(_WORDS)}",
+                "body": make_body(rng, body_bytes, image_paths, command_lines),
+            }
+            note_ids.append(note_id)
+            note_id += 1
+        data["folders"][folder_id] = {"name": f"Engagement {folder_id}", "notes": note_ids}
+    data["next_folder_id"] = folders + 1
+    data["next_note_id"] = note_id
+    return data
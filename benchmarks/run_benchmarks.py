@@ -0,0 +1,200 @@
+# benchmarks/run_benchmarks.py
+"""
+Headless benchmarks for PieceNote's hot paths.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks --folders 10 --notes 30 --output bench.json
+    python -m benchmarks.run_benchmarks --compare bench.json
+
+Each benchmark is timed over --repeat runs, then run once more under tracemalloc
+to record its peak memory. Results are printed and optionally written as JSON.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate_corpus
+from utils.settings import init_settings
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(func, repeat, setup=None):
+    """Times func() over `repeat` runs and one traced run. setup() runs untimed before each."""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    if setup:
+        setup()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "runs": repeat,
+        "mean_ms": statistics.mean(timings) * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+        "min_ms": min(timings) * 1000,
+        "max_ms": max(timings) * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+def build_benchmarks(workdir, data):
+    """Returns an ordered list of (name, func, setup) tuples; func is None when unavailable."""
+    from features.storage import StorageManager
+    from features.metrics import compute_text_metrics
+    from features.export import export_notes_to_file
+
+    storage = StorageManager(os.path.join(workdir, "bench.sqlite"))
+    storage.save(data)
+    notes = list(data["notes"].values())
+    first_id = next(iter(data["notes"]))
+    original_bodies = {note_id: note["body"] for note_id, note in data["notes"].items()}
+    queries = ["10.0.", "kerberos", "no-such-term-anywhere"]
+
+    def edit_all_notes():
+        # save() skips unchanged rows, so a full save needs every body to differ
+        stamp = time.perf_counter()
+        for note_id, note in data["notes"].items():
+            note["body"] = original_bodies[note_id] + f"\nEdited at {stamp}"
+
+    def edit_one_note():
+        data["notes"][first_id]["body"] = original_bodies[first_id] + f"\nEdited at {time.perf_counter()}"
+
+    def search():
+        for query in queries:
+            storage.search_notes(query)
+
+    def metrics():
+        for note in notes:
+            compute_text_metrics(note["body"])
+
+    benchmarks = [
+        ("storage.save_full", lambda: storage.save(data), edit_all_notes),
+        ("storage.save_one_change", lambda: storage.save(data), edit_one_note),
+        ("storage.load", storage.load, None),
+        ("storage.search_notes", search, None),
+        ("editor.calculate_metrics", metrics, None),
+    ]
+
+    try:
+        from features.markdown_renderer import render_preview_markdown
+        render_preview_markdown("warm up")
+
+        def render():
+            for note in notes:
+                render_preview_markdown(note["body"])
+        benchmarks.append(("editor.render_preview", render, None))
+    except ImportError as e:
+        benchmarks.append(("editor.render_preview", None, str(e)))
+
+    for file_format in ("md", "html", "pdf"):
+        target = os.path.join(workdir, f"export.{file_format}")
+        name = f"export.{file_format}"
+        try:
+            if file_format != "md":
+                import markdown  # noqa: F401
+            if file_format == "pdf":
+                import xhtml2pdf  # noqa: F401
+        except ImportError as e:
+            benchmarks.append((name, None, str(e)))
+            continue
+        # Not incremental: after the first run the manifest would make every export a no-op
+        benchmarks.append((
+            name,
+            lambda target=target, file_format=file_format: export_notes_to_file(
+                target, notes, file_format, True, incremental=False
+            ),
+            None
+        ))
+    return benchmarks
+
+
+def print_results(results, baseline=None):
+    print(f"{'benchmark':<28}{'mean ms':>12}{'min ms':>12}{'peak KiB':>12}{'vs base':>10}")
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"{name:<28}  skipped: {result['skipped']}")
+            continue
+        change = ""
+        base = (baseline or {}).get(name)
+        if base and "mean_ms" in base and base["mean_ms"]:
+            change = f"{(result['mean_ms'] / base['mean_ms'] - 1) * 100:+.1f}%"
+        print(f"{name:<28}{result['mean_ms']:>12.2f}{result['min_ms']:>12.2f}{result['peak_kib']:>12.0f}{change:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run PieceNote benchmarks on a synthetic corpus.")
+    parser.add_argument("--folders", type=int, default=5)
+    parser.add_argument("--notes", type=int, default=20, help="notes per folder")
+    parser.add_argument("--body-kb", type=float, default=4, help="approximate size of each note body")
+    parser.add_argument("--images", type=int, default=5, help="number of distinct images referenced")
+    parser.add_argument("--command-lines", type=int, default=200, help="lines per embedded command dump")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--only", help="comma-separated benchmark name prefixes to run")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="piecenote-bench-") as workdir:
+        # Keep settings, database and backups inside the scratch directory
+        init_settings(workdir)
+        data = generate_corpus(
+            folders=args.folders, notes_per_folder=args.notes, body_bytes=int(args.body_kb * 1024),
+            images=args.images, command_lines=args.command_lines,
+            image_dir=os.path.join(workdir, "images"), seed=args.seed
+        )
+        only = [prefix.strip() for prefix in args.only.split(",")] if args.only else None
+        results = {}
+        for name, func, setup in build_benchmarks(workdir, data):
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            if func is None:
+                results[name] = {"skipped": setup}
+                continue
+            results[name] = measure(func, args.repeat, setup)
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": {
+            "folders": args.folders, "notes_per_folder": args.notes, "body_kb": args.body_kb,
+            "images": args.images, "command_lines": args.command_lines, "seed": args.seed,
+        },
+        "results": results,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get("results")
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,409 @@
+# features/api_server.py
+"""
+Read-only HTTP/JSON API over the notes database, for reporting scripts and dashboards.
+
+Runs on asyncio and only listens on the loopback interface. Queries go through a
+small pool of read-only SQLite connections (`mode=ro`), in worker threads, so a slow
+query never stalls the event loop and nothing here can write to the file.
+
+  GET /api/folders                        every folder with its note count
+  GET /api/folders/<id>/notes             notes of one folder, in folder order
+  GET /api/notes/<id>                     one note including its body
+  GET /api/notes/<id>/html                the note rendered like the editor preview
+  GET /api/search?q=<text>                notes whose title or body contains <text>
+
+Lists take `limit` (at most MAX_PAGE_SIZE) and `offset` and return
+{"items": [...], "offset", "limit", "next"}, `next` being the offset of the following
+page or null. Every response carries an ETag; a request whose If-None-Match matches
+gets an empty 304. Note ETags come from the note's uuid and version and its folder's
+version, so a note is not even read (or rendered) again while it is unchanged. Ids are
+reused after a delete but uuids are not, so neither are ETags. Rendered HTML is
+cached per uuid and body hash.
+"""
+import asyncio
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from urllib.parse import parse_qs, urlsplit
+
+from utils.logger import get_logger
+from utils.perf import timed, increment
+from utils.settings import get_settings_service
+
+log = get_logger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Requests larger than this (headers) are refused; the API has no request bodies
+MAX_REQUEST_BYTES = 16 * 1024
+LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+_STATUS_TEXT = {
+    200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 421: "Misdirected Request", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ReadOnlyPool:
+    """A fixed number of read-only connections to one database file, shared by worker threads."""
+
+    def __init__(self, filepath, size=4, timeout=10):
+        self.filepath = filepath
+        self.timeout = timeout
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(self._connect())
+
+    def _connect(self):
+        uri = f"file:{self.filepath}?mode=ro"
+        # Handed from thread to thread, but only ever used by one at a time
+        return sqlite3.connect(uri, uri=True, timeout=self.timeout, check_same_thread=False)
+
+    @contextmanager
+    def connection(self):
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+class NotesApi:
+    """The endpoints. Each handler runs in a worker thread and returns (payload, etag)."""
+
+    def __init__(self, pool, render_cache_size=256):
+        self.pool = pool
+        self.render_cache_size = render_cache_size
+        self._render_cache = OrderedDict()
+        self._render_lock = threading.Lock()
+
+    def folders(self, params, etag):
+        with self.pool.connection() as conn:
+            rows = conn.execute("""
+                SELECT f.folder_id, f.name, f.version, COUNT(n.note_id)
+                FROM folders f LEFT JOIN notes n ON n.folder_id = f.folder_id
+                GROUP BY f.folder_id ORDER BY f.name
+            """).fetchall()
+        items = [
+            {"folder_id": folder_id, "name": name, "version": version, "note_count": note_count}
+            for folder_id, name, version, note_count in rows
+        ]
+        return {"items": items}, None
+
+    def folder_notes(self, params, etag, folder_id):
+        limit, offset = _page(params)
+        with self.pool.connection() as conn:
+            if conn.execute("SELECT 1 FROM folders WHERE folder_id = ?", (folder_id,)).fetchone() is None:
+                raise ApiError(404, f"No folder with id {folder_id}.")
+            rows = conn.execute("""
+                SELECT note_id, title, version, updated_at FROM notes
+                WHERE folder_id = ? ORDER BY sort_order LIMIT ? OFFSET ?
+            """, (folder_id, limit + 1, offset)).fetchall()
+        items = [
+            {"note_id": note_id, "title": title, "version": version, "updated_at": updated_at}
+            for note_id, title, version, updated_at in rows[:limit]
+        ]
+        return _page_payload(items, limit, offset, len(rows) > limit), None
+
+    def note(self, params, etag, note_id):
+        with self.pool.connection() as conn:
+            note_uuid, version, _, folder_version = self._note_key(conn, note_id)
+            # The folder's version too: the response carries its name
+            note_etag = f'"note-{note_uuid}-{version}-{folder_version}"'
+            if etag == note_etag:
+                return None, note_etag
+            row = conn.execute("""
+                SELECT n.title, n.body, n.folder_id, f.name, n.created_at, n.updated_at
+                FROM notes n JOIN folders f ON n.folder_id = f.folder_id WHERE n.note_id = ?
+            """, (note_id,)).fetchone()
+        if row is None:
+            raise ApiError(404, f"No note with id {note_id}.")
+        title, body, folder_id, folder_name, created_at, updated_at = row
+        return {
+            "note_id": note_id, "title": title, "body": body or "", "folder_id": folder_id,
+            "folder_name": folder_name, "version": version, "created_at": created_at, "updated_at": updated_at,
+        }, note_etag
+
+    def note_html(self, params, etag, note_id):
+        with self.pool.connection() as conn:
+            note_uuid, _, body_hash, _ = self._note_key(conn, note_id)
+            html_etag = f'"html-{note_uuid}-{body_hash}"'
+            if etag == html_etag:
+                return None, html_etag
+            cache_key = (note_uuid, body_hash)
+            with self._render_lock:
+                html = self._render_cache.get(cache_key)
+                if html is not None:
+                    self._render_cache.move_to_end(cache_key)
+            if html is None:
+                body = conn.execute("SELECT body FROM notes WHERE note_id = ?", (note_id,)).fetchone()
+        if html is not None:
+            increment("api.renders_cached")
+            return html, html_etag
+        if body is None:
+            raise ApiError(404, f"No note with id {note_id}.")
+        from features.markdown_renderer import render_preview_markdown
+        with timed("api.render"):
+            html = render_preview_markdown(body[0] or "")
+        with self._render_lock:
+            self._render_cache[cache_key] = html
+            while len(self._render_cache) > self.render_cache_size:
+                self._render_cache.popitem(last=False)
+        return html, html_etag
+
+    def search(self, params, etag):
+        query = params.get("q", [""])[0]
+        if not query.strip():
+            raise ApiError(400, "Missing search text: /api/search?q=<text>")
+        limit, offset = _page(params)
+        term = f"%{query}%"
+        with self.pool.connection() as conn:
+            rows = conn.execute("""
+                SELECT n.note_id, n.title, n.version, f.folder_id, f.name
+                FROM notes n JOIN folders f ON n.folder_id = f.folder_id
+                WHERE n.title LIKE ? OR n.body LIKE ?
+                ORDER BY n.note_id LIMIT ? OFFSET ?
+            """, (term, term, limit + 1, offset)).fetchall()
+        items = [
+            {"note_id": note_id, "title": title, "version": version, "folder_id": folder_id, "folder_name": folder_name}
+            for note_id, title, version, folder_id, folder_name in rows[:limit]
+        ]
+        return _page_payload(items, limit, offset, len(rows) > limit), None
+
+    @staticmethod
+    def _note_key(conn, note_id):
+        """Returns (uuid, version, body_hash, folder version) of a note, without reading its body."""
+        row = conn.execute("""
+            SELECT n.uuid, n.version, n.body_hash, f.version
+            FROM notes n JOIN folders f ON n.folder_id = f.folder_id WHERE n.note_id = ?
+        """, (note_id,)).fetchone()
+        if row is None:
+            raise ApiError(404, f"No note with id {note_id}.")
+        return row
+
+    def route(self, path):
+        """Returns (handler, extra args) for a request path."""
+        parts = [part for part in path.split("/") if part]
+        if parts[:1] != ["api"]:
+            raise ApiError(404, f"Unknown path {path}.")
+        parts = parts[1:]
+        try:
+            if parts == ["folders"]:
+                return self.folders, ()
+            if len(parts) == 3 and parts[0] == "folders" and parts[2] == "notes":
+                return self.folder_notes, (int(parts[1]),)
+            if len(parts) == 2 and parts[0] == "notes":
+                return self.note, (int(parts[1]),)
+            if len(parts) == 3 and parts[0] == "notes" and parts[2] == "html":
+                return self.note_html, (int(parts[1]),)
+            if parts == ["search"]:
+                return self.search, ()
+        except ValueError:
+            raise ApiError(404, f"Unknown path {path}.")
+        raise ApiError(404, f"Unknown path {path}.")
+
+
+def _page(params):
+    try:
+        limit = int(params.get("limit", [DEFAULT_PAGE_SIZE])[0])
+        offset = int(params.get("offset", [0])[0])
+    except ValueError:
+        raise ApiError(400, "limit and offset must be integers.")
+    if limit < 1 or offset < 0:
+        raise ApiError(400, "limit must be positive and offset not negative.")
+    return min(limit, MAX_PAGE_SIZE), offset
+
+
+def _page_payload(items, limit, offset, more):
+    return {"items": items, "offset": offset, "limit": limit, "next": offset + limit if more else None}
+
+
+class ApiServer:
+    """Serves NotesApi over HTTP/1.1 (keep-alive, GET and HEAD only) on a loopback address."""
+
+    def __init__(self, filepath, host="127.0.0.1", port=None, pool_size=None):
+        if host not in LOOPBACK_HOSTS:
+            raise ValueError(f"The API only listens on the loopback interface, not on {host}.")
+        settings = get_settings_service()
+        self.host = host
+        self.port = settings.get("api_port", 8765) if port is None else port
+        pool_size = pool_size or settings.get("api_pool_size", 4)
+        self.pool = ReadOnlyPool(filepath, pool_size, settings.get("database_busy_timeout_seconds", 10))
+        self.api = NotesApi(self.pool, settings.get("api_render_cache_entries", 256))
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="api")
+        self._server = None
+        self._loop = None
+        self._thread = None
+        # Tasks of the connected clients, cancelled by stop()
+        self._clients = set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        # Port 0 picks a free port; report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+        log.info(f"API listening on http://{self.host}:{self.port}/api/")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self):
+        """Runs the server on an event loop of its own in a daemon thread, e.g. next to the GUI."""
+        started = threading.Event()
+        failure = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.start())
+            except OSError as e:
+                failure.append(e)
+                started.set()
+                self._loop.close()
+                return
+            started.set()
+            try:
+                self._loop.run_forever()
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="api-server", daemon=True)
+        self._thread.start()
+        started.wait()
+        if failure:
+            raise failure[0]
+
+    def stop(self):
+        if self._loop is not None and self._server is not None and not self._loop.is_closed():
+            future = asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+            try:
+                future.result(timeout=5)
+            except FutureTimeoutError:
+                log.warning("API server connections did not close in time.")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+        self._executor.shutdown(wait=False)
+        self.pool.close()
+
+    async def _shutdown(self):
+        """Stops accepting connections and ends the open ones, keep-alive ones included."""
+        self._server.close()
+        clients = list(self._clients)
+        for task in clients:
+            task.cancel()
+        await asyncio.gather(*clients, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _handle_client(self, reader, writer):
+        task = asyncio.current_task()
+        self._clients.add(task)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, "GET", 431, {"error": "Request too large."}, None, False)
+                    break
+                if len(head) > MAX_REQUEST_BYTES:
+                    await self._respond(writer, "GET", 431, {"error": "Request too large."}, None, False)
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, "GET", 400, {"error": "Malformed request line."}, None, False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                await self._dispatch(writer, method, target, headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            self._clients.discard(task)
+
+    def _allowed_hosts(self):
+        return {f"{host}:{self.port}" for host in ("127.0.0.1", "localhost", "[::1]")}
+
+    async def _dispatch(self, writer, method, target, headers, keep_alive):
+        # A page the user opens could point its own host name at 127.0.0.1 (DNS
+        # rebinding) and read the API from the browser; its requests carry that name
+        if headers.get("host", "").lower() not in self._allowed_hosts():
+            await self._respond(writer, method, 421, {"error": "Unexpected Host header."}, None, keep_alive)
+            return
+        if method not in ("GET", "HEAD"):
+            await self._respond(writer, method, 405, {"error": "The API is read-only."}, None, keep_alive)
+            return
+        url = urlsplit(target)
+        etag = headers.get("if-none-match")
+        try:
+            handler, args = self.api.route(url.path)
+            params = parse_qs(url.query)
+            with timed("api.request"):
+                payload, response_etag = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, lambda: handler(params, etag, *args)
+                )
+        except ApiError as e:
+            await self._respond(writer, method, e.status, {"error": str(e)}, None, keep_alive)
+            return
+        except sqlite3.Error as e:
+            log.error(f"API request {target} failed: {e}")
+            await self._respond(writer, method, 500, {"error": "Database error."}, None, keep_alive)
+            return
+        increment("api.requests")
+        await self._respond(writer, method, 200, payload, response_etag, keep_alive, request_etag=etag)
+
+    async def _respond(self, writer, method, status, payload, etag, keep_alive, request_etag=None):
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/html; charset=utf-8"
+        elif payload is not None:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json"
+        else:
+            body, content_type = b"", None
+        if status == 200 and etag is None:
+            # Lists: the ETag is the content hash, which still saves the client the transfer
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if status == 200 and request_etag == etag:
+            status, body = 304, b""
+            increment("api.not_modified")
+        header_lines = [
+            f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+            "Cache-Control: no-cache",
+        ]
+        if content_type and status != 304:
+            header_lines.append(f"Content-Type: {content_type}")
+        if etag and status in (200, 304):
+            header_lines.append(f"ETag: {etag}")
+        writer.write(("\r\n".join(header_lines) + "\r\n\r\n").encode("latin-1"))
+        if method != "HEAD" and status != 304:
+            writer.write(body)
+        await writer.drain()
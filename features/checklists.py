@@ -0,0 +1,42 @@
+import re
+
+# Matches "- [ ] task", "* [x] task", "+ [X] task" and "1. [ ] task" / "1) [ ] task",
+# indented or inside a blockquote.
+TASK_REGEX = re.compile(r'^(\s*(?:>\s*)*(?:[-*+]|\d+[.)])\s+)\[([ xX])\](?=\s)\s*(.*)$')
+_FENCE_REGEX = re.compile(r'^\s*(`{3,}|~{3,})')
+
+
+def extract_tasks(body):
+    """
+    Finds the checklist items of a note body, in the order the preview renders them.
+    Task-like lines inside fenced code blocks are skipped.
+    Returns a list of (line_number, text, checked) tuples, line numbers being 0-based.
+    """
+    if not body:
+        return []
+    tasks = []
+    fence = None
+    for line_no, line in enumerate(body.split('\n')):
+        fence_match = _FENCE_REGEX.match(line)
+        if fence_match:
+            marker = fence_match.group(1)
+            if fence is None:
+                fence = marker
+            elif marker[0] == fence[0] and len(marker) >= len(fence):
+                fence = None
+            continue
+        if fence is not None:
+            continue
+        match = TASK_REGEX.match(line)
+        if match:
+            tasks.append((line_no, match.group(3).strip(), match.group(2) != ' '))
+    return tasks
+
+
+def set_task_state(line, is_checked):
+    """Returns the checklist line with its checkbox set to the given state."""
+    match = TASK_REGEX.match(line)
+    if not match:
+        return line
+    start, end = match.span(2)
+    return line[:start] + ('x' if is_checked else ' ') + line[end:]
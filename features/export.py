@@ -1,28 +1,47 @@
+import hashlib
+import json
 import os
 import re
 import pathlib
-import markdown
-from pygments.formatters import HtmlFormatter
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from features.markdown_renderer import get_pygments_css
+from utils.logger import get_logger
+from utils.perf import timed, increment
+from utils.settings import get_settings_service
 
-try:
-    from xhtml2pdf import pisa
-    XHTML2PDF_AVAILABLE = True
-except ImportError:
-    XHTML2PDF_AVAILABLE = False
+log = get_logger(__name__)
+
+# markdown and xhtml2pdf are imported in _write_file on the first export,
+# keeping them off the application's startup path.
 
 def _sanitize_filename(name):
     """Removes characters that are invalid for filenames."""
     name = re.sub(r'[^a-zA-Z0-9_-]', '_', name.split(' - ')[-1])
     return name[:100]
 
-def _preprocess_markdown_images(markdown_content):
+_IMAGE_REGEX = re.compile(r'!\[(.*?)\]\((.*?)\)')
+
+def _local_image_path(src):
+    """Returns the file an image link points at, or None for remote and inline images."""
+    if src.startswith(('http://', 'https://', 'data:')):
+        return None
+    if src.startswith('file://'):
+        return url2pathname(urlparse(src).path)
+    return os.path.abspath(src)
+
+def _preprocess_markdown_images(markdown_content, image_map=None):
     """
     Finds all relative image paths in Markdown and converts them to absolute file URIs.
+    Images listed in `image_map` (local path -> replacement src) are swapped for their replacement.
     """
     def replacer(match):
         alt_text = match.group(1)
         path = match.group(2)
-        if path.startswith(('http://', 'https://', 'file:///')):
+        local_path = _local_image_path(path)
+        if image_map and local_path in image_map:
+            return f"![{alt_text}]({image_map[local_path]})"
+        if path.startswith(('http://', 'https://', 'file:///', 'data:')):
             if path.startswith(('file:///')):
                 path = path[7:]  # Remove 'file:///' prefix
             return f"![{alt_text}]({path})"
@@ -30,38 +49,207 @@ def _preprocess_markdown_images(markdown_content):
         uri = pathlib.Path(absolute_path).as_uri()
         return f"![{alt_text}]({uri})"
 
-    image_regex = re.compile(r'!\[(.*?)\]\((.*?)\)')
-    return image_regex.sub(replacer, markdown_content)
+    return _IMAGE_REGEX.sub(replacer, markdown_content)
+
+def _prepare_images(notes_list, file_format, inline_images):
+    """
+    Optimizes every local image the notes show. Returns {local path: src to use instead}.
+    """
+    from features.export_images import ImageOptimizer, data_uri
+    paths = []
+    for note in notes_list:
+        if not note: continue
+        for match in _IMAGE_REGEX.finditer(note['body'] or ""):
+            local_path = _local_image_path(match.group(2))
+            if local_path and os.path.isfile(local_path):
+                paths.append(local_path)
+    optimized = ImageOptimizer(file_format).optimize_all(paths)
+    # PDFs always get inline images: newer xhtml2pdf refuses to read files outside the working directory
+    if inline_images or file_format == 'pdf':
+        return {path: data_uri(target) for path, target in optimized.items()}
+    return {path: pathlib.Path(target).as_uri() for path, target in optimized.items()}
 
-def export_notes_to_file(filepath, notes_list, file_format, single_file=False):
+def export_notes_to_file(filepath, notes_list, file_format, single_file=False, incremental=True, inline_images=None):
     """
     Exports a LIST of notes to a specified file or files, preserving order.
+
+    With `incremental`, a manifest kept next to the output records what each file was
+    built from: per-note files whose note is unchanged are not rewritten, and single-file
+    exports reuse the cached HTML of unchanged notes.
+
+    For HTML and PDF, images are downsized and re-encoded first (see features/export_images.py).
+    `inline_images` embeds them as data URIs in HTML; it defaults to the export_inline_images setting.
     """
-    if single_file:
-        combined_content = ""
-        for note in notes_list:
-            if not note: continue
-            processed_body = _preprocess_markdown_images(note['body'])
-            combined_content += f"# {note['title']}\n\n{processed_body}\n\n---\n\n"
-        _write_file(filepath, combined_content.strip(), "CyberNotes Export", file_format)
-    else:
+    with timed(f"export.{file_format}"):
+        image_map = {}
+        if file_format != 'md':
+            if inline_images is None:
+                inline_images = get_settings_service().get("export_inline_images", False)
+            image_map = _prepare_images(notes_list, file_format, inline_images)
         output_dir = os.path.dirname(filepath)
         base_filename = os.path.splitext(os.path.basename(filepath))[0]
-        for i, note in enumerate(notes_list):
-            if not note: continue
-            safe_title = _sanitize_filename(note['title'])
-            new_filename = f"{base_filename}_{i+1}_{safe_title}.{file_format}"
-            new_filepath = os.path.join(output_dir, new_filename)
-            processed_body = _preprocess_markdown_images(note['body'])
-            content = f"# {note['title']}\n\n{processed_body}"
-            _write_file(new_filepath, content, note['title'], file_format)
+        manifest = _ExportManifest(output_dir, base_filename, file_format) if incremental else None
+        if single_file:
+            if file_format == 'md' or manifest is None:
+                combined_content = ""
+                for note in notes_list:
+                    if not note: continue
+                    processed_body = _preprocess_markdown_images(note['body'], image_map)
+                    combined_content += f"# {note['title']}\n\n{processed_body}\n\n---\n\n"
+                _write_file(filepath, combined_content.strip(), "CyberNotes Export", file_format)
+                return
+            fragment_hashes = []
+            fragments = []
+            for note in notes_list:
+                if not note: continue
+                content = f"# {note['title']}\n\n{_preprocess_markdown_images(note['body'], image_map)}"
+                content_hash = _content_hash(content)
+                fragment_hashes.append(content_hash)
+                fragments.append(manifest.fragment(content_hash, content))
+            document_hash = _content_hash("\n".join(fragment_hashes))
+            if not manifest.is_current(filepath, document_hash):
+                html_body = "\n<hr />\n".join(fragments) + "\n<hr />"
+                _write_document(filepath, _html_document("CyberNotes Export", html_body), file_format)
+                manifest.record(filepath, document_hash)
+            manifest.save(prune_fragments=True)
+        else:
+            for i, note in enumerate(notes_list):
+                if not note: continue
+                safe_title = _sanitize_filename(note['title'])
+                new_filename = f"{base_filename}_{i+1}_{safe_title}.{file_format}"
+                new_filepath = os.path.join(output_dir, new_filename)
+                processed_body = _preprocess_markdown_images(note['body'], image_map)
+                content = f"# {note['title']}\n\n{processed_body}"
+                if manifest is not None:
+                    content_hash = _content_hash(content)
+                    if manifest.is_current(new_filepath, content_hash):
+                        continue
+                _write_file(new_filepath, content, note['title'], file_format)
+                if manifest is not None:
+                    manifest.record(new_filepath, content_hash)
+            if manifest is not None:
+                manifest.save()
+
+# ---------------- Incremental export ----------------------------------
+
+# Bump when the HTML/PDF output changes in a way cached results must not survive
+EXPORT_FORMAT_VERSION = 1
+EXPORT_CACHE_DIR = ".piecenote-export"
+
+def _local_image_stamp(content):
+    """Size and mtime of the local images a note shows, so replacing a screenshot counts as a change."""
+    stamps = []
+    for match in re.finditer(r'!\[.*?\]\((.*?)\)', content):
+        path = match.group(1)
+        if path.startswith('data:'):
+            continue
+        if path.startswith('file://'):
+            path = pathlib.Path(url2pathname(urlparse(path).path))
+        try:
+            stat = os.stat(path)
+            stamps.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+        except (OSError, ValueError):
+            continue
+    return "\n".join(stamps)
+
+def _content_hash(content):
+    return hashlib.sha1(f"{content}\0{_local_image_stamp(content)}".encode('utf-8')).hexdigest()
+
+class _ExportManifest:
+    """
+    Remembers, for one export target, the content hash each output file was built from,
+    plus the rendered HTML fragment of every note of a single-file export:
+
+      <output dir>/.piecenote-export/<name>.<format>.json   hashes of the files written
+      <output dir>/.piecenote-export/<name>.<format>/       one <hash>.html fragment per note
+
+    Everything is discarded when the renderer (format version, markdown, pygments
+    style) changes. Each export target has its own files, so parallel exports into
+    one directory do not interfere.
+    """
+
+    def __init__(self, output_dir, name, file_format):
+        self.cache_dir = os.path.join(output_dir or os.curdir, EXPORT_CACHE_DIR)
+        self.path = os.path.join(self.cache_dir, f"{name}.{file_format}.json")
+        self.fragment_dir = os.path.join(self.cache_dir, f"{name}.{file_format}")
+        self.renderer = _renderer_key(file_format)
+        self.artifacts = {}
+        self.used_fragments = set()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get("renderer") == self.renderer:
+                self.artifacts = saved.get("artifacts", {})
+        except (OSError, ValueError):
+            pass
+
+    def is_current(self, path, content_hash):
+        current = self.artifacts.get(os.path.basename(path)) == content_hash and os.path.exists(path)
+        if current:
+            increment("export.files_reused")
+        return current
+
+    def record(self, path, content_hash):
+        self.artifacts[os.path.basename(path)] = content_hash
+
+    def fragment(self, content_hash, content):
+        """Returns the HTML of one note, rendering it only if it isn't cached."""
+        self.used_fragments.add(content_hash)
+        fragment_path = os.path.join(self.fragment_dir, f"{content_hash}.html")
+        if self.artifacts:  # an outdated renderer leaves no artifacts, and its fragments are stale too
+            try:
+                with open(fragment_path, 'r', encoding='utf-8') as f:
+                    html = f.read()
+                increment("export.notes_reused")
+                return html
+            except OSError:
+                pass
+        html = _render_html_body(content)
+        increment("export.notes_rendered")
+        os.makedirs(self.fragment_dir, exist_ok=True)
+        with open(fragment_path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        return html
+
+    def save(self, prune_fragments=False):
+        """Writes the manifest and, after a single-file export, removes fragments it no longer uses."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temporary = f"{self.path}.tmp"
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump({"renderer": self.renderer, "artifacts": self.artifacts}, f, indent=1)
+            os.replace(temporary, self.path)
+            if prune_fragments and os.path.isdir(self.fragment_dir):
+                for entry in os.listdir(self.fragment_dir):
+                    if entry.endswith(".html") and entry[:-5] not in self.used_fragments:
+                        os.remove(os.path.join(self.fragment_dir, entry))
+        except OSError as e:
+            # The export itself succeeded; the next one just won't be incremental
+            log.warning(f"Could not update the export manifest {self.path}: {e}")
+
+def _renderer_key(file_format):
+    if file_format == 'md':
+        return f"{EXPORT_FORMAT_VERSION}:md"
+    import markdown
+    css_hash = hashlib.sha1(get_pygments_css().encode('utf-8')).hexdigest()[:12]
+    return f"{EXPORT_FORMAT_VERSION}:{file_format}:markdown-{markdown.__version__}:{css_hash}"
+
+def _render_html_body(content):
+    import markdown
+    return markdown.markdown(content, extensions=['fenced_code', 'codehilite', 'tables'])
 
 def _write_file(path, content, title, file_format):
     """
     Helper function to write content to a file with professional styling.
     """
-    pygments_css = HtmlFormatter(style='monokai').get_style_defs('.codehilite')
+    if file_format == 'md':
+        with open(path, 'w', encoding='utf-8') as f: f.write(content)
+        return
+    _write_document(path, _html_document(title, _render_html_body(content)), file_format)
 
+def _html_document(title, html_body):
+    """Wraps rendered note HTML in a complete, styled document."""
+    pygments_css = get_pygments_css()
     # --- The CSS has been updated below ---
     html_css = f"""
     <style>
@@ -97,20 +285,18 @@ def _write_file(path, content, title, file_format):
     </style>
     """
 
-    if file_format == 'md':
-        with open(path, 'w', encoding='utf-8') as f: f.write(content)
-        return
-
-    html_body = markdown.markdown(content, extensions=['fenced_code', 'codehilite', 'tables'])
-    full_html = f"<!DOCTYPE html><html><head><meta charset=\"UTF-8\"><title>{title}</title>{html_css}</head><body>{html_body}</body></html>"
+    return f"<!DOCTYPE html><html><head><meta charset=\"UTF-8\"><title>{title}</title>{html_css}</head><body>{html_body}</body></html>"
 
+def _write_document(path, full_html, file_format):
     if file_format == 'html':
         with open(path, 'w', encoding='utf-8') as f: f.write(full_html)
 
     elif file_format == 'pdf':
-        if not XHTML2PDF_AVAILABLE:
+        try:
+            from xhtml2pdf import pisa
+        except ImportError:
             raise ImportError("PDF export requires 'xhtml2pdf'. Please install it: pip install xhtml2pdf")
-        with open(path, "w+b") as pdf_file:
+        with open(path, "w+b") as pdf_file, timed("export.pdf_conversion"):
             pisa_status = pisa.CreatePDF(full_html.encode('utf-8'), dest=pdf_file, encoding='utf-8')
         if pisa_status.err:
             raise Exception(f"PDF conversion failed with error code {pisa_status.err}")
\ No newline at end of file
@@ -0,0 +1,145 @@
+# features/export_images.py
+"""
+Export-time image optimization.
+
+Screenshots are usually far larger than a report page can show. Before an HTML or
+PDF export, every local image the notes reference is downsampled to
+`export_image_max_width` pixels and re-encoded as whichever of JPEG/PNG (plus WebP
+for HTML) comes out smallest. Results are cached by source content hash, so an
+image is only processed again when it changes, and images are processed in parallel.
+
+Pillow is optional: without it images are used as they are.
+"""
+import base64
+import hashlib
+import io
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.logger import get_logger
+from utils.perf import timed, increment
+from utils.settings import get_settings_service
+
+log = get_logger(__name__)
+
+try:
+    from PIL import Image, features as pil_features
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+_MIME_TYPES = {
+    ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".gif": "image/gif",
+    ".webp": "image/webp", ".bmp": "image/bmp", ".svg": "image/svg+xml",
+}
+# What the output formats can display; xhtml2pdf has no WebP support
+_ALLOWED_FORMATS = {
+    "pdf": ("JPEG", "PNG"),
+    "html": ("WEBP", "JPEG", "PNG"),
+}
+_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def data_uri(path):
+    mime = _MIME_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+    with open(path, 'rb') as f:
+        return f"data:{mime};base64,{base64.b64encode(f.read()).decode('ascii')}"
+
+
+class ImageOptimizer:
+    """Turns local image paths into optimized cached copies for one export format."""
+
+    def __init__(self, file_format, max_width=None, quality=None, cache_dir=None):
+        settings = get_settings_service()
+        self.file_format = file_format
+        self.max_width = max_width or settings.get("export_image_max_width", 1600)
+        self.quality = quality or settings.get("export_image_quality", 82)
+        self.cache_dir = cache_dir or settings.get("export_image_cache_location")
+        formats = _ALLOWED_FORMATS.get(file_format, ("JPEG", "PNG"))
+        if PIL_AVAILABLE and not pil_features.check("webp"):
+            formats = tuple(f for f in formats if f != "WEBP")
+        self.formats = formats
+
+    def _cache_key(self, path):
+        params = f"{self.max_width}:{self.quality}:{','.join(self.formats)}"
+        return hashlib.sha1(f"{_file_hash(path)}:{params}".encode('utf-8')).hexdigest()
+
+    def optimize(self, path):
+        """Returns the path of the optimized image, or `path` itself if it can't be improved."""
+        if not PIL_AVAILABLE:
+            return path
+        key = self._cache_key(path)
+        for extension in set(_EXTENSIONS.values()) | {os.path.splitext(path)[1].lower()}:
+            cached = os.path.join(self.cache_dir, key + extension)
+            if os.path.exists(cached):
+                increment("export.images_cached")
+                return cached
+
+        try:
+            with Image.open(path) as image:
+                if getattr(image, "is_animated", False):
+                    return path
+                image.load()
+                original_format = image.format
+                resized = image.width > self.max_width
+                if resized:
+                    height = max(1, round(image.height * self.max_width / image.width))
+                    image = image.resize((self.max_width, height), Image.LANCZOS)
+                encoded = self._encode_candidates(image)
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            log.warning(f"Could not optimize image {path}: {e}")
+            return path
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        image_format, data = min(encoded.items(), key=lambda item: len(item[1]))
+        if not resized and original_format in self.formats and os.path.getsize(path) <= len(data):
+            # Already as small as it gets; cache a plain copy so the lookup above finds it
+            target = os.path.join(self.cache_dir, key + os.path.splitext(path)[1].lower())
+            temporary = f"{target}.{os.getpid()}.tmp"
+            shutil.copyfile(path, temporary)
+        else:
+            target = os.path.join(self.cache_dir, key + _EXTENSIONS[image_format])
+            temporary = f"{target}.{os.getpid()}.tmp"
+            with open(temporary, 'wb') as f:
+                f.write(data)
+        os.replace(temporary, target)
+        increment("export.images_optimized")
+        return target
+
+    def _encode_candidates(self, image):
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+        candidates = {}
+        for image_format in self.formats:
+            if image_format == "JPEG" and has_alpha:
+                continue
+            buffer = io.BytesIO()
+            if image_format == "JPEG":
+                image.convert("RGB").save(buffer, "JPEG", quality=self.quality, optimize=True, progressive=True)
+            elif image_format == "WEBP":
+                image.save(buffer, "WEBP", quality=self.quality, method=4)
+            else:
+                image.save(buffer, "PNG", optimize=True)
+            candidates[image_format] = buffer.getvalue()
+        return candidates
+
+    def optimize_all(self, paths, workers=None):
+        """Optimizes `paths` in parallel. Returns {original path: path to use}."""
+        paths = list(dict.fromkeys(paths))
+        if not paths:
+            return {}
+        workers = workers or min(8, os.cpu_count() or 1)
+        with timed("export.images"):
+            if workers > 1 and len(paths) > 1:
+                # Pillow releases the GIL while decoding and encoding, so threads suffice
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    return dict(zip(paths, pool.map(self.optimize, paths)))
+            return {path: self.optimize(path) for path in paths}
@@ -0,0 +1,310 @@
+# features/importer.py
+"""
+Bulk import of markdown directory trees and legacy JSON exports.
+
+Both importers feed StorageManager.bulk_insert(), which appends to the database in
+one transaction, so neither needs the existing notes in memory:
+
+- import_markdown_tree(): every directory holding .md files becomes a folder, notes
+  are ordered by filename (naturally, so "2" sorts before "10"). Files are parsed in
+  a process pool and local images they reference are copied into the image store.
+- import_json_file(): reads the {"folders": ..., "notes": ...} export format one entry
+  at a time instead of json.load()-ing the whole file.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import pathlib
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import unquote, urlparse
+
+from utils.logger import get_logger
+from utils.perf import timed
+from utils.settings import get_settings_service
+
+log = get_logger(__name__)
+
+MARKDOWN_EXTENSIONS = (".md", ".markdown")
+
+_IMAGE_REGEX = re.compile(r'(!\[[^\]\n]*\]\(\s*)<?([^)\s>]+)>?((?:\s+"[^"\n]*")?\s*\))')
+_HEADING_REGEX = re.compile(r'^#\s+(.+?)\s*#*\s*$')
+_NATURAL_SPLIT = re.compile(r'(\d+)')
+
+
+def natural_sort_key(name):
+    """Sort key under which "note 2" comes before "note 10"."""
+    return [int(part) if part.isdigit() else part.lower() for part in _NATURAL_SPLIT.split(name)]
+
+
+def scan_markdown_tree(root):
+    """
+    Returns [(folder_name, [file paths])] for every directory under `root` that holds
+    markdown files. Folder names are paths relative to `root` ("Client/Web"); files
+    directly in `root` go into a folder named after `root` itself.
+    """
+    root = os.path.abspath(root)
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted((d for d in dirnames if not d.startswith('.')), key=natural_sort_key)
+        files = sorted(
+            (f for f in filenames if f.lower().endswith(MARKDOWN_EXTENSIONS)), key=natural_sort_key
+        )
+        if not files:
+            continue
+        relative = os.path.relpath(dirpath, root)
+        name = os.path.basename(root) if relative == os.curdir else relative.replace(os.sep, "/")
+        found.append((name, [os.path.join(dirpath, f) for f in files]))
+    return found
+
+
+def _store_image(source, image_dir):
+    """Copies an image into the store under its content hash. Returns the stored path."""
+    digest = hashlib.sha1()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    extension = os.path.splitext(source)[1].lower()
+    target = os.path.join(image_dir, digest.hexdigest() + extension)
+    if not os.path.exists(target):
+        # Several workers may copy the same image; only a complete file is ever renamed into place
+        temporary = f"{target}.{os.getpid()}.tmp"
+        shutil.copyfile(source, temporary)
+        os.replace(temporary, target)
+    return target
+
+
+def _resolve_local_image(target, base_dir):
+    """Returns the local file an image link points at, or None for remote/missing images."""
+    parsed = urlparse(target)
+    if parsed.scheme == "file":
+        path = unquote(parsed.path)
+        if os.name == "nt" and path.startswith("/"):
+            path = path[1:]
+    elif parsed.scheme and len(parsed.scheme) > 1:
+        return None  # http(s), data: and the like stay as they are
+    else:
+        path = os.path.join(base_dir, unquote(target))
+    return path if os.path.isfile(path) else None
+
+
+def parse_markdown_file(path, image_dir=None):
+    """
+    Reads one markdown file. Returns (title, body, images_copied).
+    The title is the first "# heading", else the file name; with `image_dir`, local
+    images are copied into it and their links rewritten to file URIs.
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        body = f.read()
+    title = os.path.splitext(os.path.basename(path))[0]
+    for line in body.split('\n', 50)[:50]:
+        match = _HEADING_REGEX.match(line)
+        if match:
+            title = match.group(1)
+            break
+
+    copied = 0
+    if image_dir:
+        base_dir = os.path.dirname(path)
+
+        def relink(match):
+            nonlocal copied
+            source = _resolve_local_image(match.group(2), base_dir)
+            if source is None:
+                return match.group(0)
+            try:
+                stored = _store_image(source, image_dir)
+            except OSError as e:
+                log.warning(f"Could not copy image {source}: {e}")
+                return match.group(0)
+            copied += 1
+            return f"{match.group(1)}{pathlib.Path(stored).as_uri()}{match.group(3)}"
+
+        body = _IMAGE_REGEX.sub(relink, body)
+    return title, body, copied
+
+
+def _parse_job(args):
+    """Runs in a worker process."""
+    folder_key, order, path, image_dir = args
+    try:
+        return (folder_key, order, *parse_markdown_file(path, image_dir), None)
+    except OSError as e:
+        return folder_key, order, None, None, 0, f"{path}: {e}"
+
+
+def import_markdown_tree(storage, root, copy_images=True, workers=None, progress=None):
+    """
+    Imports a directory tree of markdown files into `storage`.
+    `progress(done, total)` is called as files are written. Returns a summary dict.
+    """
+    tree = scan_markdown_tree(root)
+    folders = {index: name for index, (name, _) in enumerate(tree)}
+    jobs = []
+    image_dir = None
+    if copy_images:
+        image_dir = get_settings_service().get("image_store_location")
+        os.makedirs(image_dir, exist_ok=True)
+    for index, (_, paths) in enumerate(tree):
+        jobs.extend((index, order, path, image_dir) for order, path in enumerate(paths))
+    total = len(jobs)
+    summary = {"files": total, "images": 0, "errors": []}
+
+    def parsed(results):
+        for folder_key, order, title, body, copied, error in results:
+            if error:
+                summary["errors"].append(error)
+                continue
+            summary["images"] += copied
+            yield folder_key, order, title, body
+
+    workers = workers or os.cpu_count() or 1
+    with timed("import.markdown_tree"):
+        if workers > 1 and total > 1:
+            # Spawned rather than forked: the GUI calls this from a thread of a Qt process
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                def results():
+                    # Submitted a window at a time so parsed bodies don't pile up
+                    # in memory while the database is being written
+                    window = workers * 64
+                    for start in range(0, total, window):
+                        yield from pool.map(_parse_job, jobs[start:start + window], chunksize=16)
+
+                summary["folders"], summary["notes"] = storage.bulk_insert(
+                    folders, parsed(results()), lambda done: progress and progress(done, total)
+                )
+        else:
+            summary["folders"], summary["notes"] = storage.bulk_insert(
+                folders, parsed(map(_parse_job, jobs)), lambda done: progress and progress(done, total)
+            )
+    for error in summary["errors"]:
+        log.warning(f"Skipped unreadable file {error}")
+    log.info(f"Imported {summary['notes']} markdown file(s) from {root} with {summary['images']} image(s).")
+    return summary
+
+
+# ---------------- Streaming JSON ----------------------------------
+
+class _JsonStream:
+    """Decodes a JSON document piece by piece from a text file."""
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        # Grows with the pending value so a huge note body isn't re-scanned chunk by chunk
+        chunk = self.f.read(max(self.CHUNK_SIZE, len(self.buffer) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Returns the next non-whitespace character without consuming it ('' at the end)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in JSON, found '{self.peek()}'.")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete value, reading more of the file as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """Yields (key, stream) for each member of the object starting here; the caller reads the value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key, self
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+
+def iter_json_export(f):
+    """
+    Yields ("folder", id, folder) and ("note", id, note) entries of a JSON export, in
+    file order, holding only one entry in memory at a time. Other members are skipped.
+    """
+    stream = _JsonStream(f)
+    for section, _ in stream.items():
+        if section in ("folders", "notes") and stream.peek() == "{":
+            kind = section[:-1]
+            for entry_id, _ in stream.items():
+                yield kind, str(entry_id), stream.value()
+        else:
+            stream.value()
+
+
+def import_json_file(storage, path, progress=None):
+    """
+    Imports a PieceNote/CyberNotes JSON export into `storage` as new folders.
+    `progress(done, total)` reports notes written against an unknown (None) total.
+    Returns a summary dict.
+    """
+    folders = {}
+    placement = {}
+    early_notes = []
+    summary = {"notes": 0, "skipped": 0}
+
+    def place(folder):
+        return folder["notes"] if isinstance(folder.get("notes"), list) else []
+
+    def notes(f):
+        for kind, entry_id, entry in iter_json_export(f):
+            if kind == "folder":
+                folders[entry_id] = entry.get("name") or entry_id
+                for order, note_id in enumerate(place(entry)):
+                    placement[str(note_id)] = (entry_id, order)
+            elif entry_id in placement:
+                yield (*placement[entry_id], entry.get("title") or "Untitled", entry.get("body") or "")
+            else:
+                # Notes written before the folders: kept until the folders have been read
+                early_notes.append((entry_id, entry))
+        for entry_id, entry in early_notes:
+            if entry_id in placement:
+                yield (*placement[entry_id], entry.get("title") or "Untitled", entry.get("body") or "")
+            else:
+                summary["skipped"] += 1
+
+    with open(path, 'r', encoding='utf-8') as f, timed("import.json"):
+        summary["folders"], summary["notes"] = storage.bulk_insert(
+            folders, notes(f), lambda done: progress and progress(done, None)
+        )
+    if summary["skipped"]:
+        log.warning(f"{summary['skipped']} note(s) in {path} belong to no folder and were skipped.")
+    log.info(f"Imported {summary['notes']} note(s) in {summary['folders']} folder(s) from {path}.")
+    return summary
@@ -0,0 +1,130 @@
+import json
+import os
+from utils.logger import get_logger
+
+log = get_logger(__name__)
+
+
+class EditJournal:
+    """
+    Append-only recovery log of editor changes made since the last successful save.
+
+    Each record is one JSON line describing a single document change:
+    {"n": note_id, "p": position, "r": chars_removed, "a": added_text, "l": new_length}
+    Positions and counts are in code points, as Python slices strings, not in the
+    UTF-16 code units Qt reports them in.
+    Records are buffered in memory and written with a single fsync per flush, so
+    per-keystroke durability costs a few bytes instead of a database rewrite.
+    After a crash, replaying the records on top of the saved note bodies
+    reproduces the unsaved editor contents.
+    """
+
+    # Flush immediately once this much data is buffered, e.g. after a large paste
+    MAX_PENDING_BYTES = 64 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self._pending = []
+        self._pending_bytes = 0
+        self._file = None
+
+    def record(self, note_id, position, chars_removed, added_text, new_length):
+        line = json.dumps(
+            {"n": note_id, "p": position, "r": chars_removed, "a": added_text, "l": new_length},
+            separators=(',', ':'), ensure_ascii=False
+        ) + "\n"
+        self._pending.append(line)
+        self._pending_bytes += len(line)
+        if self._pending_bytes >= self.MAX_PENDING_BYTES:
+            self.flush()
+
+    def flush(self):
+        """Writes buffered records to disk and fsyncs them."""
+        if not self._pending:
+            return
+        try:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write("".join(self._pending))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError as e:
+            log.error(f"Could not write edit journal: {e}")
+        self._pending = []
+        self._pending_bytes = 0
+
+    def retain(self, note_ids):
+        """
+        Drops the records of every note not in `note_ids`, called after a successful
+        save when those notes' changes are safely in the database.
+        """
+        note_ids = set(note_ids)
+        self.flush()
+        self._close()
+        try:
+            if not note_ids:
+                if os.path.exists(self.path):
+                    open(self.path, 'w').close()
+                return
+            kept = [line for note_id, line in self._read_lines() if note_id in note_ids]
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write("".join(kept))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.error(f"Could not compact edit journal: {e}")
+
+    def clear(self):
+        self._pending = []
+        self._pending_bytes = 0
+        self.retain(())
+
+    def close(self):
+        self.flush()
+        self._close()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read_lines(self):
+        """Yields (note_id, raw_line) for every complete record in the journal file."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final write from the crash; everything before it is intact.
+                    break
+                yield record["n"], line
+
+    def replay(self, notes):
+        """
+        Applies the journal to the saved note bodies in `notes` ({note_id: {"body": ...}}).
+        Returns {note_id: recovered_body} for notes whose content differs from the saved one.
+        Notes whose records don't line up with the saved body are skipped.
+        """
+        bodies = {}
+        broken = set()
+        for note_id, line in self._read_lines():
+            if note_id in broken or note_id not in notes:
+                continue
+            record = json.loads(line)
+            text = bodies.get(note_id, notes[note_id].get("body") or "")
+            position = min(record["p"], len(text))
+            text = text[:position] + record["a"] + text[position + record["r"]:]
+            if len(text) != record["l"]:
+                log.warning(f"Edit journal for note {note_id} is inconsistent; skipping its recovery.")
+                broken.add(note_id)
+                bodies.pop(note_id, None)
+                continue
+            bodies[note_id] = text
+        return {
+            note_id: body for note_id, body in bodies.items()
+            if body != (notes[note_id].get("body") or "")
+        }
@@ -0,0 +1,168 @@
+# features/maintenance.py
+"""
+Background database maintenance.
+
+The work is split into short steps so it can run a piece at a time while the
+application is idle, rather than as one blocking pass at startup:
+
+  quick_check:<table>  PRAGMA quick_check of one table and its indexes
+  analyze              ANALYZE on first run, PRAGMA optimize afterwards
+  incremental_vacuum   returns free pages to the file system, once the database is in
+                       incremental auto-vacuum mode; switching an older file to it
+                       takes a full rebuild, left to StorageManager.vacuum()
+
+Each step is due again `maintenance_interval_minutes` after it last ran; its outcome
+is stored in the maintenance_runs table.
+"""
+import sqlite3
+import time
+
+from utils.logger import get_logger
+from utils.perf import timed
+from utils.settings import get_settings_service
+
+log = get_logger(__name__)
+
+CHECK_PREFIX = "quick_check:"
+STEP_ANALYZE = "analyze"
+STEP_VACUUM = "incremental_vacuum"
+
+# PRAGMA quick_check(<table>) needs SQLite 3.33; older versions check the whole file at once
+_PER_TABLE_CHECKS = sqlite3.sqlite_version_info >= (3, 33, 0)
+# Pages released per incremental_vacuum step (4 MiB at the default page size)
+VACUUM_PAGES_PER_STEP = 1024
+# Free pages tolerated before an incremental vacuum is worth it
+VACUUM_MIN_FREE_PAGES = 64
+
+
+class DatabaseMaintenance:
+    def __init__(self, storage):
+        self.storage = storage
+
+    def _connect(self):
+        # Waits for a save in progress instead of failing straight away
+        return sqlite3.connect(self.storage.filepath, timeout=30)
+
+    def all_steps(self, conn):
+        if not _PER_TABLE_CHECKS:
+            checks = ["quick_check"]
+        else:
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )]
+            checks = [CHECK_PREFIX + table for table in tables]
+        return checks + [STEP_ANALYZE, STEP_VACUUM]
+
+    def due_steps(self, conn=None, interval=None):
+        """
+        Returns the steps whose last run is older than `interval` seconds (by default
+        the maintenance_interval_minutes setting), oldest first.
+        """
+        own = conn is None
+        conn = conn or self._connect()
+        try:
+            if interval is None:
+                interval = get_settings_service().get("maintenance_interval_minutes", 360) * 60
+            last_runs = dict(conn.execute("SELECT task, run_at FROM maintenance_runs"))
+            now = time.time()
+            due = [step for step in self.all_steps(conn) if now - last_runs.get(step, 0) >= interval]
+            return sorted(due, key=lambda step: last_runs.get(step, 0))
+        finally:
+            if own:
+                conn.close()
+
+    def last_runs(self):
+        """Returns [{task, run_at, duration_ms, ok, result}] for every step that has run."""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "SELECT task, run_at, duration_ms, ok, result FROM maintenance_runs ORDER BY task"
+            )
+            return [
+                {"task": task, "run_at": run_at, "duration_ms": duration_ms, "ok": bool(ok), "result": result}
+                for task, run_at, duration_ms, ok, result in cursor
+            ]
+        finally:
+            conn.close()
+
+    def run_next(self, interval=None):
+        """Runs the most overdue step. Returns its result dict, or None if nothing is due."""
+        conn = self._connect()
+        try:
+            due = self.due_steps(conn, interval)
+            return self._run(conn, due[0]) if due else None
+        finally:
+            conn.close()
+
+    def run_all(self, force=False):
+        """Runs every step (or only the due ones) back to back. Returns their results."""
+        conn = self._connect()
+        try:
+            steps = self.all_steps(conn) if force else self.due_steps(conn)
+            return [self._run(conn, step) for step in steps]
+        finally:
+            conn.close()
+
+    def _run(self, conn, step):
+        started = time.perf_counter()
+        corrupt = False
+        try:
+            with timed(f"maintenance.{step.split(':')[0]}"):
+                if step == STEP_ANALYZE:
+                    ok, result = self._analyze(conn)
+                elif step == STEP_VACUUM:
+                    ok, result = self._incremental_vacuum(conn)
+                else:
+                    ok, result = self._quick_check(conn, step[len(CHECK_PREFIX):] if ":" in step else None)
+                    corrupt = not ok
+        except sqlite3.OperationalError as e:
+            # Usually "database is locked": not recorded, so the step is retried at the next idle period
+            log.warning(f"Maintenance {step} postponed: {e}")
+            return {"task": step, "ok": False, "result": str(e), "duration_ms": 0, "corrupt": False, "postponed": True}
+        except sqlite3.DatabaseError as e:
+            ok, result, corrupt = False, str(e), True
+        if corrupt:
+            self.storage.corruption_detected = True
+        duration_ms = (time.perf_counter() - started) * 1000
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO maintenance_runs (task, run_at, duration_ms, ok, result) VALUES (?, ?, ?, ?, ?)",
+                (step, time.time(), duration_ms, int(ok), result)
+            )
+            conn.commit()
+        except sqlite3.DatabaseError as e:
+            log.warning(f"Could not record maintenance step {step}: {e}")
+        (log.info if ok else log.error)(f"Maintenance {step}: {result} ({duration_ms:.0f} ms)")
+        return {"task": step, "ok": ok, "result": result, "duration_ms": duration_ms, "corrupt": corrupt}
+
+    def _quick_check(self, conn, table=None):
+        pragma = f'PRAGMA quick_check("{table}")' if table else "PRAGMA quick_check"
+        problems = [row[0] for row in conn.execute(pragma)]
+        if problems == ["ok"]:
+            return True, "ok"
+        return False, "; ".join(problems[:10])
+
+    def _analyze(self, conn):
+        has_stats = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+        ).fetchone()
+        if has_stats:
+            # Re-analyzes only the tables whose contents changed noticeably
+            conn.execute("PRAGMA optimize")
+            return True, "optimized"
+        conn.execute("ANALYZE")
+        conn.commit()
+        return True, "analyzed"
+
+    def _incremental_vacuum(self, conn):
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Switching modes takes a full VACUUM, too long to start unasked while idle
+            return True, "not in incremental mode; compact the database once to switch"
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if free_pages < VACUUM_MIN_FREE_PAGES:
+            return True, f"{free_pages} free page(s), nothing to do"
+        # The pragma releases one page per step; executescript() steps it to completion,
+        # where execute() would stop after the first page
+        conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP});")
+        remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return True, f"released {free_pages - remaining} of {free_pages} free page(s)"
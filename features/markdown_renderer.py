@@ -0,0 +1,92 @@
+import re
+from functools import lru_cache
+
+from features.checklists import extract_tasks
+
+# markdown, pymdownx and pygments are imported on first use rather than at module
+# load, so opening the main window doesn't pay for them before a note is shown.
+
+# Wraps a task's source line number while the markdown is converted (private-use characters)
+_LINE_MARKER = re.compile('(\\d+)')
+
+
+@lru_cache(maxsize=None)
+def get_pygments_css(style='monokai'):
+    """Returns the syntax highlighting CSS for code blocks, computed once per style."""
+    from pygments.formatters import HtmlFormatter
+    return HtmlFormatter(style=style).get_style_defs('.codehilite')
+
+
+@lru_cache(maxsize=None)
+def _task_line_extension():
+    """
+    Builds the extension that tags every rendered checklist item with the 0-based
+    source line it came from: <li class="task-list-item" data-line="12">.
+    """
+    from markdown.extensions import Extension
+    from markdown.preprocessors import Preprocessor
+    from markdown.treeprocessors import Treeprocessor
+
+    class TaskLinePreprocessor(Preprocessor):
+        # Runs before fenced code blocks are stashed, while lines still match the source
+        def run(self, lines):
+            for line_no, _, _ in extract_tasks('\n'.join(lines)):
+                line = lines[line_no]
+                # Placed right after the checkbox, where it can't end up inside a code span
+                start = line.index(']', line.index('[')) + 1
+                while start < len(line) and line[start] in ' \t':
+                    start += 1
+                lines[line_no] = f"{line[:start]}{line_no}{line[start:]}"
+            return lines
+
+    class TaskLineTreeprocessor(Treeprocessor):
+        def run(self, root):
+            self._visit(root, [])
+
+        def _visit(self, element, ancestors):
+            chain = ancestors + [element]
+            if element.text and '' in element.text:
+                element.text = self._take(element.text, chain)
+            for child in element:
+                self._visit(child, chain)
+                if child.tail and '' in child.tail:
+                    child.tail = self._take(child.tail, chain)
+
+        def _take(self, text, chain):
+            match = _LINE_MARKER.search(text)
+            if match:
+                for owner in reversed(chain):
+                    if owner.tag == 'li' and 'task-list-item' in owner.get('class', '').split():
+                        owner.set('data-line', match.group(1))
+                        break
+            # Keeps AtomicString text atomic
+            return type(text)(_LINE_MARKER.sub('', text))
+
+    class TaskLineExtension(Extension):
+        def extendMarkdown(self, md):
+            md.preprocessors.register(TaskLinePreprocessor(md), 'task-lines', 35)
+            # After the inline patterns (20), before the output is serialized
+            md.treeprocessors.register(TaskLineTreeprocessor(md), 'task-lines', 15)
+
+    return TaskLineExtension
+
+
+def render_preview_markdown(text):
+    """
+    Renders note markdown to an HTML fragment the way the editor preview shows it.
+    Checklist items carry the source line they toggle as a data-line attribute.
+    """
+    import markdown
+    from markdown.extensions.fenced_code import FencedCodeExtension
+    from markdown.extensions.tables import TableExtension
+    from pymdownx.tasklist import TasklistExtension
+
+    md_extensions = [
+        FencedCodeExtension(),
+        TableExtension(),
+        # Clickable: the preview toggles the source line through the web channel
+        TasklistExtension(custom_checkbox=True, clickable_checkbox=True),
+        _task_line_extension()()
+    ]
+    # Markers that ended up somewhere unexpected, e.g. a raw HTML block, are dropped
+    return _LINE_MARKER.sub('', markdown.markdown(text, extensions=md_extensions))
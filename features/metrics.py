@@ -0,0 +1,15 @@
+import re
+
+_IMAGE_REGEX = re.compile(r'!\[.*?\]\(.*?\)')
+_LINK_REGEX = re.compile(r'https?://[^\s)]+')
+
+
+def compute_text_metrics(text):
+    """Returns the word, character, line, image and link counts shown in the status bar."""
+    return {
+        "words": len(text.split()) if text else 0,
+        "chars": len(text),
+        "lines": text.count('\n') + 1 if text else 0,
+        "images": len(_IMAGE_REGEX.findall(text)),
+        "links": len(_LINK_REGEX.findall(text))
+    }
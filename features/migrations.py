@@ -0,0 +1,232 @@
+# features/migrations.py
+"""
+Versioned schema migrations.
+
+The schema version is kept in SQLite's `PRAGMA user_version`. Each migration runs
+in its own transaction together with the version bump, so a failure leaves the
+database at the previous version. Databases created before versioning report
+version 0; migration 1 only creates what they may be missing.
+
+To change the schema, append a function to MIGRATIONS; never edit one that has shipped.
+"""
+import hashlib
+import time
+import uuid
+
+from utils.logger import get_logger
+
+log = get_logger(__name__)
+
+
+class SchemaVersionError(Exception):
+    """The database was written by a newer PieceNote than this one."""
+    pass
+
+
+def _base_schema(cursor):
+    """The tables as they were before versioning."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS folders (
+            folder_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS notes (
+            note_id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            body TEXT,
+            folder_id INTEGER NOT NULL,
+            sort_order INTEGER NOT NULL,
+            FOREIGN KEY (folder_id) REFERENCES folders (folder_id) ON DELETE CASCADE
+        )
+    """)
+    # Tracks which version of each note body a derived index was built from,
+    # so indexes are only rebuilt for notes that actually changed.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS index_state (
+            indexer TEXT NOT NULL,
+            note_id INTEGER NOT NULL,
+            body_hash TEXT NOT NULL,
+            PRIMARY KEY (indexer, note_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS note_references (
+            note_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            line INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_note_references_value ON note_references (value, kind)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_note_references_note ON note_references (note_id)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS note_tasks (
+            note_id INTEGER NOT NULL,
+            line INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            checked INTEGER NOT NULL,
+            PRIMARY KEY (note_id, line)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_note_tasks_checked ON note_tasks (checked, note_id)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS note_revisions (
+            revision_id INTEGER PRIMARY KEY,
+            note_id INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            is_snapshot INTEGER NOT NULL,
+            body_hash TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_note_revisions_note ON note_revisions (note_id, revision_id)")
+    # Last outcome of each background maintenance step (see features/maintenance.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_runs (
+            task TEXT PRIMARY KEY,
+            run_at REAL NOT NULL,
+            duration_ms REAL NOT NULL,
+            ok INTEGER NOT NULL,
+            result TEXT
+        )
+    """)
+
+
+def _listing_indexes(cursor):
+    """Indexes for folder listings and the note/folder joins used by search and export."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notes_folder ON notes (folder_id, sort_order)")
+
+
+def _timestamps(cursor):
+    """created_at/updated_at columns, so callers can ask what changed since a given time."""
+    now = time.time()
+    cursor.execute("ALTER TABLE notes ADD COLUMN created_at REAL")
+    cursor.execute("ALTER TABLE notes ADD COLUMN updated_at REAL")
+    cursor.execute("ALTER TABLE folders ADD COLUMN updated_at REAL")
+    cursor.execute("UPDATE notes SET created_at = ?, updated_at = ?", (now, now))
+    cursor.execute("UPDATE folders SET updated_at = ?", (now,))
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notes_updated ON notes (updated_at)")
+
+
+def _row_versions(cursor):
+    """Per-row change counters, so a save can tell rows another process changed since it read them."""
+    cursor.execute("ALTER TABLE notes ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    cursor.execute("ALTER TABLE folders ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+
+# Namespace for the uuids _merge_keys derives; changing it would break merges across upgrades
+_UUID_NAMESPACE = uuid.UUID("6f1c2a4e-8d3b-5e7f-9a10-2b3c4d5e6f70")
+
+
+def _merge_keys(cursor):
+    """
+    A uuid per note and folder that stays the same across databases, and a hash of each
+    note body, so StorageManager.merge_from() can compare two files without reading bodies.
+
+    Existing rows get uuids derived from what they hold rather than random ones: a folder's
+    from its name, a note's from its folder's name, its title and its place among the notes
+    sharing both, in creation order. Two copies of one database upgraded separately then
+    agree on every uuid, so a merge matches their notes instead of adding them all again;
+    a note renamed in only one copy before the upgrade is the exception. Rows created later
+    get random uuids.
+    """
+    cursor.execute("ALTER TABLE notes ADD COLUMN uuid TEXT")
+    cursor.execute("ALTER TABLE notes ADD COLUMN body_hash TEXT")
+    cursor.execute("ALTER TABLE folders ADD COLUMN uuid TEXT")
+    cursor.execute("SELECT folder_id, name FROM folders")
+    cursor.executemany(
+        "UPDATE folders SET uuid = ? WHERE folder_id = ?",
+        [(uuid.uuid5(_UUID_NAMESPACE, f"folder\0{name}").hex, folder_id) for folder_id, name in cursor.fetchall()],
+    )
+    cursor.execute("""
+        SELECT n.note_id, COALESCE(f.name, ''), n.title FROM notes n
+        LEFT JOIN folders f ON f.folder_id = n.folder_id
+        ORDER BY n.note_id
+    """)
+    seen = {}
+    note_uuids = []
+    for note_id, folder_name, title in cursor.fetchall():
+        occurrence = seen.get((folder_name, title), 0)
+        seen[(folder_name, title)] = occurrence + 1
+        key = f"note\0{folder_name}\0{title}\0{occurrence}"
+        note_uuids.append((uuid.uuid5(_UUID_NAMESPACE, key).hex, note_id))
+    cursor.executemany("UPDATE notes SET uuid = ? WHERE note_id = ?", note_uuids)
+    cursor.connection.create_function(
+        "piecenote_sha1", 1, lambda text: hashlib.sha1(text.encode('utf-8')).hexdigest(), deterministic=True
+    )
+    cursor.execute("UPDATE notes SET body_hash = piecenote_sha1(COALESCE(body, ''))")
+    # Covers everything a merge compares: the columns added above sit behind the body
+    # in each row, where reading them would mean walking the body's overflow pages.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notes_uuid ON notes (uuid, body_hash, updated_at, title)")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_folders_uuid ON folders (uuid)")
+
+
+def _ordered_list_tasks(cursor):
+    """
+    Forgets the task index of notes that may hold "1. [ ] task" items, which it used to
+    miss; StorageManager rebuilds the index of such notes when it opens the database.
+    """
+    cursor.execute("""
+        DELETE FROM index_state WHERE indexer = 'tasks'
+        AND note_id IN (SELECT note_id FROM notes WHERE body GLOB '*[0-9][.)]*[[][ xX]]*')
+    """)
+
+
+# Position in this list + 1 is the schema version a migration produces.
+MIGRATIONS = [
+    _base_schema,
+    _listing_indexes,
+    _timestamps,
+    _row_versions,
+    _merge_keys,
+    _ordered_list_tasks,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def pending_migrations(conn):
+    """Returns the (version, migration) pairs not yet applied to `conn`."""
+    current = schema_version(conn)
+    return [(version, migration) for version, migration in enumerate(MIGRATIONS, start=1) if version > current]
+
+
+def apply_migrations(conn):
+    """
+    Applies every pending migration in order. Returns the resulting version.
+    Raises SchemaVersionError if the database was written by a newer PieceNote.
+    """
+    current = schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"Database schema version {current} is newer than this PieceNote supports ({SCHEMA_VERSION})."
+        )
+    if current == 0:
+        # Only takes effect on a new, empty file; existing ones are converted by StorageManager.vacuum()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # explicit transactions, DDL included
+    try:
+        for version, migration in pending_migrations(conn):
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                migration(cursor)
+                cursor.execute(f"PRAGMA user_version = {version}")
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                log.error(f"Schema migration to version {version} ({migration.__name__}) failed.")
+                raise
+            log.info(f"Database schema migrated to version {version} ({migration.__name__}).")
+    finally:
+        conn.isolation_level = isolation_level
+    return schema_version(conn)
@@ -0,0 +1,396 @@
+# features/output_filters.py
+"""
+Post-processing of command output before it is inserted into a note.
+
+Output is read from the process as it arrives and pushed line by line through a
+chain of filters, so a command that prints megabytes never has to be held in memory
+and the note only receives what is worth keeping:
+
+  CarriageReturnFilter   keeps the final state of progress bars redrawn with \\r
+  AnsiFilter             removes color codes and other terminal escape sequences
+  DuplicateFilter        folds runs of identical lines into one plus a count
+  HeadTailFilter         keeps the first and last lines, with a count of those elided
+
+Lines longer than `command_output_max_line_chars` are cut while they arrive. A filter
+takes lines through feed() and returns the lines it lets through, possibly later from
+finish(). Tool-specific parsers sit in front of the chain: one whose
+`matches(command)` is true gets the raw lines first and may replace the fenced block
+with markdown of its own (see NmapXmlParser). Add parsers to PARSERS.
+"""
+import codecs
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from collections import deque
+
+from utils.logger import get_logger
+from utils.perf import timed, increment
+from utils.settings import get_settings_service
+
+log = get_logger(__name__)
+
+READ_CHUNK_BYTES = 64 * 1024
+# CSI sequences (colors, cursor movement), OSC sequences (window titles, links), other escapes
+_ANSI_REGEX = re.compile(r'\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[@-Z\\-_]')
+# Control characters left over after the escapes are gone; tabs stay
+_CONTROL_REGEX = re.compile(r'[\x00-\x08\x0b-\x1f\x7f]')
+
+
+class OutputFilter:
+    """Passes every line through unchanged; subclasses override feed() and finish()."""
+
+    def feed(self, line):
+        return [line]
+
+    def finish(self):
+        return []
+
+
+class CarriageReturnFilter(OutputFilter):
+    def feed(self, line):
+        line = line.rstrip('\r')
+        return [line[line.rfind('\r') + 1:]]
+
+
+class AnsiFilter(OutputFilter):
+    def feed(self, line):
+        if '\x1b' in line:
+            line = _ANSI_REGEX.sub('', line)
+        return [_CONTROL_REGEX.sub('', line)]
+
+
+class DuplicateFilter(OutputFilter):
+    """Folds consecutive identical lines: the line once, then how often it repeated."""
+
+    def __init__(self):
+        self.previous = None
+        self.repeats = 0
+
+    def _flush(self):
+        if not self.repeats:
+            return []
+        lines = [f"[... previous line repeated {self.repeats} more time(s)]"]
+        self.repeats = 0
+        return lines
+
+    def feed(self, line):
+        if line == self.previous:
+            self.repeats += 1
+            return []
+        lines = self._flush()
+        self.previous = line
+        lines.append(line)
+        return lines
+
+    def finish(self):
+        return self._flush()
+
+
+class HeadTailFilter(OutputFilter):
+    """Lets the first `head` lines through at once and holds back the last `tail` until the end."""
+
+    def __init__(self, head, tail):
+        self.head = head
+        self.tail = deque(maxlen=tail) if tail else None
+        self.seen = 0
+
+    def feed(self, line):
+        self.seen += 1
+        if self.seen <= self.head:
+            return [line]
+        if self.tail is not None:
+            self.tail.append(line)
+        return []
+
+    def finish(self):
+        kept_tail = list(self.tail) if self.tail is not None else []
+        elided = self.seen - self.head - len(kept_tail)
+        if elided <= 0:
+            return kept_tail
+        increment("command_output.lines_elided", elided)
+        return [f"[... {elided} line(s) omitted ...]"] + kept_tail
+
+
+class FilterChain:
+    """
+    Splits decoded text into lines and feeds them through a list of filters, collecting
+    what comes out. Lines are cut at `max_line_chars` while they are still arriving,
+    so a command that prints megabytes without a newline costs no more than that.
+    """
+
+    def __init__(self, filters, parser=None, max_line_chars=2000):
+        self.filters = filters
+        self.parser = parser
+        self.max_line_chars = max_line_chars
+        self.lines = []
+        # Lines read so far, before filtering
+        self.received = 0
+        # The line still arriving, in pieces, and how many of its characters were dropped
+        self._pending = []
+        self._pending_size = 0
+        self._dropped = 0
+        self._pending_cr = False
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        # A reader thread may still be feeding when the command is given up on
+        self._lock = threading.Lock()
+        self._finished = False
+
+    def feed_bytes(self, data):
+        with self._lock:
+            if not self._finished:
+                self.feed_text(self._decoder.decode(data))
+
+    def feed_text(self, text):
+        *complete, rest = text.split('\n')
+        if complete:
+            self._add_pending(complete[0])
+            complete[0] = self._take_pending()
+            self.received += len(complete)
+            for line in complete:
+                if len(line) > self.max_line_chars:
+                    line = self._cut(line[:self.max_line_chars], len(line) - self.max_line_chars)
+                self._push(line)
+        self._add_pending(rest)
+
+    def _add_pending(self, text):
+        if not text:
+            return
+        # A progress bar redrawn with \r only needs what follows the last \r that has
+        # text after it; trailing ones may still be the first half of \r\n
+        stripped = text.rstrip('\r')
+        cut = stripped.rfind('\r')
+        if cut >= 0 or (stripped and self._pending_cr):
+            self._pending, self._pending_size, self._dropped = [], 0, 0
+            text = text[cut + 1:]
+        self._pending_cr = text.endswith('\r')
+        room = self.max_line_chars - self._pending_size
+        if len(text) > room:
+            self._dropped += len(text) - max(room, 0)
+            text = text[:max(room, 0)]
+        self._pending.append(text)
+        self._pending_size += len(text)
+
+    def _take_pending(self):
+        line = "".join(self._pending)
+        if self._dropped:
+            line = self._cut(line, self._dropped)
+        self._pending, self._pending_size, self._dropped = [], 0, 0
+        self._pending_cr = False
+        return line
+
+    @staticmethod
+    def _cut(line, dropped):
+        return f"{line} [... {dropped} more characters]"
+
+    def _push(self, line, start=0):
+        if start == 0 and self.parser is not None:
+            given_up = self.parser.feed(line)
+            if given_up is None:
+                return
+            # Too much for the parser: what it held goes through the filters as text
+            self.parser = None
+            for held in given_up:
+                self._push(held)
+            return
+        lines = [line]
+        for output_filter in self.filters[start:]:
+            lines = [out for each in lines for out in output_filter.feed(each)]
+            if not lines:
+                return
+        self.lines.extend(lines)
+
+    def finish(self):
+        """Flushes the last partial line and every filter. Returns the collected lines."""
+        with self._lock:
+            self._finished = True
+        self._add_pending(self._decoder.decode(b"", final=True))
+        if self._pending_size or self._dropped:
+            self.received += 1
+            self._push(self._take_pending())
+        if self.parser is not None:
+            parser, self.parser = self.parser, None
+            # Output the parser could not use goes through the normal chain instead
+            for line in parser.finish():
+                self._push(line)
+        for index, output_filter in enumerate(self.filters):
+            for line in output_filter.finish():
+                self._push(line, index + 1)
+        return self.lines
+
+
+def default_filters():
+    settings = get_settings_service()
+    return [
+        CarriageReturnFilter(),
+        AnsiFilter(),
+        DuplicateFilter(),
+        HeadTailFilter(
+            settings.get("command_output_head_lines", 200), settings.get("command_output_tail_lines", 200)
+        ),
+    ]
+
+
+# ---------------- Tool parsers ----------------------------------
+
+class NmapXmlParser:
+    """Turns `nmap -oX -` output into a markdown table of hosts and ports."""
+    # The XML of a large scan is held until it is complete; beyond this it is treated as text
+    MAX_BYTES = 32 * 1024 * 1024
+
+    @staticmethod
+    def matches(command):
+        return re.search(r'\bnmap\b', command) is not None and re.search(r'-oX\s*-(\s|$)', command) is not None
+
+    def __init__(self):
+        self.lines = []
+        self.size = 0
+        self.markdown = None
+
+    def feed(self, line):
+        """Holds the line; returns everything held once the output is too large to parse, else None."""
+        self.lines.append(line)
+        self.size += len(line)
+        if self.size > self.MAX_BYTES:
+            lines, self.lines = self.lines, []
+            return lines
+        return None
+
+    def finish(self):
+        """Returns the lines to treat as plain output: none if the table was built."""
+        try:
+            self.markdown = self._table(ElementTree.fromstring("\n".join(self.lines)))
+            return []
+        except ElementTree.ParseError as e:
+            log.info(f"nmap output is not complete XML, kept as text: {e}")
+        return self.lines
+
+    @staticmethod
+    def _cell(text):
+        return (text or "").replace("|", "\\|").strip() or "-"
+
+    def _table(self, root):
+        rows = []
+        hosts_up = 0
+        for host in root.iter("host"):
+            status = host.find("status")
+            if status is not None and status.get("state") != "up":
+                continue
+            hosts_up += 1
+            address = next((a.get("addr") for a in host.iter("address") if a.get("addrtype") != "mac"), "?")
+            hostname = host.find("hostnames/hostname")
+            label = f"{address} ({hostname.get('name')})" if hostname is not None else address
+            ports = host.findall("ports/port")
+            if not ports:
+                rows.append((label, "-", "-", "-", "-"))
+            for port in ports:
+                state = port.find("state")
+                service = port.find("service")
+                version = ""
+                if service is not None:
+                    version = " ".join(filter(None, (
+                        service.get("product"), service.get("version"), service.get("extrainfo")
+                    )))
+                rows.append((
+                    label,
+                    f"{port.get('portid')}/{port.get('protocol')}",
+                    state.get("state") if state is not None else "",
+                    service.get("name") if service is not None else "",
+                    version,
+                ))
+        lines = [f"**nmap:** {hosts_up} host(s) up", "", "| Host | Port | State | Service | Version |",
+                 "|---|---|---|---|---|"]
+        lines.extend("| " + " | ".join(self._cell(cell) for cell in row) + " |" for row in rows)
+        return "\n".join(lines)
+
+
+# Parsers tried in order; the first whose matches(command) is true handles stdout
+PARSERS = [NmapXmlParser]
+
+
+def parser_for(command):
+    for parser in PARSERS:
+        if parser.matches(command):
+            return parser()
+    return None
+
+
+# ---------------- Running commands ----------------------------------
+
+def _read_stream(stream, chain, progress=None):
+    """Reads a pipe to its end, feeding the chain; runs in a thread per pipe."""
+    last_report = 0.0
+    while True:
+        data = stream.read1(READ_CHUNK_BYTES)
+        if not data:
+            break
+        chain.feed_bytes(data)
+        if progress is not None and time.monotonic() - last_report > 0.25:
+            last_report = time.monotonic()
+            progress(chain)
+
+
+def run_command(command, timeout, progress=None):
+    """
+    Runs a shell command and returns its output as markdown: a fenced block with the
+    command and the filtered stdout, then stderr, or a parser's markdown in place of
+    stdout. `progress(lines_read)` is called now and then while output arrives.
+    """
+    if not command:
+        return ""
+    max_line_chars = get_settings_service().get("command_output_max_line_chars", 2000)
+    stdout_chain = FilterChain(default_filters(), parser_for(command), max_line_chars)
+    stderr_chain = FilterChain(default_filters(), max_line_chars=max_line_chars)
+    error = None
+    with timed("command_output.run"):
+        try:
+            # Using shell=True for convenience, but be aware of security implications.
+            # In a session of its own, so a timeout can stop everything the shell started
+            process = subprocess.Popen(
+                command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                start_new_session=os.name != "nt"
+            )
+        except OSError as e:
+            return f"```bash\n$ {command}\nError executing command: {e}\n```\n"
+        report = (lambda chain: progress(chain.received)) if progress else None
+        readers = [
+            threading.Thread(target=_read_stream, args=(process.stdout, stdout_chain, report), daemon=True),
+            threading.Thread(target=_read_stream, args=(process.stderr, stderr_chain), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            if os.name != "nt":
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+            process.wait()
+            error = f"Error: Command timed out after {timeout} seconds."
+        for reader in readers:
+            # A process that escaped the session may still hold a pipe open; its output is dropped
+            reader.join(timeout=5)
+        if any(reader.is_alive() for reader in readers):
+            log.warning(f"Output of '{command}' was still arriving after it ended; the rest is ignored.")
+
+    parser = stdout_chain.parser
+    stdout_lines = stdout_chain.finish()
+    stderr_lines = stderr_chain.finish()
+    if error:
+        stderr_lines.append(error)
+    parsed = parser.markdown if parser is not None else None
+
+    block = [f"$ {command}"]
+    if parsed is None:
+        block.extend(stdout_lines)
+    if stderr_lines:
+        block.append("--- STDERR ---")
+        block.extend(stderr_lines)
+    markdown = "```bash\n" + "\n".join(block).strip() + "\n```\n"
+    if parsed is not None:
+        markdown += f"\n{parsed}\n"
+    return markdown
@@ -0,0 +1,68 @@
+import re
+
+# Kinds of entities recorded in the reference index.
+KIND_NOTE = "note"   # [[Note Title]] style reference to another note
+KIND_LINK = "link"   # [text](target) markdown link
+KIND_URL = "url"
+KIND_IP = "ip"
+KIND_HOST = "host"
+KIND_CVE = "cve"
+
+_WIKI_REGEX = re.compile(r'\[\[([^\[\]\n|]+)(?:\|[^\[\]\n]*)?\]\]')
+_LINK_REGEX = re.compile(r'(?<!!)\[[^\]\n]*\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"\n]*")?\s*\)')
+_URL_REGEX = re.compile(r'https?://[^\s)<>\]"\'`]+', re.IGNORECASE)
+_IP_REGEX = re.compile(
+    r'(?<![\w.])(?:(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\.){3}(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(?!\.?\d)'
+)
+_HOST_REGEX = re.compile(
+    r'(?<![\w.-])((?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+([a-z]{2,24}))(?![\w(-])',
+    re.IGNORECASE
+)
+_CVE_REGEX = re.compile(r'\bCVE-\d{4}-\d{4,}\b', re.IGNORECASE)
+
+# Dotted names ending in one of these are almost always files, not hosts.
+_FILE_EXTENSIONS = {
+    "asp", "aspx", "bak", "bat", "bin", "bmp", "cfg", "class", "conf", "cpp", "css", "csv",
+    "db", "dll", "doc", "docx", "exe", "gif", "go", "gz", "htm", "html", "ini", "jar", "java",
+    "jpeg", "jpg", "js", "json", "jsp", "log", "md", "old", "out", "pdf", "php", "pl", "png",
+    "ps1", "py", "rb", "rs", "sh", "so", "sqlite", "svg", "tar", "tmp", "txt", "xls", "xlsx",
+    "xml", "yaml", "yml", "zip",
+}
+
+
+def normalize_reference(value):
+    """Returns the form under which an entity is stored and looked up."""
+    return value.strip().rstrip('.,;:').lower()
+
+
+def extract_references(body):
+    """
+    Parses note links, URLs, IPs, hostnames and CVE ids out of a note body.
+    Returns a list of unique (kind, value, line_number) tuples, line numbers being 0-based.
+    """
+    if not body:
+        return []
+    found = []
+    seen = set()
+
+    def add(kind, value, line_no):
+        value = normalize_reference(value)
+        if value and (kind, value, line_no) not in seen:
+            seen.add((kind, value, line_no))
+            found.append((kind, value, line_no))
+
+    for line_no, line in enumerate(body.split('\n')):
+        for match in _WIKI_REGEX.finditer(line):
+            add(KIND_NOTE, match.group(1), line_no)
+        for match in _LINK_REGEX.finditer(line):
+            add(KIND_LINK, match.group(1), line_no)
+        for match in _URL_REGEX.finditer(line):
+            add(KIND_URL, match.group(0), line_no)
+        for match in _IP_REGEX.finditer(line):
+            add(KIND_IP, match.group(0), line_no)
+        for match in _HOST_REGEX.finditer(line):
+            if match.group(2).lower() not in _FILE_EXTENSIONS:
+                add(KIND_HOST, match.group(1), line_no)
+        for match in _CVE_REGEX.finditer(line):
+            add(KIND_CVE, match.group(0), line_no)
+    return found
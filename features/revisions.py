@@ -0,0 +1,56 @@
+import difflib
+import json
+import zlib
+
+# A revision is stored either as a full snapshot of the note body or as a
+# line-based delta against the revision before it. Both are zlib-compressed.
+#
+# Delta format (JSON list of operations applied to the previous body's lines):
+#   ["=", n]        copy the next n lines unchanged
+#   ["-", n]        skip the next n lines
+#   ["+", [lines]]  insert these lines
+
+
+def _split_lines(text):
+    return (text or "").splitlines(keepends=True)
+
+
+def encode_snapshot(body):
+    return zlib.compress((body or "").encode('utf-8'))
+
+
+def decode_snapshot(data):
+    return zlib.decompress(data).decode('utf-8')
+
+
+def make_delta(old_body, new_body):
+    """Returns the compressed delta that turns old_body into new_body."""
+    old_lines = _split_lines(old_body)
+    new_lines = _split_lines(new_body)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(["=", i2 - i1])
+            continue
+        if i2 > i1:
+            ops.append(["-", i2 - i1])
+        if j2 > j1:
+            ops.append(["+", new_lines[j1:j2]])
+    return zlib.compress(json.dumps(ops, separators=(',', ':')).encode('utf-8'))
+
+
+def apply_delta(old_body, data):
+    """Applies a compressed delta produced by make_delta to old_body."""
+    old_lines = _split_lines(old_body)
+    result = []
+    pos = 0
+    for op, arg in json.loads(zlib.decompress(data).decode('utf-8')):
+        if op == "=":
+            result.extend(old_lines[pos:pos + arg])
+            pos += arg
+        elif op == "-":
+            pos += arg
+        elif op == "+":
+            result.extend(arg)
+    return "".join(result)
@@ -1,9 +1,22 @@
 import sqlite3
-import json
 import os
-from utils.helpers import DB_FILE_PATH, BACKUP_LOCATION, JSON_IMPORT_PATH, get_settings, log
+import hashlib
+import pathlib
+import tempfile
+import time
+import uuid
+from utils.helpers import JSON_IMPORT_PATH
+from utils.logger import get_logger
+from utils.settings import get_settings_service
+from utils.perf import timed, timed_function
+from features.references import extract_references, normalize_reference
+from features.checklists import extract_tasks
+from features.revisions import encode_snapshot, decode_snapshot, make_delta, apply_delta
+from features.migrations import apply_migrations, pending_migrations
 import shutil
 
+log = get_logger(__name__)
+
 
 # ---------------- Storage handling ----------------------------------
 
@@ -14,62 +27,129 @@ class DatabaseCorruptError(Exception):
 
 
 class StorageManager:
-    def __init__(self, filepath=DB_FILE_PATH):
-        self.filepath = filepath
+    def __init__(self, filepath=None):
+        settings = get_settings_service()
+        self.filepath = filepath or settings.get("database_path")
         # backup path in case we need to restore
-        self.backup_path = os.path.join(BACKUP_LOCATION, f"{os.path.basename(filepath)}.bak")
-        # Always ensure the tables exist before doing anything else.
-        # "CREATE TABLE IF NOT EXISTS" is safe to run every time.
-        self._create_tables()
+        backup_location = settings.get("backup_location")
+        self.backup_path = os.path.join(backup_location, f"{os.path.basename(self.filepath)}.bak")
+        # Set by the maintenance checks; stops save() from copying a damaged file over the last good backup
+        self.corruption_detected = False
+        # Seconds to wait for another process's write to finish before giving up
+        self.busy_timeout = settings.get("database_busy_timeout_seconds", 10)
+        # Rows as this process last loaded or wrote them, to tell its own changes from
+        # those made by other processes: {note_id: (version, title, body, folder_id, position)}
+        # and {folder_id: (version, name)}
+        self._known_notes = {}
+        self._known_folders = {}
+        self._loaded = False
+        # Outcome of the last save(), see there
+        self.conflicts = []
+        self.remapped_notes = {}
+        self.remapped_folders = {}
+        # Kept open for PRAGMA data_version, which only changes for commits made by other connections
+        self._watch_conn = None
+        self._data_version = None
+        try:
+            os.makedirs(backup_location, exist_ok=True)
+        except OSError as e:
+            log.error(f"Could not create backup directory at {backup_location}: {e}")
+        # Always bring the schema up to date before doing anything else.
+        self._migrate()
         self._import_from_json_if_needed()
+        self._backfill_indexes()
 
-    def _get_connection(self):
-        return sqlite3.connect(self.filepath)
-
-    def _create_tables(self):
+    def _backfill_indexes(self, batch_size=500):
+        """
+        Indexes the references and tasks of notes the indexes have never seen: notes
+        written before those indexes existed are otherwise only indexed once edited.
+        Once everything is indexed this is a single index lookup per note.
+        """
         conn = self._get_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS folders (
-                    folder_id INTEGER PRIMARY KEY,
-                    name TEXT NOT NULL UNIQUE
+            missing = [row[0] for row in cursor.execute("""
+                SELECT n.note_id FROM notes n
+                WHERE NOT EXISTS (SELECT 1 FROM index_state i WHERE i.indexer = 'references' AND i.note_id = n.note_id)
+                   OR NOT EXISTS (SELECT 1 FROM index_state i WHERE i.indexer = 'tasks' AND i.note_id = n.note_id)
+            """)]
+            if not missing:
+                return
+            cursor.execute("BEGIN IMMEDIATE")
+            for start in range(0, len(missing), batch_size):
+                chunk = missing[start:start + batch_size]
+                cursor.execute(
+                    f"SELECT note_id, body FROM notes WHERE note_id IN ({', '.join('?' * len(chunk))})", chunk
                 )
-            """)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS notes (
-                    note_id INTEGER PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    body TEXT,
-                    folder_id INTEGER NOT NULL,
-                    sort_order INTEGER NOT NULL,
-                    FOREIGN KEY (folder_id) REFERENCES folders (folder_id) ON DELETE CASCADE
-                )
-            """)
+                bodies = {
+                    note_id: (body or "", hashlib.sha1((body or "").encode('utf-8')).hexdigest())
+                    for note_id, body in cursor.fetchall()
+                }
+                for table in ("note_references", "note_tasks"):
+                    cursor.executemany(f"DELETE FROM {table} WHERE note_id = ?", [(note_id,) for note_id in bodies])
+                self._insert_reference_rows(cursor, bodies)
+                self._insert_task_rows(cursor, bodies)
+                self._record_indexed(cursor, "references", bodies, [])
+                self._record_indexed(cursor, "tasks", bodies, [])
             conn.commit()
+            log.info(f"Indexed the references and tasks of {len(missing)} previously unindexed note(s).")
+        except sqlite3.OperationalError as e:
+            # Another process holds the write lock; the next start tries again
+            conn.rollback()
+            log.warning(f"Could not index existing notes yet: {e}")
+        finally:
+            conn.close()
+
+    def _get_connection(self):
+        return sqlite3.connect(self.filepath, timeout=self.busy_timeout)
+
+    def _migrate(self):
+        """Brings the schema up to date, backing up an existing database before changing it."""
+        conn = self._get_connection()
+        try:
+            if pending_migrations(conn) and os.path.getsize(self.filepath) > 0:
+                self._create_backup()
+            apply_migrations(conn)
         finally:
             conn.close()
 
+    @timed_function("storage.load")
     def load(self):
         """
         Loads all data. If it fails due to a database error,
         it raises a custom exception to be handled by the UI.
         """
+        conn = None
         try:
+            # The baseline of has_external_changes(), taken before reading, so that a commit
+            # made while loading is reported rather than missed
+            self._data_version = self._watch_data_version()
             conn = self._get_connection()
             cursor = conn.cursor()
-            cursor.execute("SELECT folder_id, name FROM folders")
-            folders_data = {fid: {"name": name, "notes": []} for fid, name in cursor.fetchall()}
+            # One read transaction, so the rows and their versions are from the same moment
+            cursor.execute("BEGIN")
+            cursor.execute("SELECT folder_id, name, version FROM folders")
+            folders_data = {}
+            self._known_folders = {}
+            for fid, name, version in cursor.fetchall():
+                folders_data[fid] = {"name": name, "notes": []}
+                self._known_folders[fid] = (version, name)
 
-            cursor.execute("SELECT note_id, title, body, folder_id FROM notes ORDER BY sort_order ASC")
+            cursor.execute("SELECT note_id, title, body, folder_id, version FROM notes ORDER BY sort_order ASC")
             notes_data = {}
-            for nid, title, body, fid in cursor.fetchall():
+            self._known_notes = {}
+            for nid, title, body, fid, version in cursor.fetchall():
                 notes_data[nid] = {"title": title, "body": body}
                 if fid in folders_data:
                     folders_data[fid]["notes"].append(nid)
+                    self._known_notes[nid] = (version, title, body, fid, len(folders_data[fid]["notes"]) - 1)
+                else:
+                    self._known_notes[nid] = (version, None, None, None, None)
 
             next_folder_id = (cursor.execute("SELECT MAX(folder_id) FROM folders").fetchone()[0] or 0) + 1
             next_note_id = (cursor.execute("SELECT MAX(note_id) FROM notes").fetchone()[0] or 0) + 1
+            conn.rollback()
+            self._loaded = True
 
             return {
                 "folders": folders_data, "notes": notes_data,
@@ -83,57 +163,239 @@ class StorageManager:
             if conn:
                 conn.close()
 
+    def has_external_changes(self):
+        """
+        Cheap check for commits by other connections since the last call, via PRAGMA
+        data_version. Saves made by this process count too, as they use connections of
+        their own; pull_changes() then finds nothing.
+        """
+        try:
+            version = self._watch_data_version()
+        except sqlite3.Error as e:
+            log.warning(f"Could not poll the database for changes: {e}")
+            return False
+        changed = self._data_version is not None and version != self._data_version
+        self._data_version = version
+        return changed
+
+    def _watch_data_version(self):
+        # data_version only moves for commits made after the connection was opened
+        if self._watch_conn is None:
+            self._watch_conn = self._get_connection()
+        return self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    @timed_function("storage.pull_changes")
+    def pull_changes(self):
+        """
+        Returns what other processes changed since this one last loaded or saved, and
+        records it as known, so the caller is expected to apply it to its model:
+        {"folders": {folder_id: name}, "deleted_folders": [...],
+         "notes": {note_id: {"title", "body", "folder_id", "sort_order"}}, "deleted_notes": [...],
+         "next_folder_id": ..., "next_note_id": ...}
+        Only the rows whose version differs are read in full.
+        """
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            db_folders = {
+                fid: (name, version)
+                for fid, name, version in cursor.execute("SELECT folder_id, name, version FROM folders")
+            }
+            changes = {"folders": {}, "deleted_folders": [], "notes": {}, "deleted_notes": []}
+            for folder_id, (name, version) in db_folders.items():
+                if self._known_folders.get(folder_id, (None,))[0] != version:
+                    changes["folders"][folder_id] = name
+                    self._known_folders[folder_id] = (version, name)
+            for folder_id in set(self._known_folders) - set(db_folders):
+                changes["deleted_folders"].append(folder_id)
+                del self._known_folders[folder_id]
+
+            db_notes = dict(cursor.execute("SELECT note_id, version FROM notes"))
+            changed = [nid for nid, version in db_notes.items() if self._known_notes.get(nid, (None,))[0] != version]
+            for start in range(0, len(changed), 500):
+                chunk = changed[start:start + 500]
+                cursor.execute(
+                    "SELECT note_id, title, body, folder_id, sort_order, version FROM notes "
+                    f"WHERE note_id IN ({', '.join('?' * len(chunk))})", chunk
+                )
+                for note_id, title, body, folder_id, sort_order, version in cursor.fetchall():
+                    changes["notes"][note_id] = {
+                        "title": title, "body": body, "folder_id": folder_id, "sort_order": sort_order
+                    }
+                    self._known_notes[note_id] = (version, title, body, folder_id, sort_order)
+            for note_id in set(self._known_notes) - set(db_notes):
+                changes["deleted_notes"].append(note_id)
+                del self._known_notes[note_id]
+            changes["next_folder_id"] = max(db_folders, default=0) + 1
+            changes["next_note_id"] = max(db_notes, default=0) + 1
+            conn.rollback()
+        finally:
+            conn.close()
+        if changes["notes"] or changes["deleted_notes"] or changes["folders"] or changes["deleted_folders"]:
+            log.info(
+                f"Picked up external changes: {len(changes['notes'])} note(s), "
+                f"{len(changes['deleted_notes'])} deleted note(s), {len(changes['folders'])} folder(s), "
+                f"{len(changes['deleted_folders'])} deleted folder(s)."
+            )
+        return changes
+
+    @timed_function("storage.save")
     def save(self, data):
         """
-        Saves the entire application state to the SQLite database.
+        Saves the application state to the SQLite database.
         Returns True on success, False on failure.
         Also creates a backup of the existing database before overwriting.
+
+        Other processes may have written to the file since `data` was loaded. Every row
+        has a version that goes up with each change, and only rows this process changed
+        are written:
+        - a row changed elsewhere but not here is left as the other process wrote it
+          (pull_changes() brings it into the model);
+        - a row changed in both places is overwritten; the other version stays in the
+          note's revision history, and the note id is listed in `self.conflicts`;
+        - only rows this process loaded are ever deleted;
+        - a new note or folder whose id was taken meanwhile gets a new id. `data` is
+          updated in place and the changes are listed in `self.remapped_notes` and
+          `self.remapped_folders` ({old id: new id}).
         """
-        if os.path.exists(self.filepath):
-            try:
-                shutil.copy2(self.filepath, self.backup_path)
-                log.info(f"Database backup created at {self.backup_path}")
-            except IOError as e:
-                log.error(f"Could not create database backup: {e}")
-                # We can decide whether to proceed without a backup
-                # For safety, let's return False
-                return False
+        self.conflicts = []
+        self.remapped_notes = {}
+        self.remapped_folders = {}
         conn = self._get_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("BEGIN")
+            # The write lock is taken up front: other writers wait (busy timeout) instead of
+            # interleaving, and the file can't change while it is backed up and compared.
+            cursor.execute("BEGIN IMMEDIATE")
+            if not self._create_backup():
+                # For safety, don't write without a backup
+                conn.rollback()
+                return False
+
+            db_folders = {
+                fid: (name, version)
+                for fid, name, version in cursor.execute("SELECT folder_id, name, version FROM folders")
+            }
+            db_notes = {}
+            db_note_folders = {}
+            for note_id, version, folder_id in cursor.execute("SELECT note_id, version, folder_id FROM notes"):
+                db_notes[note_id] = version
+                db_note_folders[note_id] = folder_id
+            if not self._loaded:
+                # Nothing was loaded through this manager: `data` is taken to describe the whole file
+                self._known_folders = {fid: (version, None) for fid, (_, version) in db_folders.items()}
+                self._known_notes = {nid: (version, None, None, None, None) for nid, version in db_notes.items()}
+                self._loaded = True
+            self._remap_taken_ids(data, db_folders, db_notes)
+            folders = data.get("folders", {})
+            now = time.time()
+
+            # --- Folders ---
+            folders_to_write = {}
+            for folder_id, folder_data in folders.items():
+                known = self._known_folders.get(folder_id)
+                current = db_folders.get(folder_id, (None, None))
+                if known and current[1] != known[0] and folder_data["name"] == known[1]:
+                    continue  # renamed or deleted elsewhere, not here
+                folders_to_write[folder_id] = folder_data["name"]
+
+            # --- Notes ---
+            placed = {}
+            for folder_id, folder_data in folders.items():
+                for i, note_id in enumerate(folder_data.get("notes", [])):
+                    # The note_id is an integer, so we look it up with an integer key.
+                    note_data = data["notes"].get(note_id)
+                    if note_data:
+                        placed[note_id] = (note_data["title"], note_data["body"], folder_id, i)
+            note_rows = []
+            for note_id, row in placed.items():
+                known = self._known_notes.get(note_id)
+                if known and self._same_note_row(row, known[1:]):
+                    continue  # unchanged here; if it changed elsewhere, that version stays
+                if known and note_id in db_notes and db_notes[note_id] != known[0]:
+                    self.conflicts.append(note_id)
+                note_rows.append((note_id, *row))
+                if row[2] not in db_folders and row[2] not in folders_to_write:
+                    # Its folder was deleted elsewhere while this note was edited here
+                    folders_to_write[row[2]] = folders[row[2]]["name"]
+            deleted_notes = [
+                nid for nid, version in db_notes.items()
+                if nid not in placed and self._known_notes.get(nid, (None,))[0] == version
+            ]
+            final_folders = dict(db_note_folders)
+            final_folders.update((note_id, folder_id) for note_id, _, _, folder_id, _ in note_rows)
+            for note_id in deleted_notes:
+                del final_folders[note_id]
+            occupied = set(final_folders.values())
+            # A folder that gained notes elsewhere is kept even if it was deleted here
+            deleted_folders = [
+                fid for fid, (_, version) in db_folders.items()
+                if fid not in folders and fid not in occupied and self._known_folders.get(fid, (None,))[0] == version
+            ]
 
-            folder_names_seen = set()
-            modified_folders = {}
-            # The keys in the live data model are integers.
-            for folder_id, folder_data in data.get("folders", {}).items():
-                original_name = folder_data["name"]
+            # Names of the rows that stay as they are can't be reused
+            folder_names_seen = {
+                name for fid, (name, _) in db_folders.items()
+                if fid not in folders_to_write and fid not in deleted_folders
+            }
+            written_names = {}
+            for folder_id, original_name in folders_to_write.items():
                 new_name = original_name
                 count = 1
                 while new_name in folder_names_seen:
                     new_name = f"{original_name} (Copy {count})"
                     count += 1
                 folder_names_seen.add(new_name)
-                modified_folders[folder_id] = folder_data.copy()
-                modified_folders[folder_id]['name'] = new_name
+                written_names[folder_id] = new_name
 
-            cursor.execute("DELETE FROM notes")
-            cursor.execute("DELETE FROM folders")
+            # Bodies of every note about to be written, hashed once for revisions and indexes.
+            saved_bodies = {
+                note_id: (body or "", hashlib.sha1((body or "").encode('utf-8')).hexdigest())
+                for note_id, _, body, _, _ in note_rows
+            }
+            # Must run before the old bodies are overwritten, since deltas are taken against them.
+            self._record_revisions(cursor, saved_bodies, deleted_notes)
 
-            for folder_id, folder_data in modified_folders.items():
-                cursor.execute("INSERT INTO folders (folder_id, name) VALUES (?, ?)", (folder_id, folder_data["name"]))
+            cursor.executemany("DELETE FROM notes WHERE note_id = ?", [(nid,) for nid in deleted_notes])
+            cursor.executemany("DELETE FROM folders WHERE folder_id = ?", [(fid,) for fid in deleted_folders])
+            self._write_folders(cursor, written_names, now)
 
-                for i, note_id in enumerate(folder_data.get("notes", [])):
-                    # The note_id is an integer, so we look it up with an integer key.
-                    # The str() conversion was the bug.
-                    note_data = data["notes"].get(note_id)
-                    if note_data:
-                        cursor.execute(
-                            "INSERT INTO notes (note_id, title, body, folder_id, sort_order) VALUES (?, ?, ?, ?, ?)",
-                            (note_id, note_data["title"], note_data["body"], folder_id, i)
-                        )
+            # Rows are upserted rather than rewritten: unchanged notes cost no writes and
+            # keep their timestamps, and updated_at only moves when title or body change.
+            cursor.executemany("""
+                INSERT INTO notes (note_id, title, body, folder_id, sort_order, uuid, body_hash, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (note_id) DO UPDATE SET
+                    title = excluded.title, body = excluded.body, body_hash = excluded.body_hash,
+                    folder_id = excluded.folder_id, sort_order = excluded.sort_order,
+                    updated_at = CASE
+                        WHEN notes.title IS NOT excluded.title OR notes.body IS NOT excluded.body
+                        THEN excluded.updated_at ELSE notes.updated_at END,
+                    version = notes.version + 1
+                WHERE notes.title IS NOT excluded.title OR notes.body IS NOT excluded.body
+                    OR notes.folder_id IS NOT excluded.folder_id OR notes.sort_order IS NOT excluded.sort_order
+            """, [row + (uuid.uuid4().hex, saved_bodies[row[0]][1], now, now) for row in note_rows])
+
+            self._update_reference_index(cursor, saved_bodies, deleted_notes)
+            self._update_task_index(cursor, saved_bodies, deleted_notes)
 
+            folder_versions = dict(cursor.execute("SELECT folder_id, version FROM folders"))
+            versions = dict(cursor.execute("SELECT note_id, version FROM notes"))
             conn.commit()
+            for folder_id in deleted_folders:
+                self._known_folders.pop(folder_id, None)
+            for folder_id in written_names:
+                self._known_folders[folder_id] = (folder_versions[folder_id], folders[folder_id]["name"])
+            for note_id in deleted_notes:
+                self._known_notes.pop(note_id, None)
+            for note_id, *row in note_rows:
+                self._known_notes[note_id] = (versions[note_id], *row)
+            if self.conflicts:
+                log.warning(
+                    f"{len(self.conflicts)} note(s) were also changed by another process; "
+                    f"this version was saved: {self.conflicts}"
+                )
             return True
         except Exception as e:
             log.error(f"Error saving data to SQLite: {e}")
@@ -142,6 +404,77 @@ class StorageManager:
         finally:
             conn.close()
 
+    @staticmethod
+    def _same_note_row(row, known_row):
+        # Bodies that weren't edited are still the very object that was loaded, which spares comparing them
+        return all(a is b or a == b for a, b in zip(row, known_row))
+
+    def _remap_taken_ids(self, data, db_folders, db_notes):
+        """
+        Gives new folders and notes whose id another process has used in the meantime
+        the next free id, updating `data` in place.
+        """
+        folders = data.get("folders", {})
+        notes = data.get("notes", {})
+        taken = [fid for fid in folders if fid in db_folders and fid not in self._known_folders]
+        next_id = max([data.get("next_folder_id", 1), max(db_folders, default=0) + 1, max(folders, default=0) + 1])
+        for folder_id in taken:
+            folders[next_id] = folders.pop(folder_id)
+            self.remapped_folders[folder_id] = next_id
+            next_id += 1
+        if taken:
+            data["next_folder_id"] = next_id
+
+        taken = [nid for nid in notes if nid in db_notes and nid not in self._known_notes]
+        next_id = max([data.get("next_note_id", 1), max(db_notes, default=0) + 1, max(notes, default=0) + 1])
+        for note_id in taken:
+            notes[next_id] = notes.pop(note_id)
+            self.remapped_notes[note_id] = next_id
+            next_id += 1
+        if taken:
+            data["next_note_id"] = next_id
+            for folder_data in folders.values():
+                folder_data["notes"] = [self.remapped_notes.get(nid, nid) for nid in folder_data.get("notes", [])]
+        if self.remapped_folders or self.remapped_notes:
+            log.warning(
+                f"Ids taken by another process were reassigned: folders {self.remapped_folders}, "
+                f"notes {self.remapped_notes}"
+            )
+
+    def _write_folders(self, cursor, names, now):
+        """Renames and adds folder rows so they match {folder_id: name}, leaving unchanged rows alone."""
+        existing = dict(cursor.execute("SELECT folder_id, name FROM folders"))
+        renamed = [fid for fid, name in names.items() if fid in existing and existing[fid] != name]
+        # Park renamed folders on unique placeholder names first, so swapping two names
+        # doesn't trip the UNIQUE constraint halfway through.
+        cursor.executemany(
+            "UPDATE folders SET name = ? WHERE folder_id = ?", [(f"\0renaming {fid}", fid) for fid in renamed]
+        )
+        cursor.executemany(
+            "UPDATE folders SET name = ?, updated_at = ?, version = version + 1 WHERE folder_id = ?",
+            [(names[fid], now, fid) for fid in renamed]
+        )
+        cursor.executemany(
+            "INSERT INTO folders (folder_id, name, uuid, updated_at) VALUES (?, ?, ?, ?)",
+            [(fid, name, uuid.uuid4().hex, now) for fid, name in names.items() if fid not in existing]
+        )
+
+    def _create_backup(self):
+        """Copies the database to the backup path. Returns False if that failed."""
+        if not os.path.exists(self.filepath):
+            return True
+        if self.corruption_detected:
+            log.warning("Database failed its integrity check; keeping the existing backup.")
+            return True
+        try:
+            with timed("storage.backup"):
+                shutil.copy2(self.filepath, self.backup_path)
+            log.info(f"Database backup created at {self.backup_path}")
+            return True
+        except IOError as e:
+            log.error(f"Could not create database backup: {e}")
+            return False
+
     def restore_from_backup(self): # new method for restoring
         """Copies the backup file over the main database file."""
         if os.path.exists(self.backup_path):
@@ -153,11 +486,16 @@ class StorageManager:
                 return False
         return False
 
+    @timed_function("storage.search_notes")
     def search_notes(self, query):
         """
         Searches the TITLE and BODY of all notes for a given query.
         Returns a list of dictionaries containing note info.
         """
+        return list(self.iter_search_notes(query))
+
+    def iter_search_notes(self, query):
+        """Like search_notes, but yields results as they are read from the database."""
         conn = self._get_connection()
         try:
             cursor = conn.cursor()
@@ -172,13 +510,661 @@ class StorageManager:
             # Pass the search term twice, once for title and once for body
             cursor.execute(sql_query, (search_term, search_term))
 
-            results = []
-            for note_id, title, folder_id, folder_name in cursor.fetchall():
-                results.append({
+            for note_id, title, folder_id, folder_name in cursor:
+                yield {
                     "note_id": note_id, "title": title,
                     "folder_id": folder_id, "folder_name": folder_name
-                })
-            return results
+                }
+        finally:
+            conn.close()
+
+    def iter_folders(self):
+        """Yields every folder with its note count, ordered by name."""
+        conn = self._get_connection()
+        try:
+            cursor = conn.execute("""
+                SELECT f.folder_id, f.name, COUNT(n.note_id)
+                FROM folders f LEFT JOIN notes n ON n.folder_id = f.folder_id
+                GROUP BY f.folder_id ORDER BY f.name
+            """)
+            for folder_id, name, note_count in cursor:
+                yield {"folder_id": folder_id, "name": name, "note_count": note_count}
+        finally:
+            conn.close()
+
+    def iter_notes(self, folder_id=None, with_body=False, changed_since=None):
+        """
+        Yields notes in folder order without loading the whole database,
+        optionally restricted to one folder and/or to notes whose title or body
+        changed after the `changed_since` timestamp.
+        """
+        conditions, params = [], []
+        if folder_id is not None:
+            conditions.append("f.folder_id = ?")
+            params.append(folder_id)
+        if changed_since is not None:
+            conditions.append("n.updated_at > ?")
+            params.append(changed_since)
+        conn = self._get_connection()
+        try:
+            sql = f"""
+                SELECT n.note_id, n.title, {"n.body" if with_body else "NULL"}, f.folder_id, f.name, n.updated_at
+                FROM notes n JOIN folders f ON n.folder_id = f.folder_id
+                {"WHERE " + " AND ".join(conditions) if conditions else ""}
+                ORDER BY f.name, n.sort_order
+            """
+            for note_id, title, body, fid, folder_name, updated_at in conn.execute(sql, params):
+                note = {
+                    "note_id": note_id, "title": title, "folder_id": fid, "folder_name": folder_name,
+                    "updated_at": updated_at
+                }
+                if with_body:
+                    note["body"] = body
+                yield note
+        finally:
+            conn.close()
+
+    def get_note(self, note_id):
+        """Returns one note with its body and folder, in the shape iter_notes() yields, or None."""
+        conn = self._get_connection()
+        try:
+            row = conn.execute("""
+                SELECT n.title, n.body, f.folder_id, f.name, n.updated_at
+                FROM notes n JOIN folders f ON n.folder_id = f.folder_id WHERE n.note_id = ?
+            """, (note_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        title, body, folder_id, folder_name, updated_at = row
+        return {
+            "note_id": note_id, "title": title, "folder_id": folder_id, "folder_name": folder_name,
+            "updated_at": updated_at, "body": body
+        }
+
+    @timed_function("storage.bulk_insert")
+    def bulk_insert(self, folders, notes, progress=None, batch_size=500):
+        """
+        Appends imported notes to the database in a single transaction, without
+        loading or rewriting what is already there.
+
+        `folders` maps a caller-chosen key to a folder name; `notes` is an iterable of
+        (folder_key, sort_order, title, body). Each key becomes a new folder (named with a "(Copy n)"
+        suffix when the name is taken) the first time a note refers to it; keys without
+        notes become empty folders at the end. `folders` is read lazily, so a generator
+        feeding `notes` may keep adding to it. Notes are written in batches via
+        executemany and their reference and task indexes are filled in as they go.
+        `progress(notes_written)` is called after every batch.
+
+        Returns (folders_created, notes_created). Raises IOError if the backup fails
+        and re-raises any error hit while writing, after rolling back.
+        """
+        if not self._create_backup():
+            raise IOError(f"Could not back up {self.filepath} before importing.")
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            # Immediate, so the free ids read below are still free when the rows are written
+            cursor.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            taken_names = {row[0] for row in cursor.execute("SELECT name FROM folders")}
+            next_folder_id = (cursor.execute("SELECT MAX(folder_id) FROM folders").fetchone()[0] or 0) + 1
+            next_note_id = (cursor.execute("SELECT MAX(note_id) FROM notes").fetchone()[0] or 0) + 1
+            folder_ids = {}
+
+            def folder_id_for(key):
+                nonlocal next_folder_id
+                if key not in folder_ids:
+                    original_name = folders.get(key) or str(key)
+                    name, count = original_name, 1
+                    while name in taken_names:
+                        name = f"{original_name} (Copy {count})"
+                        count += 1
+                    taken_names.add(name)
+                    cursor.execute(
+                        "INSERT INTO folders (folder_id, name, uuid, updated_at) VALUES (?, ?, ?, ?)",
+                        (next_folder_id, name, uuid.uuid4().hex, now)
+                    )
+                    folder_ids[key] = next_folder_id
+                    next_folder_id += 1
+                return folder_ids[key]
+
+            def write_batch(batch):
+                bodies = {
+                    note_id: (body, hashlib.sha1(body.encode('utf-8')).hexdigest())
+                    for note_id, _, body, _, _ in batch
+                }
+                cursor.executemany(
+                    "INSERT INTO notes (note_id, title, body, folder_id, sort_order, uuid, body_hash, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [row + (uuid.uuid4().hex, bodies[row[0]][1], now, now) for row in batch]
+                )
+                self._insert_reference_rows(cursor, bodies)
+                self._insert_task_rows(cursor, bodies)
+                # Recorded for "revisions" too: an imported body is the note's starting
+                # point, and the first edit snapshots it as the baseline.
+                for indexer in ("references", "tasks", "revisions"):
+                    self._record_indexed(cursor, indexer, bodies, [])
+
+            written = 0
+            batch = []
+            for folder_key, sort_order, title, body in notes:
+                batch.append((next_note_id, title, body or "", folder_id_for(folder_key), sort_order))
+                next_note_id += 1
+                if len(batch) >= batch_size:
+                    write_batch(batch)
+                    written += len(batch)
+                    batch = []
+                    if progress:
+                        progress(written)
+            if batch:
+                write_batch(batch)
+                written += len(batch)
+            for key in list(folders):
+                folder_id_for(key)
+            conn.commit()
+            if progress:
+                progress(written)
+            log.info(f"Bulk import wrote {len(folder_ids)} folder(s) and {written} note(s).")
+            return len(folder_ids), written
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @timed_function("storage.merge_from")
+    def merge_from(self, source_path, dry_run=False, progress=None, batch_size=500):
+        """
+        Merges another PieceNote database into this one, matching notes and folders on
+        their uuid. Rows that predate uuids got ones derived from folder name, title and
+        creation order (see migrations._merge_keys), so copies of one older database match:
+        - notes and folders only the source has are added; an added or renamed folder
+          whose name is taken gets a "(Copy n)" suffix, as in save();
+        - a note whose title or body differs is taken from the source if it was changed
+          there more recently, and kept otherwise; a replaced body stays in the note's
+          revision history;
+        - a folder renamed more recently in the source is renamed here.
+        Deletions are not carried over. The source is attached to the same connection
+        and compared in SQL on uuids, titles and body hashes, so only the rows that
+        differ are read in full. `progress(notes_written)` is called after every batch.
+
+        Nothing is ever written to the source: it is opened read-only, and one with an
+        older schema is copied to a temporary file whose copy is migrated instead.
+
+        Returns a summary dict. With `dry_run` the summary is computed and nothing is
+        written. Raises IOError if the backup fails and re-raises any error hit while
+        writing, after rolling back.
+        """
+        if os.path.abspath(source_path) == os.path.abspath(self.filepath):
+            raise ValueError("A database can't be merged into itself.")
+        if not os.path.isfile(source_path):
+            raise FileNotFoundError(f"No database at {source_path}.")
+        # The source is only ever opened read-only. The comparison needs the uuid and
+        # body_hash columns, so an older source is copied and the copy migrated.
+        source_uri = f"{pathlib.Path(os.path.abspath(source_path)).as_uri()}?mode=ro"
+        migrated_copy = None
+        source = sqlite3.connect(source_uri, uri=True, timeout=self.busy_timeout)
+        try:
+            if pending_migrations(source):
+                handle, migrated_copy = tempfile.mkstemp(suffix=".sqlite", prefix="piecenote-merge-")
+                os.close(handle)
+                log.info(f"Merging from an up-to-date copy of {source_path}, whose schema is older.")
+                copy = sqlite3.connect(migrated_copy)
+                try:
+                    source.backup(copy)
+                    apply_migrations(copy)
+                finally:
+                    copy.close()
+                source_uri = f"{pathlib.Path(migrated_copy).as_uri()}?mode=ro"
+        except Exception:
+            if migrated_copy:
+                os.remove(migrated_copy)
+            raise
+        finally:
+            source.close()
+        try:
+            return self._merge_from(source_uri, source_path, dry_run, progress, batch_size)
+        finally:
+            if migrated_copy:
+                os.remove(migrated_copy)
+
+    def _merge_from(self, source_uri, source_path, dry_run, progress, batch_size):
+        if not dry_run and not self._create_backup():
+            raise IOError(f"Could not back up {self.filepath} before merging.")
+
+        summary = {
+            "folders_added": 0, "folders_renamed": 0, "notes_added": 0, "notes_updated": 0,
+            "notes_kept": 0, "dry_run": dry_run,
+        }
+        # URI filenames enabled for the read-only ATTACH; the plain path still opens as a path
+        conn = sqlite3.connect(self.filepath, timeout=self.busy_timeout, uri=True)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("ATTACH DATABASE ? AS source", (source_uri,))
+            cursor.execute("BEGIN" if dry_run else "BEGIN IMMEDIATE")
+            now = time.time()
+
+            # --- Folders ---
+            taken_names = {row[0] for row in cursor.execute("SELECT name FROM folders")}
+            next_folder_id = (cursor.execute("SELECT MAX(folder_id) FROM folders").fetchone()[0] or 0) + 1
+            folder_map = {}
+
+            def free_name(original_name):
+                name, count = original_name, 1
+                while name in taken_names:
+                    name = f"{original_name} (Copy {count})"
+                    count += 1
+                taken_names.add(name)
+                return name
+
+            cursor.execute("""
+                SELECT s.folder_id, s.uuid, s.name, s.updated_at, m.folder_id, m.name, m.updated_at
+                FROM source.folders s LEFT JOIN main.folders m ON m.uuid = s.uuid
+            """)
+            for source_id, folder_uuid, name, updated_at, target_id, target_name, target_updated in cursor.fetchall():
+                if target_id is None:
+                    cursor.execute(
+                        "INSERT INTO folders (folder_id, name, uuid, updated_at) VALUES (?, ?, ?, ?)",
+                        (next_folder_id, free_name(name), folder_uuid, updated_at or now)
+                    )
+                    folder_map[source_id] = next_folder_id
+                    next_folder_id += 1
+                    summary["folders_added"] += 1
+                    continue
+                folder_map[source_id] = target_id
+                if name != target_name and (updated_at or 0) > (target_updated or 0):
+                    taken_names.discard(target_name)
+                    cursor.execute(
+                        "UPDATE folders SET name = ?, updated_at = ?, version = version + 1 WHERE folder_id = ?",
+                        (free_name(name), updated_at, target_id)
+                    )
+                    summary["folders_renamed"] += 1
+
+            # --- Notes: which differ, from the uuid index alone ---
+            cursor.execute("""
+                SELECT s.note_id, m.note_id, COALESCE(s.updated_at, 0) > COALESCE(m.updated_at, 0)
+                FROM source.notes s LEFT JOIN main.notes m ON m.uuid = s.uuid
+                WHERE m.note_id IS NULL OR m.title IS NOT s.title OR m.body_hash IS NOT s.body_hash
+            """)
+            added, updated = [], {}
+            for source_id, target_id, source_newer in cursor.fetchall():
+                if target_id is None:
+                    added.append(source_id)
+                elif source_newer:
+                    updated[source_id] = target_id
+                else:
+                    summary["notes_kept"] += 1
+            summary["notes_added"] = len(added)
+            summary["notes_updated"] = len(updated)
+            if dry_run:
+                conn.rollback()
+                return summary
+
+            next_note_id = (cursor.execute("SELECT MAX(note_id) FROM notes").fetchone()[0] or 0) + 1
+            # Added notes go after the ones already in the folder, in their source order
+            folder_ends = dict(cursor.execute("SELECT folder_id, MAX(sort_order) + 1 FROM notes GROUP BY folder_id"))
+            columns = "note_id, uuid, title, body, folder_id, sort_order, created_at, updated_at"
+            written = 0
+            ordered = added + list(updated)
+            for start in range(0, len(ordered), batch_size):
+                chunk = ordered[start:start + batch_size]
+                cursor.execute(
+                    f"SELECT {columns} FROM source.notes WHERE note_id IN ({', '.join('?' * len(chunk))}) "
+                    "ORDER BY folder_id, sort_order", chunk
+                )
+                new_rows, new_bodies, changed_rows, changed_bodies = [], {}, [], {}
+                for source_id, note_uuid, title, body, folder_id, sort_order, created_at, updated_at in cursor.fetchall():
+                    body = body or ""
+                    body_hash = hashlib.sha1(body.encode('utf-8')).hexdigest()
+                    if source_id in updated:
+                        target_id = updated[source_id]
+                        changed_bodies[target_id] = (body, body_hash)
+                        changed_rows.append((title, body, body_hash, updated_at or now, target_id))
+                        continue
+                    if folder_id not in folder_map:
+                        summary["notes_added"] -= 1  # orphaned in the source
+                        continue
+                    target_folder = folder_map[folder_id]
+                    position = folder_ends.get(target_folder, 0)
+                    folder_ends[target_folder] = position + 1
+                    new_bodies[next_note_id] = (body, body_hash)
+                    new_rows.append((
+                        next_note_id, title, body, target_folder, position, note_uuid, body_hash,
+                        created_at or now, updated_at or now
+                    ))
+                    next_note_id += 1
+
+                # The replaced bodies become revisions before they are overwritten
+                self._record_revisions(cursor, changed_bodies, [])
+                cursor.executemany(
+                    "UPDATE notes SET title = ?, body = ?, body_hash = ?, updated_at = ?, version = version + 1 "
+                    "WHERE note_id = ?", changed_rows
+                )
+                self._update_reference_index(cursor, changed_bodies, [])
+                self._update_task_index(cursor, changed_bodies, [])
+                cursor.executemany(
+                    "INSERT INTO notes (note_id, title, body, folder_id, sort_order, uuid, body_hash, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", new_rows
+                )
+                # As in bulk_insert(): a merged body is the note's starting point
+                self._insert_reference_rows(cursor, new_bodies)
+                self._insert_task_rows(cursor, new_bodies)
+                for indexer in ("references", "tasks", "revisions"):
+                    self._record_indexed(cursor, indexer, new_bodies, [])
+                written += len(chunk)
+                if progress:
+                    progress(written)
+            conn.commit()
+            log.info(
+                f"Merged {source_path}: {summary['notes_added']} note(s) added, {summary['notes_updated']} updated, "
+                f"{summary['notes_kept']} kept, {summary['folders_added']} folder(s) added, "
+                f"{summary['folders_renamed']} renamed."
+            )
+            return summary
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def integrity_check(self, quick=True):
+        """Runs PRAGMA quick_check (or the slower integrity_check). Returns the reported problems, or ["ok"]."""
+        conn = self._get_connection()
+        try:
+            pragma = "quick_check" if quick else "integrity_check"
+            return [row[0] for row in conn.execute(f"PRAGMA {pragma}")]
+        finally:
+            conn.close()
+
+    def vacuum(self):
+        """
+        Rebuilds the database file, reclaiming the space left by deleted rows. Also switches
+        a file created before incremental auto-vacuum to it, which only a rebuild can do;
+        idle maintenance then keeps releasing free pages without another full pass.
+        """
+        conn = self._get_connection()
+        try:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+    def _changed_note_bodies(self, cursor, indexer, bodies, removed):
+        """
+        Compares {note_id: (body, hash)} against the hashes `indexer` last processed.
+        Returns a dict of the new or changed entries and the ids of `removed` it had processed.
+        """
+        cursor.execute("SELECT note_id, body_hash FROM index_state WHERE indexer = ?", (indexer,))
+        known = dict(cursor.fetchall())
+        changed = {}
+        for note_id, (body, body_hash) in bodies.items():
+            if known.get(note_id) != body_hash:
+                changed[note_id] = (body, body_hash)
+        return changed, [note_id for note_id in removed if note_id in known]
+
+    def _record_indexed(self, cursor, indexer, changed, removed):
+        cursor.executemany(
+            "INSERT OR REPLACE INTO index_state (indexer, note_id, body_hash) VALUES (?, ?, ?)",
+            [(indexer, note_id, body_hash) for note_id, (_, body_hash) in changed.items()]
+        )
+        cursor.executemany(
+            "DELETE FROM index_state WHERE indexer = ? AND note_id = ?",
+            [(indexer, note_id) for note_id in removed]
+        )
+
+    def _update_reference_index(self, cursor, bodies, removed):
+        """Re-extracts links and entities for notes whose body changed since the last save."""
+        changed, removed = self._changed_note_bodies(cursor, "references", bodies, removed)
+        if not changed and not removed:
+            return
+        cursor.executemany(
+            "DELETE FROM note_references WHERE note_id = ?",
+            [(note_id,) for note_id in list(changed) + removed]
+        )
+        self._insert_reference_rows(cursor, changed)
+        self._record_indexed(cursor, "references", changed, removed)
+        log.info(f"Reference index updated for {len(changed)} changed and {len(removed)} removed note(s).")
+
+    def _update_task_index(self, cursor, bodies, removed):
+        """Re-indexes the checklist items of notes whose body changed since the last save."""
+        changed, removed = self._changed_note_bodies(cursor, "tasks", bodies, removed)
+        if not changed and not removed:
+            return
+        cursor.executemany(
+            "DELETE FROM note_tasks WHERE note_id = ?",
+            [(note_id,) for note_id in list(changed) + removed]
+        )
+        self._insert_task_rows(cursor, changed)
+        self._record_indexed(cursor, "tasks", changed, removed)
+
+    def _insert_reference_rows(self, cursor, bodies):
+        rows = []
+        for note_id, (body, _) in bodies.items():
+            rows.extend((note_id, kind, value, line) for kind, value, line in extract_references(body))
+        cursor.executemany(
+            "INSERT INTO note_references (note_id, kind, value, line) VALUES (?, ?, ?, ?)", rows
+        )
+
+    def _insert_task_rows(self, cursor, bodies):
+        rows = []
+        for note_id, (body, _) in bodies.items():
+            rows.extend((note_id, line, text, int(checked)) for line, text, checked in extract_tasks(body))
+        cursor.executemany("INSERT INTO note_tasks (note_id, line, text, checked) VALUES (?, ?, ?, ?)", rows)
+
+    def _record_revisions(self, cursor, bodies, removed):
+        """
+        Stores a revision for every note whose body changed since the last save.
+        Revisions are deltas against the previous one, with a full snapshot every
+        `revision_snapshot_interval` revisions so reconstruction stays cheap.
+        """
+        changed, removed = self._changed_note_bodies(cursor, "revisions", bodies, removed)
+        if not changed and not removed:
+            return
+        settings = get_settings_service()
+        snapshot_interval = max(1, settings.get("revision_snapshot_interval", 20))
+        now = time.time()
+
+        for note_id, (body, body_hash) in changed.items():
+            row = cursor.execute("SELECT body FROM notes WHERE note_id = ?", (note_id,)).fetchone()
+            old_body = (row[0] or "") if row else None
+            latest = cursor.execute(
+                "SELECT revision_id, body_hash FROM note_revisions WHERE note_id = ? ORDER BY revision_id DESC LIMIT 1",
+                (note_id,)
+            ).fetchone()
+            old_hash = hashlib.sha1(old_body.encode('utf-8')).hexdigest() if old_body is not None else None
+
+            if latest is None and old_body:
+                # First revision of a note that predates history: keep its previous body too.
+                self._insert_revision(cursor, note_id, now, True, old_hash, old_body, encode_snapshot(old_body))
+                latest = (cursor.lastrowid, old_hash)
+
+            chain_length = 0
+            if latest is not None:
+                last_snapshot = cursor.execute(
+                    "SELECT MAX(revision_id) FROM note_revisions WHERE note_id = ? AND is_snapshot = 1",
+                    (note_id,)
+                ).fetchone()[0] or 0
+                chain_length = cursor.execute(
+                    "SELECT COUNT(*) FROM note_revisions WHERE note_id = ? AND revision_id > ?",
+                    (note_id, last_snapshot)
+                ).fetchone()[0]
+
+            if latest is not None and latest[1] == old_hash and chain_length + 1 < snapshot_interval:
+                self._insert_revision(cursor, note_id, now, False, body_hash, body, make_delta(old_body, body))
+            else:
+                self._insert_revision(cursor, note_id, now, True, body_hash, body, encode_snapshot(body))
+            self._prune_revisions(cursor, note_id, settings)
+
+        # Note ids can be reused after deletion, so drop the history of removed notes.
+        cursor.executemany("DELETE FROM note_revisions WHERE note_id = ?", [(note_id,) for note_id in removed])
+        self._record_indexed(cursor, "revisions", changed, removed)
+
+    def _insert_revision(self, cursor, note_id, created_at, is_snapshot, body_hash, body, blob):
+        cursor.execute(
+            "INSERT INTO note_revisions (note_id, created_at, is_snapshot, body_hash, size, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (note_id, created_at, int(is_snapshot), body_hash, len(body), blob)
+        )
+
+    def _prune_revisions(self, cursor, note_id, settings):
+        """
+        Applies the retention policy (`revision_keep_per_note`, `revision_keep_days`).
+        The oldest kept revision is rewritten as a snapshot when its base is pruned.
+        """
+        keep_count = settings.get("revision_keep_per_note", 200)
+        keep_days = settings.get("revision_keep_days", 90)
+        ids = [r[0] for r in cursor.execute(
+            "SELECT revision_id FROM note_revisions WHERE note_id = ? ORDER BY revision_id", (note_id,)
+        )]
+        drop = max(0, len(ids) - keep_count) if keep_count else 0
+        if keep_days:
+            cutoff = time.time() - keep_days * 86400
+            expired = cursor.execute(
+                "SELECT COUNT(*) FROM note_revisions WHERE note_id = ? AND created_at < ?", (note_id, cutoff)
+            ).fetchone()[0]
+            drop = max(drop, expired)
+        # Always keep the latest revision
+        drop = min(drop, len(ids) - 1)
+        if drop <= 0:
+            return
+        first_kept = ids[drop]
+        row = cursor.execute("SELECT is_snapshot FROM note_revisions WHERE revision_id = ?", (first_kept,)).fetchone()
+        if not row[0]:
+            body = self._reconstruct_revision(cursor, note_id, first_kept)
+            cursor.execute(
+                "UPDATE note_revisions SET is_snapshot = 1, data = ? WHERE revision_id = ?",
+                (encode_snapshot(body), first_kept)
+            )
+        cursor.execute("DELETE FROM note_revisions WHERE note_id = ? AND revision_id < ?", (note_id, first_kept))
+
+    def _reconstruct_revision(self, cursor, note_id, revision_id):
+        cursor.execute("""
+            SELECT is_snapshot, data FROM note_revisions
+            WHERE note_id = ? AND revision_id <= ? AND revision_id >= (
+                SELECT MAX(revision_id) FROM note_revisions
+                WHERE note_id = ? AND revision_id <= ? AND is_snapshot = 1
+            )
+            ORDER BY revision_id
+        """, (note_id, revision_id, note_id, revision_id))
+        body = None
+        for is_snapshot, data in cursor.fetchall():
+            body = decode_snapshot(data) if is_snapshot else apply_delta(body, data)
+        return body
+
+    def get_note_revisions(self, note_id):
+        """Returns the stored revisions of a note, newest first, without their contents."""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT revision_id, created_at, is_snapshot, size, length(data)
+                FROM note_revisions WHERE note_id = ? ORDER BY revision_id DESC
+            """, (note_id,))
+            return [
+                {"revision_id": rid, "created_at": created_at, "is_snapshot": bool(is_snapshot),
+                 "size": size, "stored_bytes": stored_bytes}
+                for rid, created_at, is_snapshot, size, stored_bytes in cursor.fetchall()
+            ]
+        finally:
+            conn.close()
+
+    def get_revision_body(self, revision_id):
+        """Reconstructs the note body as it was at the given revision, or None if it doesn't exist."""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            row = cursor.execute("SELECT note_id FROM note_revisions WHERE revision_id = ?", (revision_id,)).fetchone()
+            if not row:
+                return None
+            return self._reconstruct_revision(cursor, row[0], revision_id)
+        finally:
+            conn.close()
+
+    def get_tasks(self, include_checked=False):
+        """
+        Returns checklist items across all notes, ordered by folder, note and line.
+        By default only open (unchecked) tasks are returned.
+        """
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT t.note_id, t.line, t.text, t.checked, n.title, f.folder_id, f.name
+                FROM note_tasks t
+                JOIN notes n ON n.note_id = t.note_id
+                JOIN folders f ON n.folder_id = f.folder_id
+                {"" if include_checked else "WHERE t.checked = 0"}
+                ORDER BY f.name, n.sort_order, t.line
+            """)
+            return [
+                {"note_id": nid, "line": line, "text": text, "checked": bool(checked),
+                 "title": title, "folder_id": fid, "folder_name": folder_name}
+                for nid, line, text, checked, title, fid, folder_name in cursor.fetchall()
+            ]
+        finally:
+            conn.close()
+
+    def get_backlinks(self, note_id):
+        """
+        Returns the notes that link to the given note, either as a [[Title]]
+        reference or as a markdown link whose target is the note's title.
+        """
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            row = cursor.execute("SELECT title FROM notes WHERE note_id = ?", (note_id,)).fetchone()
+            if not row:
+                return []
+            cursor.execute("""
+                SELECT DISTINCT n.note_id, n.title, f.folder_id, f.name
+                FROM note_references r
+                JOIN notes n ON n.note_id = r.note_id
+                JOIN folders f ON n.folder_id = f.folder_id
+                WHERE r.value = ? AND r.kind IN ('note', 'link') AND r.note_id != ?
+                ORDER BY f.name, n.sort_order
+            """, (row[0].strip().lower(), note_id))
+            return [
+                {"note_id": nid, "title": title, "folder_id": fid, "folder_name": folder_name}
+                for nid, title, fid, folder_name in cursor.fetchall()
+            ]
+        finally:
+            conn.close()
+
+    def get_note_references(self, note_id):
+        """Returns the indexed links and entities of a single note, in document order."""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT kind, value, line FROM note_references WHERE note_id = ? ORDER BY line",
+                (note_id,)
+            )
+            return [{"kind": kind, "value": value, "line": line} for kind, value, line in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def find_reference_occurrences(self, value):
+        """
+        Returns every indexed occurrence of an entity (IP, host, CVE, URL, note link)
+        across all notes. This is an index lookup rather than a LIKE scan of the bodies.
+        """
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT r.kind, r.line, n.note_id, n.title, f.folder_id, f.name
+                FROM note_references r
+                JOIN notes n ON n.note_id = r.note_id
+                JOIN folders f ON n.folder_id = f.folder_id
+                WHERE r.value = ?
+                ORDER BY f.name, n.sort_order, r.line
+            """, (normalize_reference(value),))
+            return [
+                {"kind": kind, "line": line, "note_id": nid, "title": title,
+                 "folder_id": fid, "folder_name": folder_name}
+                for kind, line, nid, title, fid, folder_name in cursor.fetchall()
+            ]
         finally:
             conn.close()
 
@@ -186,20 +1172,10 @@ class StorageManager:
         json_path = JSON_IMPORT_PATH
         if os.path.exists(json_path):
             log.info("Found 'cybernotes_data.json', attempting to import.")
+            from features.importer import import_json_file
             try:
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-
-                # The data from json.load has keys as strings, we need to fix this first
-                data['folders'] = {int(k): v for k, v in data['folders'].items()}
-                data['notes'] = {int(k): v for k, v in data['notes'].items()}
-
-                save_successful = self.save(data)
-
-                if save_successful:
-                    os.rename(json_path, f"{json_path}.imported")
-                    log.info("Successfully imported data. The old file has been renamed.")
-                else:
-                    log.error("Import failed due to a database error. The JSON file has not been changed.")
+                import_json_file(self, json_path)
+                os.rename(json_path, f"{json_path}.imported")
+                log.info("Successfully imported data. The old file has been renamed.")
             except Exception as e:
-                log.error(f"Failed to read or process JSON file: {e}")
+                log.error(f"Failed to import the JSON file, it has not been changed: {e}")
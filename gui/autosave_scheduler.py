@@ -0,0 +1,77 @@
+# gui/autosave_scheduler.py
+import time
+from PySide6.QtCore import QObject, QTimer
+from utils.logger import get_logger
+
+log = get_logger(__name__)
+
+
+class AutosaveScheduler(QObject):
+    """
+    Saves every modified editor tab in a single batch, replacing per-tab autosave timers.
+
+    A save happens once the user pauses typing for `idle_ms`, but never sooner than
+    MIN_SAVE_GAP_SECONDS after the previous one. While the user keeps typing, the
+    deadline timer still guarantees a save at most `interval_ms` after the first
+    unsaved change.
+    """
+    MIN_SAVE_GAP_SECONDS = 5
+
+    def __init__(self, sidebar, editors, interval_ms=30000, idle_ms=2000, parent=None):
+        super().__init__(parent)
+        self.sidebar = sidebar
+        # Live {note_id: EditorPanel} mapping owned by the main window
+        self.editors = editors
+        self.idle_ms = idle_ms
+        self._last_save = 0.0
+
+        # start() is always given the delay, since it also overwrites the interval
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.timeout.connect(self._on_idle)
+
+        self.deadline_timer = QTimer(self)
+        self.deadline_timer.setSingleShot(True)
+        self.deadline_timer.setInterval(interval_ms)
+        self.deadline_timer.timeout.connect(self.flush)
+
+    def set_interval(self, interval_ms):
+        self.deadline_timer.setInterval(interval_ms)
+
+    def notify_modified(self):
+        """Called whenever an editor's content changes."""
+        self.idle_timer.start(self.idle_ms)
+        if not self.deadline_timer.isActive():
+            self.deadline_timer.start()
+
+    def _on_idle(self):
+        remaining = self.MIN_SAVE_GAP_SECONDS - (time.monotonic() - self._last_save)
+        if remaining > 0:
+            self.idle_timer.start(int(remaining * 1000))
+            return
+        self.flush()
+
+    def flush(self):
+        """
+        Writes the content of all modified tabs with one save.
+        Returns True if a save was performed and succeeded.
+        """
+        self.idle_timer.stop()
+        self.deadline_timer.stop()
+        dirty = [editor for editor in self.editors.values() if editor.is_modified]
+        if not dirty:
+            return False
+
+        bodies = {}
+        for editor in dirty:
+            bodies[editor.current_note_id] = editor.text()
+            editor.is_modified = False
+        self._last_save = time.monotonic()
+        if self.sidebar.update_notes_content(bodies):
+            log.info(f"Autosaved {len(bodies)} modified note(s).")
+            return True
+        # Keep the tabs dirty so the next tick retries
+        for editor in dirty:
+            editor.is_modified = True
+        self.deadline_timer.start()
+        return False
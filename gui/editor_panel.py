@@ -1,8 +1,8 @@
 import os
-import re
 import pathlib
+import re
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QTextEdit, QHBoxLayout,
+    QWidget, QVBoxLayout, QTextEdit, QPlainTextEdit, QHBoxLayout,
     QPushButton, QMessageBox, QApplication
 )
 from PySide6.QtCore import Qt, Signal, QTimer, QUrl, QThread, QObject, Slot
@@ -16,15 +16,18 @@ try:
 except ImportError:
     WEB_ENGINE_AVAILABLE = False
 
+# Rough memory held by one preview web view, for the main window's tab budget
+PREVIEW_COST_BYTES = 16 * 1024 * 1024
 
-import markdown
-from markdown.extensions.fenced_code import FencedCodeExtension
-from markdown.extensions.tables import TableExtension
-from pymdownx.tasklist import TasklistExtension
+# Characters outside the BMP, which Qt counts as two UTF-16 code units and Python as one
+WIDE_CHAR_RE = re.compile('[\U00010000-\U0010FFFF]')
 
-from pygments.formatters import HtmlFormatter
+from features.markdown_renderer import render_preview_markdown, get_pygments_css
 from features.image_handler import select_image, image_path_to_markdown
 from features.command_runner import CommandRunner
+from features.checklists import set_task_state
+from features.metrics import compute_text_metrics
+from utils.perf import timed_function
 from gui.command_dialog import RunCommandDialog
 
 
@@ -32,19 +35,55 @@ class ChecklistBridge(QObject):
     state_changed = Signal(int, bool)
 
     @Slot(int, bool)
-    def update_checklist_state(self, task_list_item_index, is_checked):
-        self.state_changed.emit(task_list_item_index, is_checked)
+    def update_checklist_state(self, line_number, is_checked):
+        self.state_changed.emit(line_number, is_checked)
+
+
+class MarkdownEdit(QPlainTextEdit):
+    """Plain-text markdown editor that asks before pasting very large text."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.paste_warning_chars = 1024 * 1024
+
+    def insertFromMimeData(self, source):
+        if source.hasText():
+            size = len(source.text())
+            if size > self.paste_warning_chars:
+                answer = QMessageBox.question(
+                    self, "Large Paste",
+                    f"The clipboard holds {size / (1024 * 1024):.1f} MB of text. Pasting it may make "
+                    f"the editor slow.\n\nPaste anyway?"
+                )
+                if answer != QMessageBox.Yes:
+                    return
+        super().insertFromMimeData(source)
 
 
 class EditorPanel(QWidget):
     note_saved = Signal(int, str)
     metrics_updated = Signal(dict)
+    # Emitted on every unsaved change; autosaving is scheduled by the main window
+    modified = Signal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.current_note_id = None
         self._is_modified = False
         self.command_thread = None
+        self._command_running = False
+        # Crash-recovery journal, set by the main window
+        self.journal = None
+        self._loading = False
+        # Snapshot of the editor text, dropped on every change so it is built at most once per edit
+        self._text_cache = None
+        # Length of the note in code points as last journaled, and whether it may hold
+        # characters Qt counts differently (see _on_contents_change)
+        self._journal_length = 0
+        self._wide_chars = False
+        # Above this size live preview and full metrics are paused (see apply_settings)
+        self.large_note_chars = 512 * 1024
+        self.large_note_mode = False
 
         self.preview_timer = QTimer(self)
         self.preview_timer.setSingleShot(True)
@@ -62,9 +101,13 @@ class EditorPanel(QWidget):
         button_layout.addWidget(self.btn_img)
         button_layout.addWidget(self.btn_term)
         button_layout.addStretch()
+        # Large notes only render their preview on request
+        self.btn_preview = QPushButton("🔄 Render Preview")
+        self.btn_preview.setVisible(False)
+        button_layout.addWidget(self.btn_preview)
         layout.addLayout(button_layout)
 
-        self.editor = QTextEdit()
+        self.editor = MarkdownEdit()
         if WEB_ENGINE_AVAILABLE:
             self.preview = QWebEngineView()
             self.page = QWebEnginePage(self.preview)
@@ -84,19 +127,39 @@ class EditorPanel(QWidget):
         self.btn_save.clicked.connect(self._save_note)
         self.btn_img.clicked.connect(self._insert_image)
         self.btn_term.clicked.connect(self._run_terminal_command)
+        self.btn_preview.clicked.connect(self._update_preview)
         self.editor.textChanged.connect(self.trigger_preview_update)
-
-        self.autosave_timer = QTimer(self)
-        self.autosave_timer.setInterval(30000)
-        self.autosave_timer.timeout.connect(self._autosave)
-        self.autosave_timer.start()
+        self.editor.document().contentsChange.connect(self._on_contents_change)
 
         self.clear_and_disable()
 
+    def text(self):
+        """Returns the note text, copying it out of the document only once per change."""
+        if self._text_cache is None:
+            self._text_cache = self.editor.toPlainText()
+        return self._text_cache
+
     def trigger_preview_update(self):
         self._mark_as_modified()
         self.calculate_metrics()
-        self.preview_timer.start()
+        if not self.large_note_mode:
+            self.preview_timer.start()
+
+    def _update_large_note_mode(self):
+        large = self.editor.document().characterCount() > self.large_note_chars
+        if large == self.large_note_mode:
+            return
+        self.large_note_mode = large
+        self.btn_preview.setVisible(large)
+        if large:
+            self.preview_timer.stop()
+            notice = "Large note: live preview is paused. Use 'Render Preview' to show it."
+            if WEB_ENGINE_AVAILABLE:
+                self.preview.setHtml(f"<html><body style='background-color:#2b2b2b;color:#dcdcdc;'>{notice}</body></html>")
+            else:
+                self.preview.setPlainText(notice)
+        else:
+            self.preview_timer.start()
 
     def apply_settings(self, settings):
         font = QFont(
@@ -104,21 +167,21 @@ class EditorPanel(QWidget):
             settings.get("editor_font_size", 11)
         )
         self.editor.setFont(font)
+        self.large_note_chars = settings.get("large_note_threshold_kb", 512) * 1024
+        self.editor.paste_warning_chars = settings.get("paste_warning_kb", 1024) * 1024
+        self._update_large_note_mode()
 
+    @timed_function("editor.calculate_metrics")
     def calculate_metrics(self):
-        text = self.editor.toPlainText()
-        words = len(text.split()) if text else 0
-        chars = len(text)
-        lines = text.count('\n') + 1 if text else 0
-        images = len(re.findall(r'!\[.*?\]\(.*?\)', text))
-        links = len(re.findall(r'https?://[^\s)]+', text))
-        metrics = {
-            "words": words,
-            "chars": chars,
-            "lines": lines,
-            "images": images,
-            "links": links
-        }
+        if self.large_note_mode:
+            # Counting words, images and links means scanning megabytes on every keystroke
+            document = self.editor.document()
+            metrics = {
+                "words": "-", "chars": document.characterCount() - 1, "lines": document.blockCount(),
+                "images": "-", "links": "-"
+            }
+        else:
+            metrics = compute_text_metrics(self.text())
         self.metrics_updated.emit(metrics)
 
     def clear_and_disable(self):
@@ -138,11 +201,16 @@ class EditorPanel(QWidget):
 
     def load_note(self, nid, title, body):
         self.current_note_id = nid
+        self._loading = True
         self.editor.blockSignals(True)
         self.editor.setPlainText(body or "")
         self.editor.blockSignals(False)
-        self._is_modified = False
+        self._loading = False
+        self._journal_length = len(body or "")
+        self._wide_chars = WIDE_CHAR_RE.search(body or "") is not None
+        self._update_large_note_mode()
         self.trigger_preview_update()
+        self._is_modified = False
         self.btn_save.setEnabled(True)
         self.btn_img.setEnabled(True)
         self.btn_term.setEnabled(True)
@@ -150,13 +218,73 @@ class EditorPanel(QWidget):
         self.editor.setFocus()
         self.calculate_metrics()
 
+    def memory_estimate(self):
+        """Approximate bytes this tab holds: the text in the document, its layout and undo history, and the preview."""
+        return self.editor.document().characterCount() * 2 * 3 + (PREVIEW_COST_BYTES if WEB_ENGINE_AVAILABLE else 0)
+
+    @property
+    def is_modified(self):
+        """True while the tab holds edits that haven't been saved."""
+        return self._is_modified
+
+    @is_modified.setter
+    def is_modified(self, modified):
+        # Set by batched saves; unlike _mark_as_modified() this doesn't notify listeners
+        self._is_modified = modified
+
+    def is_busy(self):
+        """True while a command runs whose output this tab is waiting for."""
+        return self._command_running
+
+    def view_state(self):
+        """Returns the cursor position and scroll offset, to be restored with restore_view_state()."""
+        return {
+            "cursor": self.editor.textCursor().position(),
+            "scroll": self.editor.verticalScrollBar().value(),
+        }
+
+    def restore_view_state(self, state):
+        cursor = self.editor.textCursor()
+        cursor.setPosition(min(state.get("cursor", 0), self.editor.document().characterCount() - 1))
+        self.editor.setTextCursor(cursor)
+        # Applied once the editor has been laid out, otherwise the scroll range is still empty
+        scroll = state.get("scroll", 0)
+        QTimer.singleShot(0, self.editor, lambda: self.editor.verticalScrollBar().setValue(scroll))
+
     def _mark_as_modified(self):
         self._is_modified = True
+        self.modified.emit()
+
+    def _on_contents_change(self, position, chars_removed, chars_added):
+        """Appends every edit to the recovery journal until the note is saved."""
+        self._text_cache = None
+        if chars_added != chars_removed:
+            self._update_large_note_mode()
+        if self.journal is None or self.current_note_id is None or self._loading:
+            return
+        document = self.editor.document()
+        length = document.characterCount() - 1
+        cursor = QTextCursor(document)
+        cursor.setPosition(min(position, length))
+        cursor.setPosition(min(position + chars_added, length), QTextCursor.KeepAnchor)
+        added_text = cursor.selectedText().replace('\u2029', '\n')
+        if self._wide_chars or WIDE_CHAR_RE.search(added_text):
+            # Qt counts UTF-16 code units but the journal is replayed on Python strings, so
+            # the edit is converted to code points: the text before `position` is unchanged
+            # by it, and what was removed follows from the length before and after.
+            self._wide_chars = True
+            text = self.text()
+            position = len(text.encode('utf-16-le')[:position * 2].decode('utf-16-le'))
+            length = len(text)
+            chars_removed = self._journal_length - length + len(added_text)
+        self.journal.record(self.current_note_id, position, chars_removed, added_text, length)
+        self._journal_length = length
 
     def _save_note(self):
         if self.current_note_id is not None:
-            self.note_saved.emit(self.current_note_id, self.editor.toPlainText())
+            # Cleared before emitting so listeners of the save see this note as clean
             self._is_modified = False
+            self.note_saved.emit(self.current_note_id, self.text())
             if self.window():
                 self.window().statusBar().showMessage("Note saved!", 2000)
 
@@ -164,26 +292,19 @@ class EditorPanel(QWidget):
         if self._is_modified:
             self._save_note()
 
+    @timed_function("editor.update_preview")
     def _update_preview(self):
-        raw_text = self.editor.toPlainText()
-        css = HtmlFormatter(style='monokai').get_style_defs('.codehilite')
+        raw_text = self.text()
+        css = get_pygments_css()
         js_script = (
             """<script type="text/javascript" src="qrc:///qtwebchannel/qwebchannel.js"></script>"""
             """<script>document.addEventListener("DOMContentLoaded",function(){"""
             """new QWebChannel(qt.webChannelTransport,function(c){window.py_bridge=c.objects.py_bridge;"""
-            """var e=document.querySelectorAll("li.task-list-item");"""
-            """e.forEach(function(c,t){let n=c.querySelector('input[type=checkbox]');"""
+            """var e=document.querySelectorAll("li.task-list-item[data-line]");"""
+            """e.forEach(function(c){let t=parseInt(c.dataset.line,10),n=c.querySelector('input[type=checkbox]');"""
             """n&&n.addEventListener("change",function(c){window.py_bridge&&window.py_bridge.update_checklist_state(t,c.target.checked)})})})});</script>"""
         )
-
-
-        md_extensions = [
-            FencedCodeExtension(),
-            TableExtension(),
-            TasklistExtension(custom_checkbox=True)
-        ]
-        html_body = markdown.markdown(raw_text, extensions=md_extensions)
-
+        html_body = render_preview_markdown(raw_text)
 
         full_html = (
             f"""<html><head><meta charset="UTF-8">{js_script}"""
@@ -203,35 +324,30 @@ class EditorPanel(QWidget):
             self.preview.setPlainText(full_html)
 
     @Slot(int, bool)
-    def _on_checklist_toggled(self, task_list_item_index, is_checked):
-        text = self.editor.toPlainText()
-        lines = text.split('\n')
-        task_count = -1
-        target_line_index = -1
-        for i, line in enumerate(lines):
-            if line.lstrip().startswith(('- [ ] ', '- [x] ', '* [ ] ', '* [x] ')):
-                task_count += 1
-                if task_count == task_list_item_index:
-                    target_line_index = i
-                    break
-        if target_line_index != -1:
-            line_content = lines[target_line_index]
-            if is_checked:
-                new_line = line_content.replace('[ ]', '[x]', 1)
-            else:
-                new_line = line_content.replace('[x]', '[ ]', 1)
-            if new_line != line_content:
-                self.editor.blockSignals(True)
-                cursor = self.editor.textCursor()
-                cursor.beginEditBlock()
-                cursor.movePosition(QTextCursor.Start)
-                for _ in range(target_line_index):
-                    cursor.movePosition(QTextCursor.NextBlock)
-                cursor.select(QTextCursor.LineUnderCursor)
-                cursor.insertText(new_line)
-                cursor.endEditBlock()
-                self.editor.blockSignals(False)
-                self._mark_as_modified()
+    def _on_checklist_toggled(self, line_number, is_checked):
+        # The preview tags each checklist item with its source line, which is the block number
+        block = self.editor.document().findBlockByNumber(line_number)
+        if not block.isValid():
+            return
+        line_content = block.text()
+        new_line = set_task_state(line_content, is_checked)
+        if new_line != line_content:
+            self.editor.blockSignals(True)
+            cursor = QTextCursor(block)
+            cursor.beginEditBlock()
+            cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+            cursor.insertText(new_line)
+            cursor.endEditBlock()
+            self.editor.blockSignals(False)
+            self._mark_as_modified()
+
+    def replace_text(self, text):
+        """Replaces the whole note content as a single undoable edit."""
+        cursor = self.editor.textCursor()
+        cursor.beginEditBlock()
+        cursor.select(QTextCursor.Document)
+        cursor.insertText(text)
+        cursor.endEditBlock()
 
     def _insert_text(self, text):
         self.editor.textCursor().insertText(text)
@@ -254,13 +370,20 @@ class EditorPanel(QWidget):
                 worker.moveToThread(self.command_thread)
                 self.command_thread.started.connect(worker.run)
                 worker.finished.connect(self._on_command_finished)
+                worker.progress.connect(self._on_command_progress)
                 worker.finished.connect(self.command_thread.quit)
                 worker.finished.connect(worker.deleteLater)
                 self.command_thread.finished.connect(self.command_thread.deleteLater)
                 self.command_thread.start()
+                self._command_running = True
                 self.btn_term.setEnabled(False)
 
+    def _on_command_progress(self, lines):
+        if self.window():
+            self.window().statusBar().showMessage(f"Running command... {lines} line(s) of output")
+
     def _on_command_finished(self, markdown_output):
+        self._command_running = False
         if not self.isVisible():
             return
         self._insert_text(markdown_output)
@@ -0,0 +1,87 @@
+# gui/history_dialog.py
+from datetime import datetime
+from PySide6.QtWidgets import (
+    QDialog, QHBoxLayout, QVBoxLayout, QListWidget, QListWidgetItem, QTextEdit,
+    QDialogButtonBox, QLabel, QPushButton, QSplitter, QMessageBox
+)
+from PySide6.QtCore import Qt, Signal
+
+class HistoryDialog(QDialog):
+    # Emitted with the reconstructed body when the user restores a revision
+    revision_restored = Signal(str)
+
+    def __init__(self, storage_manager, note_id, note_title, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"History - {note_title}")
+        self.storage = storage_manager
+        self.note_id = note_id
+
+        # UI Elements
+        self.revision_list = QListWidget()
+        self.preview = QTextEdit()
+        self.preview.setReadOnly(True)
+        self.info_label = QLabel()
+        self.restore_button = QPushButton("Restore This Version")
+        self.restore_button.setEnabled(False)
+        button_box = QDialogButtonBox(QDialogButtonBox.Close)
+
+        # Layout
+        splitter = QSplitter(Qt.Horizontal)
+        splitter.addWidget(self.revision_list)
+        splitter.addWidget(self.preview)
+        splitter.setSizes([220, 580])
+        bottom_layout = QHBoxLayout()
+        bottom_layout.addWidget(self.info_label, 1)
+        bottom_layout.addWidget(self.restore_button)
+        bottom_layout.addWidget(button_box)
+        layout = QVBoxLayout(self)
+        layout.addWidget(splitter)
+        layout.addLayout(bottom_layout)
+
+        # Connections
+        self.revision_list.currentItemChanged.connect(self._on_revision_selected)
+        self.restore_button.clicked.connect(self._restore_selected)
+        button_box.rejected.connect(self.reject)
+
+        self.resize(800, 500)
+        self.populate()
+
+    def populate(self):
+        revisions = self.storage.get_note_revisions(self.note_id)
+        self.revision_list.clear()
+        if not revisions:
+            item = QListWidgetItem("No saved revisions yet.")
+            item.setFlags(item.flags() & ~Qt.ItemIsEnabled)
+            self.revision_list.addItem(item)
+            return
+        stored = sum(rev["stored_bytes"] for rev in revisions)
+        self.info_label.setText(f"{len(revisions)} revision(s), {stored / 1024:.1f} KB stored")
+        for rev in revisions:
+            timestamp = datetime.fromtimestamp(rev["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            item = QListWidgetItem(f"{timestamp}  ({rev['size']} chars)")
+            item.setData(Qt.UserRole, rev["revision_id"])
+            self.revision_list.addItem(item)
+        self.revision_list.setCurrentRow(0)
+
+    def _on_revision_selected(self, item, _previous=None):
+        revision_id = item.data(Qt.UserRole) if item else None
+        if revision_id is None:
+            self.preview.clear()
+            self.restore_button.setEnabled(False)
+            return
+        body = self.storage.get_revision_body(revision_id)
+        self.preview.setPlainText(body or "")
+        self.restore_button.setEnabled(body is not None)
+
+    def _restore_selected(self):
+        item = self.revision_list.currentItem()
+        if not item or item.data(Qt.UserRole) is None:
+            return
+        reply = QMessageBox.question(
+            self, "Restore Revision",
+            "Replace the note's current content with this version?\nThe current content stays in the history.",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.revision_restored.emit(self.preview.toPlainText())
+            self.accept()
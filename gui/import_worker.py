@@ -0,0 +1,41 @@
+# gui/import_worker.py
+from PySide6.QtCore import QObject, Signal
+from utils.logger import get_logger
+
+log = get_logger(__name__)
+
+
+class ImportWorker(QObject):
+    """
+    Runs a features.importer import, or a merge of another database (`kind` "database"),
+    in a separate thread.
+    `progress` carries (notes written, total), total being -1 when it isn't known up front.
+    """
+    progress = Signal(int, int)
+    finished = Signal(dict)
+    failed = Signal(str)
+
+    def __init__(self, storage, path, kind):
+        super().__init__()
+        self.storage = storage
+        self.path = path
+        self.kind = kind
+
+    def run(self):
+        from features.importer import import_markdown_tree, import_json_file
+
+        def report(done, total):
+            self.progress.emit(done, -1 if total is None else total)
+
+        try:
+            if self.kind == "markdown":
+                summary = import_markdown_tree(self.storage, self.path, progress=report)
+            elif self.kind == "database":
+                summary = self.storage.merge_from(self.path, progress=lambda done: report(done, None))
+            else:
+                summary = import_json_file(self.storage, self.path, progress=report)
+        except Exception as e:
+            log.error(f"{'Merge' if self.kind == 'database' else 'Import'} of {self.path} failed: {e}")
+            self.failed.emit(str(e))
+            return
+        self.finished.emit(summary)
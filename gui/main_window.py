@@ -1,17 +1,36 @@
+import json
+import os
+import sqlite3
+from collections import OrderedDict
 from PySide6.QtWidgets import (
-    QMainWindow, QSplitter, QMessageBox, QFileDialog, QLabel, QTabWidget
+    QMainWindow, QSplitter, QMessageBox, QFileDialog, QLabel, QTabWidget, QProgressDialog
 )
 from PySide6.QtGui import QAction
-from PySide6.QtCore import Qt, QSettings
+from PySide6.QtCore import Qt, QSettings, QTimer, QThread
 
 from gui.sidebar_panel import SidebarPanel
-from gui.editor_panel import EditorPanel
 from gui.settings_dialog import SettingsDialog
 from features.storage import StorageManager, DatabaseCorruptError
-from utils.helpers import SETTINGS, get_settings, log
-from features.export import export_notes_to_file
+from features.migrations import SchemaVersionError
+from features.journal import EditJournal
+from utils.helpers import get_settings
+from utils.logger import get_logger, get_log_directory
+from utils.perf import registry as perf_registry, increment
+from utils.profiling import profiler
+from utils.settings import get_settings_service
+from utils.startup_timer import startup_timer
 from gui.search_dialog import SearchDialog
+from gui.tasks_dialog import TasksDialog
+from gui.history_dialog import HistoryDialog
+from gui.autosave_scheduler import AutosaveScheduler
 from gui.help_dialogs import MarkdownGuideDialog
+from gui.performance_dialog import PerformanceDialog
+from gui.import_worker import ImportWorker
+from gui.maintenance_scheduler import MaintenanceScheduler
+from gui.maintenance_dialog import MaintenanceDialog
+from gui.tab_placeholder import TabPlaceholder
+
+log = get_logger(__name__)
 
 
 class PieceNoteMainWindow(QMainWindow):
@@ -22,13 +41,25 @@ class PieceNoteMainWindow(QMainWindow):
 
         # A dictionary to keep track of open tabs: {note_id: editor_widget}
         self.open_tabs = {}
+        # Tabs whose editor is built on first activation: {note_id: TabPlaceholder}
+        self.placeholder_tabs = {}
+        # Note ids of the live editor tabs, least recently activated first
+        self._tab_usage = OrderedDict()
 
         try:
             self.storage = StorageManager()
+            startup_timer.mark("open database")
             self.sidebar = SidebarPanel(self.storage)
+            startup_timer.mark("load sidebar")
         except DatabaseCorruptError:
             self.handle_db_corruption()
             return
+        except SchemaVersionError as e:
+            # Written by a newer version: leave the file alone
+            self.storage = None
+            QMessageBox.critical(self, "Database Error", str(e))
+            self.close()
+            return
 
         self.tab_widget = QTabWidget()
         self.tab_widget.setTabsClosable(True)
@@ -49,89 +80,361 @@ class PieceNoteMainWindow(QMainWindow):
         self.status_folder_label = QLabel("No folder selected")
         self.status_note_label = QLabel("No note open")
         self.status_metrics_label = QLabel("")
+        self.status_tabs_label = QLabel("")
         self.statusBar().addPermanentWidget(self.status_folder_label)
         self.statusBar().addPermanentWidget(QLabel(" | "))
         self.statusBar().addPermanentWidget(self.status_note_label, 1) # Give it stretch
         self.statusBar().addPermanentWidget(self.status_metrics_label)
+        self.statusBar().addPermanentWidget(self.status_tabs_label)
 
         # --- Signal Connections ---
         self.sidebar.note_open_requested.connect(self.open_note_in_tab)
         self.sidebar.request_status_message.connect(self.statusBar().showMessage)
         self.sidebar.status_message_updated.connect(self.status_folder_label.setText)
+        self.sidebar.references_panel.result_activated.connect(self.handle_search_result)
 
         self.tab_widget.tabCloseRequested.connect(self.close_note_tab)
         self.tab_widget.currentChanged.connect(self.on_tab_changed)
 
+        # Unsaved edits are journaled to disk between saves and replayed after a crash
+        self.journal = EditJournal(f"{self.storage.filepath}.recovery")
+        self._recover_from_journal()
+        self.sidebar.data_saved.connect(self._on_data_saved)
+        self.journal_timer = QTimer(self)
+        self.journal_timer.setInterval(1000)
+        self.journal_timer.timeout.connect(self.journal.flush)
+        self.journal_timer.start()
+
         # Load startup settings
-        self.settings = SETTINGS
+        self.settings = get_settings()
+        # One scheduler batches the autosave of every modified tab
+        self.autosave = AutosaveScheduler(
+            self.sidebar, self.open_tabs,
+            interval_ms=self.settings.get("autosave_interval_seconds", 30) * 1000,
+            parent=self
+        )
+        # Integrity checks, ANALYZE and vacuuming run step by step while the user is idle
+        self.maintenance = MaintenanceScheduler(
+            self.storage, idle_ms=self.settings.get("maintenance_idle_seconds", 60) * 1000, parent=self
+        )
+        self.maintenance.step_finished.connect(self._on_maintenance_step)
+        self.maintenance.corruption_detected.connect(self._on_corruption_detected)
+        self.sidebar.data_saved.connect(self.maintenance.notify_activity)
+        # Other PieceNote windows or the CLI may write the same database
+        self.sidebar.notes_remapped.connect(self._on_notes_remapped)
+        self.external_change_timer = QTimer(self)
+        self.external_change_timer.setInterval(self.settings.get("external_change_poll_seconds", 2) * 1000)
+        self.external_change_timer.timeout.connect(self._check_external_changes)
+        self.external_change_timer.start()
+        self.api_server = None
+        if self.settings.get("api_server_enabled", False):
+            self._start_api_server()
+        get_settings_service().subscribe(self.apply_live_settings)
         self._create_menu_bar()
         self._restore_window_state()
+        if self.settings.get("restore_open_tabs", True):
+            self._restore_open_tabs()
         self.statusBar().showMessage("Ready", 3000)
 
-    def apply_live_settings(self):
+    def apply_live_settings(self, settings):
         """Applies settings that can be changed without a restart."""
-        self.settings = get_settings()
-        # The ONLY live setting is the autosave interval
+        self.settings = settings
         autosave_ms = self.settings.get("autosave_interval_seconds", 30) * 1000
-        for editor in self.open_tabs.values():
-            editor.autosave_timer.setInterval(autosave_ms)
-        log.info(f"Live settings applied. New autosave interval: {autosave_ms}ms.")
+        self.autosave.set_interval(autosave_ms)
+        self.maintenance.set_idle_interval(self.settings.get("maintenance_idle_seconds", 60) * 1000)
+        self.external_change_timer.setInterval(self.settings.get("external_change_poll_seconds", 2) * 1000)
+        self._enforce_tab_budget()
+        log.info(f"Live settings applied. Autosave interval: {autosave_ms}ms.")
 
     def open_note_in_tab(self, note_id):
         if note_id in self.open_tabs:
             self.tab_widget.setCurrentWidget(self.open_tabs[note_id])
             return
+        if note_id in self.placeholder_tabs:
+            # Activating it builds the editor, see on_tab_changed
+            self.tab_widget.setCurrentWidget(self.placeholder_tabs[note_id])
+            return
 
         note = self.sidebar.get_note_by_id(note_id)
         if note is None:
             QMessageBox.warning(self, "Open Note", f"Note with ID {note_id} not found.")
             return
 
+        editor = self._create_editor(note_id, note)
+        index = self.tab_widget.addTab(editor, note["title"])
+        self.tab_widget.setCurrentIndex(index)
+        self.tab_widget.setTabVisible(0, False)
+
+    def _create_editor(self, note_id, note):
+        # Imported on first use: pulls in QtWebEngine and the markdown stack
+        from gui.editor_panel import EditorPanel
         editor = EditorPanel(self)
         # Apply the startup settings (including font) to the new editor
         editor.apply_settings(self.settings)
         editor.note_saved.connect(self.sidebar.update_note_content)
         editor.metrics_updated.connect(self.update_metrics)
+        editor.modified.connect(self.autosave.notify_modified)
+        editor.modified.connect(self.maintenance.notify_activity)
+        editor.journal = self.journal
         editor.load_note(note_id, note["title"], note["body"])
-
-        index = self.tab_widget.addTab(editor, note["title"])
-        self.tab_widget.setCurrentIndex(index)
         self.open_tabs[note_id] = editor
+        return editor
+
+    def _add_placeholder_tab(self, note_id, view_state=None):
+        note = self.sidebar.get_note_by_id(note_id)
+        if note is None or note_id in self.open_tabs or note_id in self.placeholder_tabs:
+            return None
+        placeholder = TabPlaceholder(note_id, view_state)
+        self.placeholder_tabs[note_id] = placeholder
+        self.tab_widget.addTab(placeholder, note["title"])
         self.tab_widget.setTabVisible(0, False)
+        return placeholder
+
+    def _materialize_tab(self, index):
+        """Replaces the placeholder at `index` with a real editor. Returns the editor."""
+        placeholder = self.tab_widget.widget(index)
+        note_id = placeholder.note_id
+        del self.placeholder_tabs[note_id]
+        note = self.sidebar.get_note_by_id(note_id)
+        title = self.tab_widget.tabText(index)
+        # Swapped without signals: the tab is current throughout, as far as the user is concerned
+        self.tab_widget.blockSignals(True)
+        try:
+            if note is None:
+                self.tab_widget.removeTab(index)
+                placeholder.deleteLater()
+                return None
+            editor = self._create_editor(note_id, note)
+            self.tab_widget.removeTab(index)
+            self.tab_widget.insertTab(index, editor, title)
+            self.tab_widget.setCurrentIndex(index)
+        finally:
+            self.tab_widget.blockSignals(False)
+        if placeholder.view_state:
+            editor.restore_view_state(placeholder.view_state)
+        placeholder.deleteLater()
+        increment("tabs.materialized")
+        return editor
+
+    def tab_usage(self):
+        """Live and suspended tab counts and the estimated memory of the live ones, against the budget."""
+        return {
+            "live": len(self.open_tabs),
+            "suspended": len(self.placeholder_tabs),
+            "bytes": sum(editor.memory_estimate() for editor in self.open_tabs.values()),
+            "max_live": self.settings.get("max_live_tabs", 10),
+            "budget_bytes": self.settings.get("tab_memory_budget_mb", 256) * 1024 * 1024,
+        }
+
+    def _enforce_tab_budget(self):
+        """Suspends the least recently used background tabs until the live ones fit the budget."""
+        current = self._current_editor()
+        for note_id in list(self._tab_usage):
+            usage = self.tab_usage()
+            if usage["live"] <= usage["max_live"] and usage["bytes"] <= usage["budget_bytes"]:
+                break
+            if self.open_tabs.get(note_id) is not current:
+                self._suspend_tab(note_id)
+        self._update_tab_status()
+
+    def _suspend_tab(self, note_id):
+        """
+        Saves a background tab and replaces its editor with a placeholder that keeps the
+        cursor and scroll position; activating the tab builds a new editor.
+        """
+        editor = self.open_tabs[note_id]
+        if editor.is_busy():
+            return False
+        if editor.is_modified:
+            editor.is_modified = False
+            if not self.sidebar.update_notes_content({note_id: editor.text()}):
+                # Stays live and dirty, so the next autosave retries
+                editor.is_modified = True
+                return False
+        index = self.tab_widget.indexOf(editor)
+        placeholder = TabPlaceholder(note_id, editor.view_state())
+        self.tab_widget.blockSignals(True)
+        try:
+            title = self.tab_widget.tabText(index)
+            self.tab_widget.removeTab(index)
+            self.tab_widget.insertTab(index, placeholder, title)
+        finally:
+            self.tab_widget.blockSignals(False)
+        del self.open_tabs[note_id]
+        del self._tab_usage[note_id]
+        self.placeholder_tabs[note_id] = placeholder
+        editor.deleteLater()
+        increment("tabs.suspended")
+        log.debug(f"Suspended the tab of note {note_id}.")
+        return True
+
+    def _update_tab_status(self):
+        usage = self.tab_usage()
+        if not usage["live"] and not usage["suspended"]:
+            self.status_tabs_label.setText("")
+            return
+        self.status_tabs_label.setText(
+            f"Tabs: {usage['live']}/{usage['max_live']} live, {usage['suspended']} suspended | "
+            f"~{usage['bytes'] / (1024 * 1024):.0f}/{usage['budget_bytes'] / (1024 * 1024):.0f} MB"
+        )
+
+    def save_all(self):
+        """Saves every modified tab together with the rest of the data in one write."""
+        if not self.autosave.flush():
+            self.sidebar.save_data_to_storage()
+
+    def _recover_from_journal(self):
+        recovered = self.journal.replay(self.sidebar.notes)
+        if not recovered:
+            self.journal.clear()
+            return
+        titles = "\n".join(f"• {self.sidebar.notes[nid]['title']}" for nid in recovered)
+        reply = QMessageBox.question(
+            self,
+            "Recover Unsaved Changes",
+            f"PieceNote did not shut down cleanly. Unsaved changes were found for:\n\n{titles}\n\n"
+            "Recover them?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            for nid, body in recovered.items():
+                self.sidebar.notes[nid]["body"] = body
+            if self.sidebar.save_data_to_storage():
+                log.info(f"Recovered unsaved changes for {len(recovered)} note(s) from the edit journal.")
+                self.journal.clear()
+        else:
+            self.journal.clear()
+
+    def _on_data_saved(self):
+        """Everything but the edits of still-modified tabs is now in the database."""
+        dirty_ids = [nid for nid, editor in self.open_tabs.items() if editor.is_modified]
+        self.journal.retain(dirty_ids)
+
+    def _check_external_changes(self):
+        """Brings in what other processes wrote: reloads clean tabs and closes those of deleted notes."""
+        if not self.storage.has_external_changes():
+            return
+        dirty_ids = {nid for nid, editor in self.open_tabs.items() if editor.is_modified or editor.is_busy()}
+        changes = self.storage.pull_changes()
+        # Unsaved edits win; the other version stays in the note's history once they are saved
+        clashes = dirty_ids & (set(changes["notes"]) | set(changes["deleted_notes"]))
+        updated, deleted = self.sidebar.apply_external_changes(changes, dirty_ids)
+        for note_id in updated:
+            note = self.sidebar.notes[note_id]
+            tab = self.open_tabs.get(note_id) or self.placeholder_tabs.get(note_id)
+            if tab is None:
+                continue
+            self.tab_widget.setTabText(self.tab_widget.indexOf(tab), note["title"])
+            if note_id in self.open_tabs:
+                state = tab.view_state()
+                tab.load_note(note_id, note["title"], note["body"])
+                tab.restore_view_state(state)
+        for note_id in deleted:
+            tab = self.open_tabs.get(note_id) or self.placeholder_tabs.get(note_id)
+            if tab is not None:
+                self.close_note_tab(self.tab_widget.indexOf(tab))
+        if clashes:
+            self.statusBar().showMessage(
+                f"{len(clashes)} open note(s) with unsaved edits were also changed in another window; "
+                "saving keeps your version, the other one stays in Note History.", 8000
+            )
+        elif updated or deleted:
+            self.statusBar().showMessage(
+                f"Updated {len(updated)} and removed {len(deleted)} note(s) changed in another window.", 5000
+            )
+
+    def _on_notes_remapped(self, remapped):
+        """A save gave new notes other ids; the tabs follow them."""
+        for tabs in (self.open_tabs, self.placeholder_tabs):
+            moved = {old: tabs.pop(old) for old in remapped if old in tabs}
+            for old, tab in moved.items():
+                tabs[remapped[old]] = tab
+        for editor in self.open_tabs.values():
+            editor.current_note_id = remapped.get(editor.current_note_id, editor.current_note_id)
+        for placeholder in self.placeholder_tabs.values():
+            placeholder.note_id = remapped.get(placeholder.note_id, placeholder.note_id)
+        self._tab_usage = OrderedDict((remapped.get(nid, nid), None) for nid in self._tab_usage)
+
+    def _start_api_server(self):
+        """Serves the read-only JSON API on localhost next to the GUI (see features/api_server.py)."""
+        from features.api_server import ApiServer
+        try:
+            self.api_server = ApiServer(self.storage.filepath)
+            self.api_server.start_in_thread()
+        except (OSError, ValueError, sqlite3.Error) as e:
+            log.error(f"Could not start the API server: {e}")
+            self.api_server = None
+
+    def _tab_widgets(self):
+        """Note tabs in the order they are shown, editors and placeholders alike."""
+        tabs = set(self.open_tabs.values()) | set(self.placeholder_tabs.values())
+        widgets = (self.tab_widget.widget(index) for index in range(self.tab_widget.count()))
+        return [widget for widget in widgets if widget in tabs]
+
+    def _current_editor(self):
+        """Returns the active editor tab, or None while the placeholder is showing."""
+        widget = self.tab_widget.currentWidget()
+        return widget if widget in self.open_tabs.values() else None
+
+    def prewarm_editor(self):
+        """
+        Loads the editor module and starts the QtWebEngine process behind a hidden view,
+        scheduled right after the window is shown so the first opened tab is fast.
+        """
+        started = startup_timer.now()
+        from gui.editor_panel import WEB_ENGINE_AVAILABLE
+        if WEB_ENGINE_AVAILABLE and not hasattr(self, "_warm_view"):
+            from PySide6.QtWebEngineWidgets import QWebEngineView
+            self._warm_view = QWebEngineView(self)
+            self._warm_view.setVisible(False)
+            self._warm_view.setHtml("<html><body></body></html>")
+        log.info(f"Editor prewarmed in {(startup_timer.now() - started) * 1000:.0f} ms.")
 
     def close_note_tab(self, index):
         editor = self.tab_widget.widget(index)
-        if not isinstance(editor, EditorPanel):
+        if isinstance(editor, TabPlaceholder) and editor.note_id in self.placeholder_tabs:
+            del self.placeholder_tabs[editor.note_id]
+            self.tab_widget.removeTab(index)
+            editor.deleteLater()
+        elif editor in self.open_tabs.values():
+            editor._autosave()
+            del self.open_tabs[editor.current_note_id]
+            self._tab_usage.pop(editor.current_note_id, None)
+            self.tab_widget.removeTab(index)
+        else:
             return
 
-        editor._autosave()
-        del self.open_tabs[editor.current_note_id]
-        self.tab_widget.removeTab(index)
-
-        if len(self.open_tabs) == 0:
+        if not self.open_tabs and not self.placeholder_tabs:
             self.tab_widget.setTabVisible(0, True)
             self.on_tab_changed(-1) # Update status bar to empty state
 
     def on_tab_changed(self, index):
-        editor = self.tab_widget.currentWidget()
-        if isinstance(editor, EditorPanel):
+        if isinstance(self.tab_widget.widget(index), TabPlaceholder):
+            self._materialize_tab(index)
+            index = self.tab_widget.currentIndex()
+        editor = self._current_editor()
+        if editor is not None:
             title = self.tab_widget.tabText(index)
             self.status_note_label.setText(f"Editing: {title}")
             editor.calculate_metrics()
+            self._tab_usage[editor.current_note_id] = None
+            self._tab_usage.move_to_end(editor.current_note_id)
+            self._enforce_tab_budget()
         else:
             self.status_note_label.setText("No note open")
             self.status_metrics_label.setText("")
+            self._update_tab_status()
 
     def update_metrics(self, metrics):
-        active_editor = self.tab_widget.currentWidget()
-        if isinstance(active_editor, EditorPanel) and active_editor == self.sender():
+        active_editor = self._current_editor()
+        if active_editor is not None and active_editor == self.sender():
             text = (f"W: {metrics['words']} | C: {metrics['chars']} | L: {metrics['lines']} | "
                     f"Img: {metrics['images']} | Links: {metrics['links']}")
             self.status_metrics_label.setText(text)
 
     def _export_current_note(self):
-        editor = self.tab_widget.currentWidget()
-        if not isinstance(editor, EditorPanel):
+        editor = self._current_editor()
+        if editor is None:
             QMessageBox.warning(self, "Export Error", "No note tab is currently active.")
             return
         note_id = editor.current_note_id
@@ -158,26 +461,36 @@ class PieceNoteMainWindow(QMainWindow):
         file_menu.addAction("New Folder...", self.sidebar.create_folder, "Ctrl+Shift+N")
         file_menu.addAction("New Note", self.sidebar.create_note, "Ctrl+N")
         file_menu.addSeparator()
-        file_menu.addAction("Save All", self.sidebar.save_data_to_storage, "Ctrl+S")
+        file_menu.addAction("Save All", self.save_all, "Ctrl+S")
         file_menu.addSeparator()
         export_menu = file_menu.addMenu("Export")
         export_menu.addAction("Export Current Note...", self._export_current_note)
         export_menu.addAction("Export Selected Notes...", self._export_selected_notes)
         export_menu.addAction("Export Entire Folder...", self._export_current_folder)
+        import_menu = file_menu.addMenu("Import")
+        import_menu.addAction("Markdown Folder...", self._import_markdown_folder)
+        import_menu.addAction("JSON Export...", self._import_json_file)
+        import_menu.addAction("Merge Database...", self._merge_database)
         file_menu.addSeparator()
         file_menu.addAction("Exit", self.close)
 
         edit_menu = menubar.addMenu("Edit")
         edit_menu.addAction("Search...", self.open_search_dialog, "Ctrl+F")
+        edit_menu.addAction("Open Tasks...", self.open_tasks_dialog, "Ctrl+T")
+        edit_menu.addAction("Note History...", self.open_history_dialog, "Ctrl+H")
         edit_menu.addSeparator()
         edit_menu.addAction("Rename Item", self.sidebar.rename_selected_item, "F2")
         edit_menu.addAction("Delete Item", self.sidebar.delete_selected_item, "Delete")
 
         settings_menu = menubar.addMenu("Settings")
         settings_menu.addAction("Preferences...", self.open_settings)
+        settings_menu.addAction("Database Maintenance...", self.show_maintenance_dialog)
 
         help_menu = menubar.addMenu("Help")
         help_menu.addAction("Markdown Guide", self.show_markdown_guide)
+        help_menu.addAction("Performance...", self.show_performance_dialog)
+        self.profiling_action = help_menu.addAction("Start Profiling", self.toggle_profiling)
+        self._update_profiling_action()
         help_menu.addSeparator()
         help_menu.addAction("About", self.show_about)
 
@@ -220,6 +533,68 @@ class PieceNoteMainWindow(QMainWindow):
         dialog = MarkdownGuideDialog(self)
         dialog.exec()
 
+    def show_performance_dialog(self):
+        dialog = PerformanceDialog(self, tab_usage=self.tab_usage)
+        dialog.exec()
+
+    def show_maintenance_dialog(self):
+        dialog = MaintenanceDialog(self.storage, self.maintenance, self)
+        dialog.exec()
+
+    def _on_maintenance_step(self, result):
+        self.statusBar().showMessage(f"Database maintenance: {result['task']} - {result['result']}", 3000)
+
+    def _on_corruption_detected(self, details):
+        reply = QMessageBox.critical(
+            self,
+            "Database Error",
+            f"The database failed an integrity check:\n\n{details}\n\n"
+            "The notes loaded in PieceNote are unaffected. Restore the last backup "
+            "and write the current notes into it?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            self.statusBar().showMessage("Database is damaged; the existing backup will not be overwritten.")
+            return
+        if not self.storage.restore_from_backup():
+            QMessageBox.warning(self, "Restore Failed", "No backup file was found.")
+            return
+        self.storage.corruption_detected = False
+        self.save_all()
+        self.maintenance.run_now()
+
+    def _profiling_context(self):
+        """Describes what the user was working on, recorded alongside profiling results."""
+        editor = self._current_editor()
+        folder_id = self.sidebar.current_folder
+        return {
+            "active_note_id": editor.current_note_id if editor else None,
+            "active_tab": self.tab_widget.tabText(self.tab_widget.currentIndex()) if editor else None,
+            "open_tabs": len(self.open_tabs),
+            "current_folder": self.sidebar.folders[folder_id]["name"] if folder_id in self.sidebar.folders else None,
+        }
+
+    def toggle_profiling(self):
+        if profiler.active:
+            written = profiler.stop(self._profiling_context())
+            self.statusBar().showMessage(f"Profiling results written to {profiler.output_dir}", 5000)
+            log.info(f"Profiling output: {', '.join(written)}")
+        else:
+            profiler.start(context=self._profiling_context())
+            self.statusBar().showMessage("Profiling started (CPU and memory).", 3000)
+        self._update_profiling_action()
+
+    def _update_profiling_action(self):
+        self.profiling_action.setText("Stop Profiling" if profiler.active else "Start Profiling")
+
+    def _dump_perf_stats(self):
+        path = os.path.join(get_log_directory(), "perf_stats.json")
+        try:
+            perf_registry.dump(path)
+            log.info(f"Performance stats written to {path}")
+        except OSError as e:
+            log.error(f"Could not write performance stats: {e}")
+
     def closeEvent(self, event):
         reply = QMessageBox.question(
             self,
@@ -233,10 +608,19 @@ class PieceNoteMainWindow(QMainWindow):
 
         if self.storage: # Ensure storage was initialized before trying to save
             if reply == QMessageBox.Yes:
-                for editor in self.open_tabs.values():
-                    editor._autosave()
-                self.sidebar.save_data_to_storage()
+                self.save_all()
+            else:
+                # Unsaved changes were discarded on purpose, don't offer them back
+                self.journal.clear()
+            self.journal.close()
             self._save_window_state()
+            if self.settings.get("perf_stats_dump_on_exit"):
+                self._dump_perf_stats()
+            if profiler.active:
+                profiler.stop(self._profiling_context())
+            self.maintenance.stop()
+            if self.api_server is not None:
+                self.api_server.stop()
 
         event.accept()
 
@@ -245,6 +629,17 @@ class PieceNoteMainWindow(QMainWindow):
         settings.setValue("geometry", self.saveGeometry())
         settings.setValue("windowState", self.saveState())
         settings.setValue("splitterSizes", self.splitter.saveState())
+        # Open tabs in display order, with the cursor and scroll position of each
+        tabs = []
+        for widget in self._tab_widgets():
+            if isinstance(widget, TabPlaceholder):
+                tabs.append({"note_id": widget.note_id, **widget.view_state})
+            else:
+                tabs.append({"note_id": widget.current_note_id, **widget.view_state()})
+        editor = self._current_editor()
+        settings.setValue("openTabs", json.dumps({
+            "tabs": tabs, "active": editor.current_note_id if editor else None
+        }))
 
     def _restore_window_state(self):
         settings = QSettings()
@@ -257,11 +652,56 @@ class PieceNoteMainWindow(QMainWindow):
         else:
             self.splitter.setSizes([350, 850])
 
+    def _restore_open_tabs(self):
+        """
+        Reopens the tabs of the last session as placeholders. The active one gets its
+        editor once the event loop runs, the others when they are first shown.
+        """
+        try:
+            session = json.loads(QSettings().value("openTabs") or "{}")
+        except (TypeError, ValueError):
+            return
+        if not session.get("tabs"):
+            return
+        self.tab_widget.blockSignals(True)
+        try:
+            for tab in session["tabs"]:
+                self._add_placeholder_tab(tab.get("note_id"), {
+                    key: tab[key] for key in ("cursor", "scroll") if isinstance(tab.get(key), int)
+                })
+            if not self.placeholder_tabs:
+                return
+            active = self.placeholder_tabs.get(session.get("active")) or self._tab_widgets()[0]
+            self.tab_widget.setCurrentWidget(active)
+        finally:
+            self.tab_widget.blockSignals(False)
+        # Not built right away, so restoring doesn't hold up showing the window
+        QTimer.singleShot(0, self, lambda: self.on_tab_changed(self.tab_widget.currentIndex()))
+        log.info(f"Restored {len(self.placeholder_tabs) + len(self.open_tabs)} tab(s) from the last session.")
+
     def open_search_dialog(self):
         dialog = SearchDialog(self.storage, self)
         dialog.result_activated.connect(self.handle_search_result)
         dialog.exec()
 
+    def open_tasks_dialog(self):
+        dialog = TasksDialog(self.storage, self)
+        dialog.result_activated.connect(self.handle_search_result)
+        dialog.exec()
+
+    def open_history_dialog(self):
+        editor = self._current_editor()
+        if editor is None:
+            QMessageBox.warning(self, "Note History", "No note tab is currently active.")
+            return
+        # Save pending edits first so the current content is part of the history
+        editor._autosave()
+        title = self.tab_widget.tabText(self.tab_widget.currentIndex())
+        dialog = HistoryDialog(self.storage, editor.current_note_id, title, self)
+        dialog.revision_restored.connect(editor.replace_text)
+        dialog.revision_restored.connect(lambda _body: editor._save_note())
+        dialog.exec()
+
     def handle_search_result(self, note_id, folder_id):
         self.sidebar.select_folder_by_id(folder_id)
         self.open_note_in_tab(note_id)
@@ -285,6 +725,75 @@ class PieceNoteMainWindow(QMainWindow):
         folder_name = self.sidebar.folders[folder_id]["name"]
         self._run_export(notes_to_export, single_file=True, default_filename=folder_name)
 
+    def _import_markdown_folder(self):
+        path = QFileDialog.getExistingDirectory(self, "Import Markdown Folder")
+        if path:
+            self._run_import(path, "markdown")
+
+    def _import_json_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import JSON Export", "", "JSON (*.json);;All Files (*)")
+        if path:
+            self._run_import(path, "json")
+
+    def _merge_database(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Merge Database", "", "PieceNote Database (*.sqlite *.db);;All Files (*)"
+        )
+        if path:
+            self._run_import(path, "database")
+
+    def _run_import(self, path, kind):
+        # The import appends to the database directly, so the in-memory model must be
+        # saved first and re-read afterwards; the modal progress dialog keeps edits out meanwhile.
+        self.save_all()
+        self.import_progress = QProgressDialog("Importing notes...", None, 0, 0, self)
+        self.import_progress.setWindowTitle("Import")
+        self.import_progress.setWindowModality(Qt.WindowModal)
+        self.import_progress.setMinimumDuration(0)
+        self.import_progress.setValue(0)
+
+        self.import_thread = QThread()
+        worker = ImportWorker(self.storage, path, kind)
+        worker.moveToThread(self.import_thread)
+        self.import_thread.started.connect(worker.run)
+        worker.progress.connect(self._on_import_progress)
+        worker.finished.connect(self._on_import_finished)
+        worker.failed.connect(self._on_import_failed)
+        worker.finished.connect(self.import_thread.quit)
+        worker.failed.connect(self.import_thread.quit)
+        self.import_thread.finished.connect(worker.deleteLater)
+        self.import_thread.finished.connect(self.import_thread.deleteLater)
+        self.import_thread.start()
+
+    def _on_import_progress(self, done, total):
+        if total > 0:
+            self.import_progress.setMaximum(total)
+            self.import_progress.setValue(done)
+        self.import_progress.setLabelText(f"Importing notes... {done} written")
+
+    def _on_import_finished(self, summary):
+        self.import_progress.close()
+        if "notes_added" in summary:
+            # Picked up like another window's changes, so open tabs of updated notes reload too
+            self._check_external_changes()
+            self.statusBar().showMessage(
+                f"Merged: {summary['notes_added']} note(s) added, {summary['notes_updated']} updated, "
+                f"{summary['notes_kept']} kept because they are newer here, "
+                f"{summary['folders_added']} folder(s) added, {summary['folders_renamed']} renamed.", 10000
+            )
+            return
+        self.sidebar.reload_from_storage()
+        message = f"Imported {summary['notes']} note(s) into {summary['folders']} folder(s)."
+        if summary.get("images"):
+            message += f" {summary['images']} image(s) copied."
+        if summary.get("errors"):
+            message += f" {len(summary['errors'])} file(s) could not be read, see the log."
+        self.statusBar().showMessage(message, 8000)
+
+    def _on_import_failed(self, error):
+        self.import_progress.close()
+        QMessageBox.critical(self, "Import Failed", f"Nothing was imported:\n{error}")
+
     def _run_export(self, notes_list, single_file=False, default_filename="export"):
         if not notes_list:
             return
@@ -304,6 +813,7 @@ class PieceNoteMainWindow(QMainWindow):
             file_format = "md"
 
         try:
+            from features.export import export_notes_to_file
             export_notes_to_file(file_path, notes_list, file_format, single_file)
             self.statusBar().showMessage(f"Successfully exported to {file_path}", 5000)
         except Exception as e:
@@ -0,0 +1,91 @@
+# gui/maintenance_dialog.py
+import sqlite3
+import time
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView,
+    QPushButton, QDialogButtonBox, QLabel, QApplication, QMessageBox
+)
+from PySide6.QtCore import Qt
+from features.maintenance import DatabaseMaintenance
+
+class MaintenanceDialog(QDialog):
+    """Shows the outcome of the background maintenance steps and can start a pass on demand."""
+
+    COLUMNS = ["Step", "Last Run", "Duration (ms)", "Result"]
+
+    def __init__(self, storage, scheduler, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Database Maintenance")
+        self.storage = storage
+        self.maintenance = DatabaseMaintenance(storage)
+        self.scheduler = scheduler
+
+        # UI Elements
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.run_button = QPushButton("Run All Steps Now")
+        self.compact_button = QPushButton("Compact Database")
+        self.compact_button.setToolTip(
+            "Rebuilds the database file in one pass and switches it to incremental vacuuming."
+        )
+        button_box = QDialogButtonBox(QDialogButtonBox.Close)
+
+        # Layout
+        bottom_layout = QHBoxLayout()
+        bottom_layout.addWidget(self.run_button)
+        bottom_layout.addWidget(self.compact_button)
+        bottom_layout.addStretch()
+        bottom_layout.addWidget(button_box)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.table)
+        layout.addLayout(bottom_layout)
+
+        # Connections
+        self.run_button.clicked.connect(self.scheduler.run_now)
+        self.compact_button.clicked.connect(self.compact_database)
+        self.scheduler.step_finished.connect(self.refresh)
+        button_box.rejected.connect(self.reject)
+
+        self.resize(750, 400)
+        self.refresh()
+
+    def compact_database(self):
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            self.storage.vacuum()
+        except sqlite3.Error as e:
+            QApplication.restoreOverrideCursor()
+            QMessageBox.warning(self, "Compact Database", f"The database could not be compacted:\n{e}")
+            return
+        QApplication.restoreOverrideCursor()
+        self.summary_label.setText("Database compacted.")
+
+    def refresh(self, *args):
+        runs = self.maintenance.last_runs()
+        self.table.setRowCount(len(runs))
+        for row, run in enumerate(runs):
+            values = [
+                run["task"],
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["run_at"])),
+                f"{run['duration_ms']:.1f}",
+                run["result"] or "",
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column == 2:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                if not run["ok"]:
+                    item.setForeground(Qt.red)
+                self.table.setItem(row, column, item)
+        failed = [run["task"] for run in runs if not run["ok"]]
+        pending = len(self.maintenance.due_steps())
+        text = f"{len(runs)} step(s) recorded, {pending} due. Steps run in the background while PieceNote is idle."
+        if failed:
+            text = f"<b>Failed: {', '.join(failed)}</b><br>" + text
+        self.summary_label.setText(text)
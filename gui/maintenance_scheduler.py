@@ -0,0 +1,103 @@
+# gui/maintenance_scheduler.py
+import time
+from PySide6.QtCore import QObject, QThread, QTimer, Signal
+from features.maintenance import DatabaseMaintenance
+from utils.logger import get_logger
+
+log = get_logger(__name__)
+
+
+class _MaintenanceWorker(QObject):
+    step_done = Signal(object)  # result dict, or None when nothing was due
+
+    def __init__(self, storage):
+        super().__init__()
+        self.maintenance = DatabaseMaintenance(storage)
+
+    def run_next(self, interval):
+        try:
+            result = self.maintenance.run_next(interval)
+        except Exception as e:
+            log.error(f"Database maintenance failed: {e}")
+            result = None
+        self.step_done.emit(result)
+
+
+class MaintenanceScheduler(QObject):
+    """
+    Runs database maintenance one short step at a time on a background thread,
+    but only once the user has been idle for `idle_ms`. Any activity postpones
+    the next step; a step already running is allowed to finish.
+    """
+    step_finished = Signal(dict)
+    corruption_detected = Signal(str)
+    _run_requested = Signal(object)
+
+    # Pause between consecutive steps of one idle period
+    STEP_GAP_MS = 500
+
+    def __init__(self, storage, idle_ms=60000, parent=None):
+        super().__init__(parent)
+        self.idle_ms = idle_ms
+        self._running = False
+        self._activity_since_request = False
+        # Set by run_now(): every step that last ran before this time is due
+        self._forced_since = None
+
+        # start() is always given the delay, since it also overwrites the interval
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.timeout.connect(self._run_next)
+
+        self.thread = QThread(self)
+        self.worker = _MaintenanceWorker(storage)
+        self.worker.moveToThread(self.thread)
+        self._run_requested.connect(self.worker.run_next)
+        self.worker.step_done.connect(self._on_step_done)
+        self.thread.finished.connect(self.worker.deleteLater)
+        self.thread.start()
+        self.idle_timer.start(self.idle_ms)
+
+    def set_idle_interval(self, idle_ms):
+        self.idle_ms = idle_ms
+
+    def notify_activity(self):
+        """Called on edits and saves; restarts the idle countdown."""
+        self._activity_since_request = True
+        self.idle_timer.start(self.idle_ms)
+
+    def run_now(self):
+        """Runs every step once, starting immediately, whenever they last ran."""
+        self._forced_since = time.time()
+        self._activity_since_request = False
+        self.idle_timer.stop()
+        self._run_next()
+
+    def _run_next(self):
+        if self._running:
+            return
+        self._running = True
+        self._activity_since_request = False
+        interval = None if self._forced_since is None else time.time() - self._forced_since
+        self._run_requested.emit(interval)
+
+    def _on_step_done(self, result):
+        self._running = False
+        if result is None:
+            self._forced_since = None
+            # Nothing due; look again after the next idle period
+            self.idle_timer.start(self.idle_ms)
+            return
+        self.step_finished.emit(result)
+        if result.get("corrupt"):
+            self.corruption_detected.emit(result["result"])
+            return
+        if result.get("postponed") or (self._activity_since_request and self._forced_since is None):
+            self.idle_timer.start(self.idle_ms)
+        else:
+            self.idle_timer.start(self.STEP_GAP_MS)
+
+    def stop(self):
+        self.idle_timer.stop()
+        self.thread.quit()
+        self.thread.wait()
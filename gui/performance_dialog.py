@@ -0,0 +1,96 @@
+# gui/performance_dialog.py
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView,
+    QPushButton, QDialogButtonBox, QLabel, QFileDialog, QMessageBox
+)
+from PySide6.QtCore import Qt, QTimer
+from utils.perf import registry
+
+class PerformanceDialog(QDialog):
+    """Live view of the timings and counters collected by utils.perf."""
+
+    COLUMNS = ["Operation", "Count", "p50 (ms)", "p95 (ms)", "Max (ms)", "Total (ms)"]
+
+    def __init__(self, parent=None, tab_usage=None):
+        super().__init__(parent)
+        self.setWindowTitle("Performance")
+        # Callable returning the main window's editor tab usage, see PieceNoteMainWindow.tab_usage
+        self.tab_usage = tab_usage
+
+        # UI Elements
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.counters_label = QLabel()
+        self.counters_label.setWordWrap(True)
+        self.tabs_label = QLabel()
+        self.reset_button = QPushButton("Reset")
+        self.save_button = QPushButton("Save to File...")
+        button_box = QDialogButtonBox(QDialogButtonBox.Close)
+
+        # Layout
+        bottom_layout = QHBoxLayout()
+        bottom_layout.addWidget(self.reset_button)
+        bottom_layout.addWidget(self.save_button)
+        bottom_layout.addStretch()
+        bottom_layout.addWidget(button_box)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.table)
+        layout.addWidget(self.counters_label)
+        layout.addWidget(self.tabs_label)
+        layout.addLayout(bottom_layout)
+
+        # Connections
+        self.reset_button.clicked.connect(self._reset)
+        self.save_button.clicked.connect(self._save_to_file)
+        button_box.rejected.connect(self.reject)
+
+        # Refresh while open so the numbers follow what the user is doing
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(1000)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start()
+
+        self.resize(700, 450)
+        self.refresh()
+
+    def refresh(self):
+        snapshot = registry.snapshot()
+        timings = snapshot["timings"]
+        self.table.setRowCount(len(timings))
+        for row, (name, stats) in enumerate(timings.items()):
+            values = [
+                name, str(stats["count"]), f"{stats['p50_ms']:.1f}", f"{stats['p95_ms']:.1f}",
+                f"{stats['max_ms']:.1f}", f"{stats['total_ms']:.1f}"
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+        counters = snapshot["counters"]
+        self.counters_label.setText(
+            "Counters: " + ", ".join(f"{name} = {value}" for name, value in counters.items())
+            if counters else ""
+        )
+        if self.tab_usage:
+            usage = self.tab_usage()
+            self.tabs_label.setText(
+                f"Editor tabs: {usage['live']} live (limit {usage['max_live']}), {usage['suspended']} suspended; "
+                f"estimated {usage['bytes'] / (1024 * 1024):.1f} MB of a {usage['budget_bytes'] / (1024 * 1024):.0f} MB budget"
+            )
+
+    def _reset(self):
+        registry.reset()
+        self.refresh()
+
+    def _save_to_file(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Performance Stats", "perf_stats.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            registry.dump(path)
+        except OSError as e:
+            QMessageBox.critical(self, "Save Failed", f"Could not write the stats file:\n{e}")
@@ -0,0 +1,102 @@
+# gui/references_panel.py
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QListWidget, QListWidgetItem
+)
+from PySide6.QtCore import Qt, Signal
+from features.references import KIND_CVE
+
+
+class ReferencesPanel(QWidget):
+    """
+    Shows the backlinks and entities (IPs, hosts, CVEs, URLs) of the selected note,
+    and lists every note mentioning a given entity. All lookups go through the
+    reference index that StorageManager maintains on save.
+    """
+    # Emits note_id and folder_id, same as SearchDialog.result_activated
+    result_activated = Signal(int, int)
+
+    def __init__(self, storage_manager, parent=None):
+        super().__init__(parent)
+        self.storage = storage_manager
+        self.current_note_id = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        header = QHBoxLayout()
+        header.addWidget(QLabel("References"))
+        header.addStretch()
+        layout.addLayout(header)
+
+        self.entity_input = QLineEdit()
+        self.entity_input.setPlaceholderText("Notes mentioning an IP, host, CVE...")
+        self.entity_input.returnPressed.connect(self._on_entity_query)
+        self.entity_input.textChanged.connect(self._on_entity_text_changed)
+        layout.addWidget(self.entity_input)
+
+        self.results_list = QListWidget()
+        self.results_list.itemDoubleClicked.connect(self._on_item_activated)
+        layout.addWidget(self.results_list)
+
+    def show_note(self, note_id):
+        """Lists backlinks to the note followed by the entities it mentions."""
+        self.current_note_id = note_id if note_id is not None and note_id >= 0 else None
+        if self.entity_input.text():
+            return
+        self.results_list.clear()
+        if self.current_note_id is None:
+            return
+
+        for backlink in self.storage.get_backlinks(self.current_note_id):
+            item = QListWidgetItem(f"← {backlink['title']}  (in folder: {backlink['folder_name']})")
+            item.setData(Qt.UserRole, {"note_id": backlink["note_id"], "folder_id": backlink["folder_id"]})
+            self.results_list.addItem(item)
+
+        seen = set()
+        for ref in self.storage.get_note_references(self.current_note_id):
+            key = (ref["kind"], ref["value"])
+            if key in seen:
+                continue
+            seen.add(key)
+            item = QListWidgetItem(f"{ref['kind']}: {self._display_value(ref)}  (line {ref['line'] + 1})")
+            item.setData(Qt.UserRole, {"entity": ref["value"]})
+            self.results_list.addItem(item)
+
+    def refresh(self):
+        if self.entity_input.text():
+            self._on_entity_query()
+        else:
+            self.show_note(self.current_note_id)
+
+    def _display_value(self, ref):
+        return ref["value"].upper() if ref["kind"] == KIND_CVE else ref["value"]
+
+    def _on_entity_text_changed(self, text):
+        if not text:
+            self.show_note(self.current_note_id)
+
+    def _on_entity_query(self):
+        value = self.entity_input.text().strip()
+        if not value:
+            self.show_note(self.current_note_id)
+            return
+        self.results_list.clear()
+        occurrences = self.storage.find_reference_occurrences(value)
+        if not occurrences:
+            item = QListWidgetItem("No notes mention this.")
+            item.setFlags(item.flags() & ~Qt.ItemIsEnabled)
+            self.results_list.addItem(item)
+            return
+        for occ in occurrences:
+            item = QListWidgetItem(f"📄 {occ['title']}  (line {occ['line'] + 1}, in folder: {occ['folder_name']})")
+            item.setData(Qt.UserRole, {"note_id": occ["note_id"], "folder_id": occ["folder_id"]})
+            self.results_list.addItem(item)
+
+    def _on_item_activated(self, item):
+        data = item.data(Qt.UserRole)
+        if not data:
+            return
+        if "entity" in data:
+            self.entity_input.setText(data["entity"])
+            self._on_entity_query()
+        else:
+            self.result_activated.emit(data["note_id"], data["folder_id"])
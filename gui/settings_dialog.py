@@ -3,8 +3,8 @@ from PySide6.QtWidgets import (
     QPushButton, QFontDialog, QLineEdit, QFileDialog, QHBoxLayout, QMessageBox
 )
 from PySide6.QtGui import QFont
-from utils.helpers import get_settings, SETTINGS_FILE_PATH, log
-import json
+from utils.helpers import get_settings
+from utils.settings import get_settings_service
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
@@ -86,7 +86,7 @@ class SettingsDialog(QDialog):
         path_changed = (self.original_paths["db"] != self.db_path_edit.text() or
                         self.original_paths["backup"] != self.backup_path_edit.text())
 
-        # Save all settings to the file
+        # Save all settings; subscribers such as the main window apply the live ones
         self.settings["database_path"] = self.db_path_edit.text()
         self.settings["backup_location"] = self.backup_path_edit.text()
         self.settings["default_folder_name"] = self.default_folder_edit.text()
@@ -94,13 +94,9 @@ class SettingsDialog(QDialog):
         self.settings["editor_font_family"] = self.chosen_font.family()
         self.settings["editor_font_size"] = self.chosen_font.pointSize()
 
-        try:
-            with open(SETTINGS_FILE_PATH, 'w') as f: json.dump(self.settings, f, indent=4)
-        except IOError as e: log.error(f"Error saving settings: {e}")
+        get_settings_service().update(self.settings)
 
         if path_changed or font_changed:
             QMessageBox.information(self, "Restart Required", "Some changes (like paths or fonts) will be applied the next time you start PieceNote.")
 
-        if hasattr(self.parent(), 'apply_live_settings'):
-            self.parent().apply_live_settings()
         super().accept()
\ No newline at end of file
@@ -3,7 +3,11 @@ from PySide6.QtWidgets import (
     QPushButton, QLabel, QInputDialog, QMessageBox, QAbstractItemView, QMenu, QLineEdit
 )
 from PySide6.QtCore import Qt, Signal
-from utils.helpers import SETTINGS, log
+from utils.logger import get_logger
+from utils.settings import get_settings_service
+from gui.references_panel import ReferencesPanel
+
+log = get_logger(__name__)
 
 
 class SidebarPanel(QWidget):
@@ -12,6 +16,9 @@ class SidebarPanel(QWidget):
     status_message_updated = Signal(str)
     note_selection_changed = Signal(int)
     request_status_message = Signal(str, int)
+    data_saved = Signal()
+    # {old note id: new note id} after a save had to move new notes off ids another process took
+    notes_remapped = Signal(dict)
 
     def __init__(self, storage_manager):
         super().__init__()
@@ -68,6 +75,10 @@ class SidebarPanel(QWidget):
         note_layout.addWidget(self.note_list)
         main_layout.addWidget(note_frame, stretch=2)
 
+        # Backlinks and entity occurrences for the selected note
+        self.references_panel = ReferencesPanel(self.storage)
+        main_layout.addWidget(self.references_panel, stretch=1)
+
         self.load_data_from_storage()
         self._populate_folder_list()
 
@@ -91,6 +102,7 @@ class SidebarPanel(QWidget):
         self.note_list.itemDoubleClicked.connect(self._on_note_double_clicked)
         self.note_list.model().rowsMoved.connect(self._on_note_reordered)
         self.note_list.itemSelectionChanged.connect(self._on_note_selection_changed)
+        self.note_selection_changed.connect(self.references_panel.show_note)
 
         # Context menus
         self.folder_list.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -169,10 +181,21 @@ class SidebarPanel(QWidget):
         if not self.folders:
             fid = self.next_folder_id
             self.next_folder_id += 1
-            default_name = SETTINGS.get("default_folder_name", "Default")
+            default_name = get_settings_service().get("default_folder_name", "Default")
             self.folders[fid] = {"name": default_name, "notes": []}
             self.save_data_to_storage()
 
+    def reload_from_storage(self):
+        """Re-reads the model after the database was written behind its back, e.g. by an import."""
+        current = self.current_folder
+        self.load_data_from_storage()
+        self._populate_folder_list()
+        if current in self.folders:
+            self.select_folder_by_id(current)
+        elif self.folder_list.count() > 0:
+            self.folder_list.setCurrentRow(0)
+        self.references_panel.refresh()
+
     def save_data_to_storage(self):
         data = {
             "folders": self.folders,
@@ -181,9 +204,81 @@ class SidebarPanel(QWidget):
             "next_note_id": self.next_note_id,
         }
         if self.storage.save(data):
-            self.request_status_message.emit("All data saved.", 3000)
-        else:
-            self.request_status_message.emit("Failed to save data.", 5000)
+            if self.storage.remapped_folders or self.storage.remapped_notes:
+                self._apply_remapped_ids(data)
+            if self.storage.conflicts:
+                self.request_status_message.emit(
+                    f"{len(self.storage.conflicts)} note(s) were also changed in another window; "
+                    "their other version is in Note History.", 8000
+                )
+            else:
+                self.request_status_message.emit("All data saved.", 3000)
+            self.references_panel.refresh()
+            self.data_saved.emit()
+            return True
+        self.request_status_message.emit("Failed to save data.", 5000)
+        return False
+
+    def _apply_remapped_ids(self, data):
+        """Follows the ids the storage reassigned to new rows, see StorageManager.save()."""
+        self.next_folder_id = max(self.next_folder_id, data["next_folder_id"])
+        self.next_note_id = max(self.next_note_id, data["next_note_id"])
+        self.current_folder = self.storage.remapped_folders.get(self.current_folder, self.current_folder)
+        current = self.current_folder
+        self._populate_folder_list()
+        self.select_folder_by_id(current)
+        if self.storage.remapped_notes:
+            self.notes_remapped.emit(dict(self.storage.remapped_notes))
+
+    def apply_external_changes(self, changes, keep_note_ids=()):
+        """
+        Merges what StorageManager.pull_changes() found into the model and lists. The
+        bodies of `keep_note_ids` (notes with unsaved edits here) are left alone.
+        Returns (updated note ids, deleted note ids).
+        """
+        for folder_id, name in changes["folders"].items():
+            self.folders.setdefault(folder_id, {"name": name, "notes": []})["name"] = name
+
+        # A note deleted elsewhere but still being edited here is written back by the next save
+        deleted = [nid for nid in changes["deleted_notes"] if nid in self.notes and nid not in keep_note_ids]
+        moved = set(deleted) | set(changes["notes"])
+        for folder in self.folders.values():
+            folder["notes"] = [nid for nid in folder["notes"] if nid not in moved]
+        for nid in deleted:
+            del self.notes[nid]
+        updated = []
+        for nid, note in sorted(changes["notes"].items(), key=lambda item: item[1]["sort_order"]):
+            if nid in keep_note_ids and nid in self.notes:
+                self.notes[nid]["title"] = note["title"]
+            else:
+                self.notes[nid] = {"title": note["title"], "body": note["body"]}
+                updated.append(nid)
+            folder = self.folders.get(note["folder_id"])
+            if folder is not None:
+                folder["notes"].insert(min(note["sort_order"], len(folder["notes"])), nid)
+
+        # Only now that the notes deleted with it are gone: a folder still holding notes
+        # edited here is kept, and written back by the next save
+        for folder_id in changes["deleted_folders"]:
+            folder = self.folders.get(folder_id)
+            if folder is not None and not any(nid in self.notes for nid in folder["notes"]):
+                del self.folders[folder_id]
+
+        self.next_folder_id = max(self.next_folder_id, changes["next_folder_id"])
+        self.next_note_id = max(self.next_note_id, changes["next_note_id"])
+        current = self.current_folder
+        selected = self.get_selected_note_ids()
+        self._populate_folder_list()
+        if current in self.folders:
+            self.select_folder_by_id(current)
+            self._populate_note_list()
+            for i in range(self.note_list.count()):
+                item = self.note_list.item(i)
+                item.setSelected(item.data(Qt.UserRole) in selected)
+        elif self.folder_list.count() > 0:
+            self.folder_list.setCurrentRow(0)
+        self.references_panel.refresh()
+        return updated, deleted
 
     def create_folder(self, name=None, activate=True):
         if not name:
@@ -218,9 +313,16 @@ class SidebarPanel(QWidget):
                 break
 
     def update_note_content(self, nid, new_body):
-        if nid in self.notes:
-            self.notes[nid]["body"] = new_body
-            self.save_data_to_storage()
+        self.update_notes_content({nid: new_body})
+
+    def update_notes_content(self, bodies):
+        """Updates several note bodies and writes them with a single save."""
+        updated = False
+        for nid, new_body in bodies.items():
+            if nid in self.notes:
+                self.notes[nid]["body"] = new_body
+                updated = True
+        return self.save_data_to_storage() if updated else True
 
     def _populate_folder_list(self):
         self.folder_list.clear()
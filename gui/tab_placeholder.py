@@ -0,0 +1,17 @@
+# gui/tab_placeholder.py
+from PySide6.QtWidgets import QLabel
+from PySide6.QtCore import Qt
+
+
+class TabPlaceholder(QLabel):
+    """
+    Stands in for a note tab whose EditorPanel hasn't been built yet. It only keeps
+    the note id and where the cursor and scroll bar were; the main window swaps in a
+    real editor when the tab is first activated.
+    """
+
+    def __init__(self, note_id, view_state=None, parent=None):
+        super().__init__("Loading note...", parent)
+        self.setAlignment(Qt.AlignCenter)
+        self.note_id = note_id
+        self.view_state = view_state or {}
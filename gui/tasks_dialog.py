@@ -0,0 +1,57 @@
+# gui/tasks_dialog.py
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QListWidget, QListWidgetItem, QLabel, QCheckBox
+)
+from PySide6.QtCore import Qt, Signal
+
+class TasksDialog(QDialog):
+    # Emits the note_id and folder_id of the activated task's note
+    result_activated = Signal(int, int)
+
+    def __init__(self, storage_manager, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Open Tasks")
+        self.storage = storage_manager
+
+        # UI Elements
+        self.show_done_checkbox = QCheckBox("Show completed tasks")
+        self.results_label = QLabel()
+        self.results_list = QListWidget()
+
+        # Layout
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.show_done_checkbox)
+        layout.addWidget(self.results_label)
+        layout.addWidget(self.results_list)
+
+        # Connections
+        self.show_done_checkbox.toggled.connect(self.populate)
+        self.results_list.itemDoubleClicked.connect(self._on_result_activated)
+
+        self.resize(600, 450)
+        self.populate()
+
+    def populate(self):
+        """Lists tasks from the checklist index, grouped under their folder and note."""
+        tasks = self.storage.get_tasks(include_checked=self.show_done_checkbox.isChecked())
+        self.results_list.clear()
+        open_count = sum(1 for task in tasks if not task["checked"])
+        self.results_label.setText(f"{open_count} open task(s) across all notes:")
+
+        current_note = None
+        for task in tasks:
+            if task["note_id"] != current_note:
+                current_note = task["note_id"]
+                header = QListWidgetItem(f"📄 {task['title']}  (in folder: {task['folder_name']})")
+                header.setData(Qt.UserRole, task)
+                self.results_list.addItem(header)
+            box = "☑" if task["checked"] else "☐"
+            item = QListWidgetItem(f"    {box} {task['text']}")
+            item.setData(Qt.UserRole, task)
+            self.results_list.addItem(item)
+
+    def _on_result_activated(self, item):
+        task = item.data(Qt.UserRole)
+        if task:
+            self.result_activated.emit(task["note_id"], task["folder_id"])
+            self.accept()
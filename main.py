@@ -1,18 +1,34 @@
 # main.py
+from utils.startup_timer import startup_timer
 import sys
 from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import QCoreApplication
+from PySide6.QtCore import QCoreApplication, Qt, QTimer
 from PySide6.QtGui import QIcon
 
 from gui.main_window import PieceNoteMainWindow
 from utils.helpers import STYLE_SHEET_PATH, APP_ROOT, log
+from utils.logger import setup_logging, configure_log_levels
+from utils.settings import init_settings
+from utils.profiling import profiler
 import os
 
 if __name__ == "__main__":
+    startup_timer.mark("imports")
+    # Logging and settings are set up here rather than as import side effects
+    settings = init_settings(APP_ROOT)
+    setup_logging(settings.all())
+    settings.subscribe(configure_log_levels)
+    log.info(f"Application Root Path set to: {APP_ROOT}")
+    profiler.start_from_environment()
+    startup_timer.mark("load settings")
     QCoreApplication.setOrganizationName("PieceNote")
     QCoreApplication.setApplicationName("PieceNote")
+    # Required for QtWebEngine to be loaded after the QApplication exists,
+    # which is what lets the editor module be imported lazily.
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
 
     app = QApplication(sys.argv)
+    startup_timer.mark("create QApplication")
 
     # --- Set Application Icon ---
     icon_path = os.path.join(APP_ROOT, "assets", "icons", "icon.png") # Assuming you create this file
@@ -24,7 +40,18 @@ if __name__ == "__main__":
             app.setStyleSheet(f.read())
     except FileNotFoundError:
         log.warning(f"Stylesheet not found at: {STYLE_SHEET_PATH}")
+    startup_timer.mark("load stylesheet")
 
     window = PieceNoteMainWindow()
+    startup_timer.mark("build main window")
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+
+    def on_first_paint():
+        # Runs on the first event loop turn after show(), once the window has been painted
+        startup_timer.mark("show and first paint")
+        log.info(startup_timer.report())
+        if window.storage:
+            QTimer.singleShot(0, window.prewarm_editor)
+
+    QTimer.singleShot(0, on_first_paint)
+    sys.exit(app.exec())
@@ -0,0 +1,2 @@
+# piecenote/__init__.py
+"""Headless entry point for PieceNote; see piecenote.cli."""
@@ -0,0 +1,6 @@
+# piecenote/__main__.py
+import sys
+
+from piecenote.cli import main
+
+sys.exit(main())
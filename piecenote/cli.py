@@ -0,0 +1,288 @@
+# piecenote/cli.py
+"""
+Headless command-line interface: `python -m piecenote <command>`.
+
+Works directly on the SQLite database through StorageManager and the exporter,
+without creating any Qt widgets, so reports can be generated from batch jobs.
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.helpers import APP_ROOT
+from utils.logger import get_logger
+from utils.settings import init_settings
+
+log = get_logger(__name__)
+
+
+class _StorageUnavailable(Exception):
+    """The database could not be opened; reported by main() as a one-line error."""
+    pass
+
+
+def _open_storage(args):
+    from features.storage import StorageManager
+    try:
+        return StorageManager(args.db) if args.db else StorageManager()
+    except sqlite3.OperationalError as e:
+        raise _StorageUnavailable(f"Could not open the database{f' {args.db}' if args.db else ''}: {e}")
+
+
+def _emit(args, record, text):
+    """Writes one result line to stdout, as JSON if --json was given."""
+    print(json.dumps(record, ensure_ascii=False) if args.json else text, flush=args.json)
+
+
+def _find_folder(storage, name_or_id):
+    for folder in storage.iter_folders():
+        if folder["name"] == name_or_id or str(folder["folder_id"]) == name_or_id:
+            return folder
+    return None
+
+
+def cmd_list(args):
+    storage = _open_storage(args)
+    if args.folder is None:
+        for folder in storage.iter_folders():
+            _emit(args, folder, f"{folder['folder_id']:>6}  {folder['name']}  ({folder['note_count']} notes)")
+        return 0
+    folder = _find_folder(storage, args.folder)
+    if folder is None:
+        print(f"No folder named '{args.folder}'.", file=sys.stderr)
+        return 1
+    for note in storage.iter_notes(folder["folder_id"]):
+        _emit(args, note, f"{note['note_id']:>6}  {note['title']}")
+    return 0
+
+
+def cmd_search(args):
+    storage = _open_storage(args)
+    found = 0
+    for result in storage.iter_search_notes(args.query):
+        found += 1
+        _emit(args, result, f"{result['note_id']:>6}  {result['title']}  (in folder: {result['folder_name']})")
+    return 0 if found else 1
+
+
+def cmd_show(args):
+    storage = _open_storage(args)
+    note = storage.get_note(args.note_id)
+    if note is None:
+        print(f"No note with id {args.note_id}.", file=sys.stderr)
+        return 1
+    _emit(args, note, f"# {note['title']}\n\n{note['body'] or ''}")
+    return 0
+
+
+def _export_job(output, notes, file_format, single_file, incremental, inline_images):
+    """Runs in a worker process."""
+    from features.export import export_notes_to_file
+    export_notes_to_file(output, notes, file_format, single_file, incremental, inline_images)
+    return output
+
+
+def cmd_export(args):
+    storage = _open_storage(args)
+    if args.all:
+        folders = list(storage.iter_folders())
+    else:
+        folder = _find_folder(storage, args.folder)
+        if folder is None:
+            print(f"No folder named '{args.folder}'.", file=sys.stderr)
+            return 1
+        folders = [folder]
+
+    # One job per folder: with --all, `output` is a directory receiving <folder>.<format>
+    jobs = []
+    for folder in folders:
+        notes = list(storage.iter_notes(folder["folder_id"], with_body=True))
+        if args.all:
+            os.makedirs(args.output, exist_ok=True)
+            safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in folder["name"])
+            output = os.path.join(args.output, f"{safe_name}.{args.format}")
+        else:
+            output = args.output
+        jobs.append((output, notes, args.format, not args.split, not args.full, args.inline_images or None))
+
+    failures = 0
+    if args.workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {pool.submit(_export_job, *job): job[0] for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failures += 1
+                    print(f"Export of {futures[future]} failed: {e}", file=sys.stderr)
+                    continue
+                _emit(args, {"exported": futures[future]}, f"exported {futures[future]}")
+    else:
+        for job in jobs:
+            try:
+                _export_job(*job)
+            except Exception as e:
+                failures += 1
+                print(f"Export of {job[0]} failed: {e}", file=sys.stderr)
+                continue
+            _emit(args, {"exported": job[0]}, f"exported {job[0]}")
+    return 1 if failures else 0
+
+
+def cmd_import(args):
+    from features.importer import import_markdown_tree, import_json_file
+    storage = _open_storage(args)
+
+    def progress(done, total):
+        log.info(f"{done}/{total or '?'} notes written")
+
+    if os.path.isdir(args.path):
+        summary = import_markdown_tree(
+            storage, args.path, copy_images=not args.no_images, workers=args.workers, progress=progress
+        )
+    else:
+        summary = import_json_file(storage, args.path, progress=progress)
+    for error in summary.get("errors", []):
+        print(f"Skipped {error}", file=sys.stderr)
+    _emit(args, summary, f"imported {summary['notes']} note(s) into {summary['folders']} folder(s)")
+    return 0
+
+
+def cmd_merge(args):
+    storage = _open_storage(args)
+
+    def progress(done):
+        log.info(f"{done} note(s) merged")
+
+    try:
+        summary = storage.merge_from(args.source, dry_run=args.dry_run, progress=progress)
+    except (ValueError, OSError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    _emit(
+        args, summary,
+        f"{'would merge' if args.dry_run else 'merged'}: {summary['notes_added']} note(s) added, "
+        f"{summary['notes_updated']} updated, {summary['notes_kept']} kept (newer here), "
+        f"{summary['folders_added']} folder(s) added, {summary['folders_renamed']} renamed"
+    )
+    return 0
+
+
+def cmd_maintenance(args):
+    storage = _open_storage(args)
+    if args.action in ("check", "full-check"):
+        problems = storage.integrity_check(quick=args.action == "check")
+        for problem in problems:
+            _emit(args, {"check": problem}, problem)
+        return 0 if problems == ["ok"] else 1
+    if args.action == "vacuum":
+        storage.vacuum()
+        _emit(args, {"vacuum": "done"}, "vacuum done")
+    elif args.action == "run":
+        # The steps the GUI runs in the background when idle, all at once
+        from features.maintenance import DatabaseMaintenance
+        results = DatabaseMaintenance(storage).run_all(force=True)
+        for result in results:
+            _emit(args, result, f"{result['task']}: {result['result']}")
+        return 0 if all(result["ok"] for result in results) else 1
+    return 0
+
+
+def cmd_serve(args):
+    import asyncio
+    from features.api_server import ApiServer
+    storage = _open_storage(args)  # brings the schema up to date; the server itself never writes
+    try:
+        server = ApiServer(storage.filepath, host=args.host, port=args.port, pool_size=args.pool)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Could not start the API server: {e}", file=sys.stderr)
+        return 1
+    finally:
+        server.stop()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m piecenote", description="PieceNote command-line interface.")
+    parser.add_argument("--db", help="database file (default: database_path from settings.json)")
+    parser.add_argument("--json", action="store_true", help="write results as JSON lines")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress to stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="list folders, or the notes of one folder")
+    list_parser.add_argument("folder", nargs="?", help="folder name or id")
+    list_parser.set_defaults(func=cmd_list)
+
+    search_parser = commands.add_parser("search", help="search note titles and bodies")
+    search_parser.add_argument("query")
+    search_parser.set_defaults(func=cmd_search)
+
+    show_parser = commands.add_parser("show", help="print a note as markdown")
+    show_parser.add_argument("note_id", type=int)
+    show_parser.set_defaults(func=cmd_show)
+
+    export_parser = commands.add_parser("export", help="export a folder (or all folders) to html/md/pdf")
+    target = export_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--folder", help="folder name or id")
+    target.add_argument("--all", action="store_true", help="export every folder into the --output directory")
+    export_parser.add_argument("--format", choices=["html", "md", "pdf"], default="html")
+    export_parser.add_argument("--output", "-o", required=True, help="output file, or directory with --all")
+    export_parser.add_argument("--split", action="store_true", help="one file per note instead of one per folder")
+    export_parser.add_argument("--full", action="store_true", help="rebuild everything, ignoring unchanged notes")
+    export_parser.add_argument(
+        "--inline-images", action="store_true", help="embed images in html output (pdf output always does)"
+    )
+    export_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parallel export processes")
+    export_parser.set_defaults(func=cmd_export)
+
+    import_parser = commands.add_parser(
+        "import", help="import a directory tree of markdown files, or a PieceNote/CyberNotes JSON export"
+    )
+    import_parser.add_argument("path")
+    import_parser.add_argument("--no-images", action="store_true", help="leave image links as they are")
+    import_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parallel parsing processes")
+    import_parser.set_defaults(func=cmd_import)
+
+    merge_parser = commands.add_parser("merge", help="merge the notes of another PieceNote database into this one")
+    merge_parser.add_argument("source", help="database file to merge from")
+    merge_parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    merge_parser.set_defaults(func=cmd_merge)
+
+    maintenance_parser = commands.add_parser("maintenance", help="database maintenance")
+    maintenance_parser.add_argument("action", choices=["check", "full-check", "vacuum", "run"])
+    maintenance_parser.set_defaults(func=cmd_maintenance)
+
+    serve_parser = commands.add_parser("serve", help="serve a read-only JSON API over the notes on localhost")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="loopback address to listen on")
+    serve_parser.add_argument("--port", type=int, help="port (default: api_port from settings.json)")
+    serve_parser.add_argument("--pool", type=int, help="read-only database connections (default: api_pool_size)")
+    serve_parser.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(levelname)s %(name)s: %(message)s", stream=sys.stderr
+    )
+    init_settings(APP_ROOT)
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # Output piped into e.g. `head`; not an error
+        return 0
+    except _StorageUnavailable as e:
+        print(e, file=sys.stderr)
+        return 1
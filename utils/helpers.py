@@ -2,7 +2,7 @@
 import os
 import sys
 from .logger import log
-import json
+from .settings import get_settings_service
 
 def get_app_info():
     """
@@ -33,44 +33,13 @@ def get_app_root_path():
     else:
         return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-# Define key paths that the application will use
+# Define key paths that the application will use. These are computed from the
+# install location only; nothing is read from or written to disk at import time.
 APP_ROOT = get_app_root_path()
-log.info(f"Application Root Path set to: {APP_ROOT}")
-
-def get_settings():
-    """Loads, validates, and returns the application settings."""
-    defaults = {
-        "database_path": os.path.join(APP_ROOT, "PieceNote.sqlite"),
-        "backup_location": os.path.join(APP_ROOT, "backups"),
-        "default_folder_name": "Default",
-        "autosave_interval_seconds": 30,
-        "editor_font_family": "Monospace",
-        "editor_font_size": 11
-    }
-    settings_file = os.path.join(APP_ROOT, "settings.json")
-
-    if not os.path.exists(settings_file):
-        return defaults
-    try:
-        with open(settings_file, 'r') as f:
-            settings = json.load(f)
-        # Ensure all keys are present, falling back to defaults
-        defaults.update(settings)
-        return defaults
-    except (IOError, json.JSONDecodeError) as e:
-        log.error(f"Failed to load settings.json: {e}. Using default settings.")
-        return defaults
-
-# Load settings once on startup
-SETTINGS = get_settings()
-DB_FILE_PATH = SETTINGS["database_path"]
-BACKUP_LOCATION = SETTINGS["backup_location"]
 SETTINGS_FILE_PATH = os.path.join(APP_ROOT, "settings.json")
 STYLE_SHEET_PATH = os.path.join(APP_ROOT, "assets", "styles", "theme.css")
 JSON_IMPORT_PATH = os.path.join(APP_ROOT, "cybernotes_data.json")
 
-# Ensure backup directory exists on startup
-try:
-    os.makedirs(BACKUP_LOCATION, exist_ok=True)
-except OSError as e:
-    log.error(f"Could not create backup directory at {BACKUP_LOCATION}: {e}")
\ No newline at end of file
+def get_settings():
+    """Returns a copy of the current application settings."""
+    return get_settings_service().all()
@@ -1,6 +1,9 @@
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import os
+import queue
 import sys
 
 def _get_app_root_for_logging():
@@ -14,12 +17,69 @@ def _get_app_root_for_logging():
         # __file__ is logger.py -> dirname is utils/ -> dirname is the project root
         return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-def setup_logging():
-    """Configures the application's logging system."""
-    log_file = os.path.join(_get_app_root_for_logging(), "app.log")
+def get_log_directory():
+    """Returns the directory holding app.log, also used for other diagnostics output."""
+    return _get_app_root_for_logging()
 
-    logger = logging.getLogger("PieceNote")
-    logger.setLevel(logging.INFO)
+# Modules log through this logger or a child from get_logger(); handlers are only
+# attached by setup_logging(), which main.py calls explicitly, so importing a
+# module never opens the log file.
+log = logging.getLogger("PieceNote")
+
+_listener = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats each record as a single JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "file": record.filename,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def get_logger(name):
+    """Returns the logger for a module, e.g. get_logger(__name__) -> 'PieceNote.features.storage'."""
+    return log.getChild(name)
+
+
+def configure_log_levels(settings):
+    """
+    Applies `log_level` to the application logger and the `log_levels` mapping
+    (module name -> level, e.g. {"features.storage": "DEBUG"}) to module loggers.
+    Can be called again whenever the settings change.
+    """
+    levels = {"": settings.get("log_level", "INFO")}
+    levels.update(settings.get("log_levels") or {})
+    for name, level in levels.items():
+        try:
+            (get_logger(name) if name else log).setLevel(str(level).upper())
+        except ValueError:
+            log.warning(f"Ignoring unknown log level '{level}' for '{name or 'PieceNote'}'.")
+
+
+def setup_logging(settings=None):
+    """
+    Configures the application's logging system.
+    Records are put on an in-memory queue by the calling thread and written to the
+    log file and console by a background listener thread, so logging never blocks
+    the GUI thread on file I/O or rotation.
+    """
+    global _listener
+    settings = settings or {}
+    log_file = os.path.join(get_log_directory(), "app.log")
+
+    logger = log
+    configure_log_levels(settings)
 
     if logger.hasHandlers():
         return logger
@@ -33,17 +93,31 @@ def setup_logging():
     formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s (%(filename)s:%(lineno)d)'
     )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    if settings.get("log_format") == "json":
+        handler.setFormatter(JsonLinesFormatter())
+    else:
+        handler.setFormatter(formatter)
 
     # --- Console Handler ---
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+
+    # --- Queue ---
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    _listener = QueueListener(log_queue, handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
 
     logger.info("="*50)
     logger.info("Logging configured successfully. Application starting.")
     logger.info("="*50)
     return logger
 
-log = setup_logging()
\ No newline at end of file
+
+def shutdown_logging():
+    """Stops the background writer after flushing every queued record."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
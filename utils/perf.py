@@ -0,0 +1,109 @@
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class _Metric:
+    """Timing samples of one named operation. Percentiles use the most recent samples."""
+    MAX_SAMPLES = 2048
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=self.MAX_SAMPLES)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def summary(self):
+        ordered = sorted(self.samples)
+
+        def percentile(p):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "p50_ms": percentile(50) * 1000,
+            "p95_ms": percentile(95) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class PerfRegistry:
+    """
+    Process-wide registry of operation timings and counters.
+    Recording is a dict lookup and a deque append under a lock, cheap enough
+    to leave enabled in the save, render and search paths.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._counters = {}
+
+    def record(self, name, seconds):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = _Metric()
+            metric.add(seconds)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self):
+        """Returns {"timings": {name: summary}, "counters": {name: value}}."""
+        with self._lock:
+            return {
+                "timings": {name: metric.summary() for name, metric in sorted(self._metrics.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+            self._counters.clear()
+
+    def dump(self, path):
+        """Writes the current snapshot to `path` as JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+registry = PerfRegistry()
+
+
+@contextmanager
+def timed(name):
+    """Times the enclosed block under `name`, also when it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.record(name, time.perf_counter() - started)
+
+
+def timed_function(name):
+    """Decorator form of timed()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def increment(name, amount=1):
+    registry.increment(name, amount)
@@ -0,0 +1,114 @@
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from .logger import get_logger, get_log_directory
+
+log = get_logger(__name__)
+
+# Set to "cpu", "memory" or "cpu,memory" (or "1" for both) to profile from startup
+PROFILE_ENV_VAR = "PIECENOTE_PROFILE"
+
+
+class ProfilingSession:
+    """
+    Starts and stops cProfile and tracemalloc in the running application.
+
+    On stop, a session writes into the `profiles` directory next to app.log:
+      <stamp>.prof         cProfile stats of the GUI thread (open with pstats or snakeviz)
+      <stamp>_memory.txt   top allocation differences between start and stop
+      <stamp>_session.json when it ran and which note/tab was active
+    """
+    TOP_ALLOCATIONS = 50
+
+    def __init__(self, output_dir=None):
+        self.output_dir = output_dir or os.path.join(get_log_directory(), "profiles")
+        self._profiler = None
+        self._memory_baseline = None
+        self._started_tracemalloc = False
+        self._started_at = None
+        self._start_context = None
+
+    @property
+    def active(self):
+        return self._started_at is not None
+
+    def start(self, cpu=True, memory=True, context=None):
+        if self.active:
+            return
+        self._started_at = time.time()
+        self._start_context = context or {}
+        if memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+                self._started_tracemalloc = True
+            self._memory_baseline = tracemalloc.take_snapshot()
+        if cpu:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        log.info(f"Profiling started (cpu={cpu}, memory={memory}).")
+
+    def stop(self, context=None):
+        """Stops the session and writes its results. Returns the paths written."""
+        if not self.active:
+            return []
+        if self._profiler is not None:
+            self._profiler.disable()
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self._started_at))
+        base = os.path.join(self.output_dir, stamp)
+        written = []
+
+        session = {
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self._started_at)),
+            "stopped": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "duration_seconds": round(time.time() - self._started_at, 3),
+            "context_at_start": self._start_context,
+            "context_at_stop": context or {},
+        }
+
+        if self._profiler is not None:
+            self._profiler.dump_stats(f"{base}.prof")
+            written.append(f"{base}.prof")
+            self._profiler = None
+
+        if self._memory_baseline is not None:
+            current = tracemalloc.take_snapshot()
+            current_size, peak_size = tracemalloc.get_traced_memory()
+            diff = current.compare_to(self._memory_baseline, 'lineno')
+            with open(f"{base}_memory.txt", 'w', encoding='utf-8') as f:
+                f.write(f"Memory diff for profiling session started {session['started']}\n")
+                f.write(f"Context at start: {json.dumps(session['context_at_start'])}\n")
+                f.write(f"Context at stop:  {json.dumps(session['context_at_stop'])}\n")
+                f.write(f"Traced now: {current_size / 1024:.1f} KiB, peak: {peak_size / 1024:.1f} KiB\n\n")
+                for stat in diff[:self.TOP_ALLOCATIONS]:
+                    f.write(f"{stat}\n")
+            written.append(f"{base}_memory.txt")
+            session["traced_memory_kib"] = round(current_size / 1024, 1)
+            session["peak_memory_kib"] = round(peak_size / 1024, 1)
+            self._memory_baseline = None
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+        with open(f"{base}_session.json", 'w', encoding='utf-8') as f:
+            json.dump(session, f, indent=2)
+        written.append(f"{base}_session.json")
+
+        self._started_at = None
+        log.info(f"Profiling stopped, results written to {self.output_dir}")
+        return written
+
+    def start_from_environment(self):
+        """Starts a session if PIECENOTE_PROFILE is set."""
+        value = os.environ.get(PROFILE_ENV_VAR, "").strip().lower()
+        if not value or value in ("0", "false", "no"):
+            return
+        kinds = {part.strip() for part in value.split(",")}
+        both = bool(kinds & {"1", "true", "yes", "all"})
+        self.start(cpu=both or "cpu" in kinds, memory=both or "memory" in kinds,
+                   context={"trigger": f"{PROFILE_ENV_VAR}={value}"})
+
+
+profiler = ProfilingSession()
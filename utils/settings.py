@@ -0,0 +1,137 @@
+import json
+import os
+from .logger import get_logger
+
+log = get_logger(__name__)
+
+
+def default_settings(app_root):
+    """Returns the built-in settings, used for any key missing from settings.json."""
+    return {
+        "database_path": os.path.join(app_root, "PieceNote.sqlite"),
+        "backup_location": os.path.join(app_root, "backups"),
+        "image_store_location": os.path.join(app_root, "images"),
+        "default_folder_name": "Default",
+        "autosave_interval_seconds": 30,
+        "editor_font_family": "Monospace",
+        "editor_font_size": 11,
+        "large_note_threshold_kb": 512,
+        "paste_warning_kb": 1024,
+        "restore_open_tabs": True,
+        "max_live_tabs": 10,
+        "tab_memory_budget_mb": 256,
+        "revision_snapshot_interval": 20,
+        "revision_keep_per_note": 200,
+        "revision_keep_days": 90,
+        "log_level": "INFO",
+        "log_levels": {},
+        "log_format": "text",
+        "perf_stats_dump_on_exit": False,
+        "maintenance_interval_minutes": 360,
+        "maintenance_idle_seconds": 60,
+        "database_busy_timeout_seconds": 10,
+        "external_change_poll_seconds": 2,
+        "api_server_enabled": False,
+        "api_port": 8765,
+        "api_pool_size": 4,
+        "api_render_cache_entries": 256,
+        "command_output_head_lines": 200,
+        "command_output_tail_lines": 200,
+        "command_output_max_line_chars": 2000,
+        "export_image_max_width": 1600,
+        "export_image_quality": 82,
+        "export_inline_images": False,
+        "export_image_cache_location": os.path.join(app_root, "cache", "export_images")
+    }
+
+
+class SettingsService:
+    """
+    Owns the application settings. The file is parsed once and only re-read when its
+    modification time changes; subscribers are called with the new settings whenever
+    they change, whether through update() or an edit of the file on disk.
+    """
+
+    def __init__(self, settings_file, defaults):
+        self.settings_file = settings_file
+        self.defaults = defaults
+        self._settings = dict(defaults)
+        self._mtime = None
+        self._subscribers = []
+        self._load()
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.settings_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        """(Re)reads the settings file. Returns True if the effective settings changed."""
+        self._mtime = self._file_mtime()
+        settings = dict(self.defaults)
+        if self._mtime is not None:
+            try:
+                with open(self.settings_file, 'r') as f:
+                    # Ensure all keys are present, falling back to defaults
+                    settings.update(json.load(f))
+            except (IOError, json.JSONDecodeError) as e:
+                log.error(f"Failed to load settings.json: {e}. Using default settings.")
+        changed = settings != self._settings
+        self._settings = settings
+        return changed
+
+    def reload_if_changed(self):
+        """Re-reads the file if it changed on disk, notifying subscribers."""
+        if self._file_mtime() != self._mtime and self._load():
+            self._notify()
+
+    def get(self, key, default=None):
+        self.reload_if_changed()
+        return self._settings.get(key, default)
+
+    def all(self):
+        """Returns a copy of the current settings."""
+        self.reload_if_changed()
+        return dict(self._settings)
+
+    def update(self, values):
+        """Merges `values` into the settings, writes them to disk and notifies subscribers."""
+        self._settings.update(values)
+        try:
+            with open(self.settings_file, 'w') as f:
+                json.dump(self._settings, f, indent=4)
+            self._mtime = self._file_mtime()
+        except IOError as e:
+            log.error(f"Error saving settings: {e}")
+        self._notify()
+
+    def subscribe(self, callback):
+        """Registers callback(settings) to be called whenever the settings change."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _notify(self):
+        for callback in list(self._subscribers):
+            callback(dict(self._settings))
+
+
+_service = None
+
+
+def init_settings(app_root):
+    """Creates the settings service. Called once by main.py at startup."""
+    global _service
+    _service = SettingsService(os.path.join(app_root, "settings.json"), default_settings(app_root))
+    return _service
+
+
+def get_settings_service():
+    """Returns the settings service, creating it with the default paths if main.py didn't."""
+    if _service is None:
+        from .helpers import APP_ROOT
+        init_settings(APP_ROOT)
+    return _service
@@ -0,0 +1,37 @@
+import time
+from .perf import registry
+
+
+class StartupTimer:
+    """
+    Records how long each startup phase takes, from process start to the first
+    painted window, and logs the breakdown once startup is complete.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []
+
+    def now(self):
+        return time.perf_counter()
+
+    def mark(self, phase):
+        """Ends the current phase, naming it `phase`."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        registry.record(f"startup.{phase}", now - self._last)
+        self._last = now
+
+    def report(self):
+        """Returns the phase breakdown as printable text."""
+        total = self._last - self.started
+        lines = [f"Startup took {total * 1000:.0f} ms until first paint:"]
+        for phase, duration in self.phases:
+            share = (duration / total * 100) if total else 0
+            lines.append(f"  {phase:<24} {duration * 1000:8.1f} ms  {share:5.1f}%")
+        return "\n".join(lines)
+
+
+# Created on first import, which main.py does before anything else
+startup_timer = StartupTimer()